@@ -0,0 +1,125 @@
+import random
+import tempfile
+from typing import List
+from fastapi.testclient import TestClient
+from src.main import app
+from src.services.database_service import DatabaseService
+from src.services.security_service import SecurityService
+from src.services.password_hasher import _hash, _verify, DEFAULT_BCRYPT_ROUNDS
+from src.services.component_search import ComponentSearchIndex
+from src.services.code_index import CodeIndex
+from src.services.workspace_service import Workspace
+from .harness import BenchmarkCase
+
+ROLES = ["admin", "editor", "viewer", "user"]
+
+def seed_database(users: int, batch_size: int = 5000) -> DatabaseService:
+    """In-memory SQLite DatabaseService holding `users` generated users"""
+    service = DatabaseService("sqlite://", count_cache_ttl=0)
+    service.store_users_bulk(
+        ({
+            "username": f"user_{i:07d}",
+            "hashed_password": "$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbench",
+            "roles": [ROLES[i % len(ROLES)], "user"],
+        } for i in range(users)),
+        batch_size=batch_size,
+    )
+    return service
+
+def database_cases(users: int) -> List[BenchmarkCase]:
+    db = seed_database(users)
+    rng = random.Random(42)
+    deep_cursor = db.list_users(page=max(1, users // 20 - 1), page_size=10, include_total=False)["next_cursor"]
+    counter = iter(range(10 ** 9))
+
+    def store_and_delete():
+        name = f"bench_{next(counter)}"
+        db.store_user({"username": name, "hashed_password": "x", "roles": ["user"]})
+        db.delete_user(name)
+
+    def update():
+        name = f"user_{rng.randrange(users):07d}"
+        db.update_user(name, {"username": name, "hashed_password": "y", "roles": ["editor", "user"]})
+
+    return [
+        BenchmarkCase("db.get_user", lambda: db.get_user(f"user_{rng.randrange(users):07d}"), repeat=200),
+        BenchmarkCase("db.list_users.first_page", lambda: db.list_users(page_size=50, include_total=False)),
+        BenchmarkCase("db.list_users.with_total", lambda: db.list_users(page_size=50), repeat=10),
+        BenchmarkCase("db.list_users.deep_cursor",
+                      lambda: db.list_users(page_size=10, cursor=deep_cursor, include_total=False)),
+        BenchmarkCase("db.search_users.contains",
+                      lambda: db.search_users("r_00012", page_size=20, include_total=False)),
+        BenchmarkCase("db.search_users.prefix",
+                      lambda: db.search_users("user_00012", page_size=20, include_total=False, match="prefix")),
+        BenchmarkCase("db.search_users.role",
+                      lambda: db.search_users(roles=["admin"], page_size=20, include_total=False)),
+        BenchmarkCase("db.store_and_delete_user", store_and_delete),
+        BenchmarkCase("db.update_user", update),
+    ]
+
+def security_cases() -> List[BenchmarkCase]:
+    security = SecurityService()
+    security.users.set_roles("bench_user", ["editor"])
+    token = security.create_access_token({"sub": "bench_user"})
+    signed_roles_token = security.create_access_token({"sub": "bench_user"}, roles=["editor"])
+
+    return [
+        BenchmarkCase("security.create_token", lambda: security.create_access_token({"sub": "bench_user"}),
+                      repeat=500),
+        BenchmarkCase("security.verify_token.cold", lambda: security.verify_token(token),
+                      setup=security.token_cache.clear, repeat=500),
+        BenchmarkCase("security.authorize_user.cached", lambda: security.authorize_user(token, "editor"),
+                      repeat=500),
+        BenchmarkCase("security.authorize_user.signed_roles",
+                      lambda: security.authorize_user(signed_roles_token, "editor"), repeat=500),
+    ]
+
+def hashing_cases(rounds: int = DEFAULT_BCRYPT_ROUNDS) -> List[BenchmarkCase]:
+    hashed = _hash(b"benchmark-password", rounds)
+    return [
+        BenchmarkCase(f"bcrypt.hash.rounds_{rounds}", lambda: _hash(b"benchmark-password", rounds), repeat=5),
+        BenchmarkCase(f"bcrypt.verify.rounds_{rounds}", lambda: _verify(b"benchmark-password", hashed), repeat=5),
+    ]
+
+def search_cases(components: int = 20000) -> List[BenchmarkCase]:
+    words = ["vector", "keyword", "retriever", "summarizer", "planner", "router", "embedding", "parser"]
+    index = ComponentSearchIndex()
+    for i in range(components):
+        index.add({"id": i, "name": f"{words[i % 8]} {words[(i // 8) % 8]} {i}", "type": words[i % 3],
+                   "description": f"component number {i}"})
+    return [
+        BenchmarkCase("search.components.prefix", lambda: index.search("vector retr", limit=10)),
+        BenchmarkCase("search.components.typo", lambda: index.search("vectr", limit=10)),
+    ]
+
+def index_cases(files: int = 2000) -> List[BenchmarkCase]:
+    root = tempfile.mkdtemp(prefix="bench-index-")
+    workspace = Workspace(f"{root}/ws")
+    (workspace.root / "pkg").mkdir()
+    for i in range(files):
+        (workspace.root / "pkg" / f"mod_{i}.py").write_text(
+            f"from pkg.mod_{(i + 1) % files} import helper_{(i + 1) % files}\n\n"
+            f"class Model{i}:\n    def run(self):\n        return helper_{(i + 1) % files}()\n\n"
+            f"def helper_{i}():\n    return Model{i}()\n")
+    index = CodeIndex(workspace, f"{root}/index.sqlite")
+    index.sync()
+    return [
+        BenchmarkCase("index.definition", lambda: index.definition("helper_7", "/pkg/mod_6.py"), repeat=200),
+        BenchmarkCase("index.references", lambda: index.references("helper_7"), repeat=200),
+        BenchmarkCase("index.search", lambda: index.search("model1", limit=20), repeat=200),
+        BenchmarkCase("index.resync_unchanged", index.sync, repeat=5),
+    ]
+
+def route_cases() -> List[BenchmarkCase]:
+    client = TestClient(app)
+    projects_etag = client.get("/projects/").headers["etag"]
+    return [
+        BenchmarkCase("route.get_projects", lambda: client.get("/projects"), repeat=200),
+        BenchmarkCase("route.get_projects_not_modified",
+                      lambda: client.get("/projects/", headers={"If-None-Match": projects_etag}), repeat=200),
+        BenchmarkCase("route.get_project", lambda: client.get("/projects/1"), repeat=200),
+        BenchmarkCase("route.get_components", lambda: client.get("/components"), repeat=200),
+        BenchmarkCase("route.get_component", lambda: client.get("/components/1"), repeat=200),
+        BenchmarkCase("route.code_generate", lambda: client.post("/code/generate", json={"prompt": "bench"}),
+                      repeat=200),
+    ]
@@ -0,0 +1,85 @@
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+class BenchmarkCase:
+    """A named operation timed by run_case"""
+
+    def __init__(self, name: str, fn: Callable[[], Any], repeat: int = 50, setup: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.fn = fn
+        self.repeat = repeat
+        self.setup = setup
+
+def run_case(case: BenchmarkCase, warmup: int = 3) -> Dict[str, Any]:
+    """Time case.fn repeat times after a short warmup; setup runs untimed before each call"""
+    for _ in range(min(warmup, case.repeat)):
+        if case.setup:
+            case.setup()
+        case.fn()
+    samples: List[float] = []
+    for _ in range(case.repeat):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "repeat": case.repeat,
+        "median_s": statistics.median(samples),
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_s": samples[0],
+    }
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+def load_baseline(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+def save_baseline(path: Path, baseline: Dict[str, Any]) -> None:
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compare median timings against a baseline section
+
+    Returns one row per benchmark; regressed is True when the median grew by
+    more than tolerance (0.2 == 20%) over the baseline median.
+    """
+    rows = []
+    for name, result in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append({"name": name, "median_s": result["median_s"], "baseline_s": None,
+                         "change": None, "regressed": False})
+            continue
+        change = result["median_s"] / reference["median_s"] - 1 if reference["median_s"] else 0.0
+        rows.append({
+            "name": name,
+            "median_s": result["median_s"],
+            "baseline_s": reference["median_s"],
+            "change": change,
+            "regressed": change > tolerance,
+        })
+    return rows
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<40} {'median':>12} {'baseline':>12} {'change':>9}"]
+    for row in rows:
+        baseline = f"{row['baseline_s'] * 1e3:10.3f}ms" if row["baseline_s"] is not None else f"{'-':>12}"
+        change = f"{row['change'] * 100:+8.1f}%" if row["change"] is not None else f"{'new':>9}"
+        flag = "  REGRESSION" if row["regressed"] else ""
+        lines.append(f"{row['name']:<40} {row['median_s'] * 1e3:10.3f}ms {baseline} {change}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""
+Backend micro-benchmarks with a regression gate
+
+Usage (from the backend directory):
+    python -m benchmarks.run                      # 10^4 users, compare with baseline
+    python -m benchmarks.run --users 1000000      # larger seeded database
+    python -m benchmarks.run --update-baseline    # record the current numbers
+    python -m benchmarks.run --filter db.search   # only benchmarks with this name prefix
+
+Exits with status 1 when a benchmark's median is slower than the baseline
+by more than --tolerance.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from .harness import run_case, environment, load_baseline, save_baseline, compare, format_report
+from . import cases
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000, help="users seeded into SQLite (10^4 - 10^6)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 == 25%%")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name starts with this")
+    parser.add_argument("--bcrypt-rounds", type=int, default=cases.DEFAULT_BCRYPT_ROUNDS)
+    parser.add_argument("--output", type=Path, help="also write this run's results as JSON")
+    args = parser.parse_args(argv)
+
+    groups = {
+        "db.": lambda: cases.database_cases(args.users),
+        "security.": cases.security_cases,
+        "bcrypt.": lambda: cases.hashing_cases(args.bcrypt_rounds),
+        "search.": cases.search_cases,
+        "index.": cases.index_cases,
+        "route.": cases.route_cases,
+    }
+    results = {}
+    for prefix, build in groups.items():
+        # Skip whole groups up front so an unrelated filter does not seed the database
+        if not (prefix.startswith(args.filter) or args.filter.startswith(prefix)):
+            continue
+        for case in build():
+            if not case.name.startswith(args.filter):
+                continue
+            results[case.name] = run_case(case)
+
+    section = f"users_{args.users}"
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline.get(section, {}).get("results", {}), args.tolerance)
+    print(format_report(rows))
+
+    run = {"environment": environment(), "users": args.users, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(run, indent=2, sort_keys=True) + "\n")
+    if args.update_baseline or section not in baseline:
+        merged = dict(baseline.get(section, {}).get("results", {}), **results)
+        baseline[section] = dict(run, results=merged)
+        save_baseline(args.baseline, baseline)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
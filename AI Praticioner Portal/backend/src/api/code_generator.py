@@ -1,16 +1,60 @@
-from fastapi import APIRouter, HTTPException
-from src.services.gemini_service import GeminiService
+import json
+import time
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from src.api.dependencies import get_gemini_service
+from src.services.gemini_service import GeminiService, GeminiError, NOT_CONFIGURED
 
 router = APIRouter(prefix="/code", tags=["code-generator"])
-gemini_service = GeminiService()
+
+class CodeGenerationRequest(BaseModel):
+    prompt: str
+    language: Optional[str] = None
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+    stream: bool = False
+    cache: bool = True
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_events(gemini: GeminiService, request: CodeGenerationRequest) -> AsyncIterator[str]:
+    started = time.perf_counter()
+    ttft_ms = None
+    try:
+        async for text in gemini.stream_code(request.prompt, request.language, request.temperature,
+                                             request.max_output_tokens, request.cache):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+            yield sse("token", {"text": text})
+    except GeminiError as e:
+        yield sse("error", {"detail": str(e)})
+        return
+    yield sse("done", {"ttft_ms": ttft_ms, "duration_ms": (time.perf_counter() - started) * 1000})
 
 @router.post("/generate")
-async def generate_code(prompt: str):
-    if not prompt:
+async def generate_code(request: CodeGenerationRequest, gemini: GeminiService = Depends(get_gemini_service)):
+    """
+    Generate code for a prompt
+
+    With stream=true the completion is sent as server-sent events: one
+    "token" event per chunk as the model produces it, then "done" (or "error").
+    Identical requests are answered from the generation cache unless cache=false.
+    """
+    if not request.prompt:
         raise HTTPException(status_code=400, detail="Prompt is required")
-    
-    response = gemini_service.generate_code(prompt)
+
+    if request.stream:
+        if not gemini.enabled:
+            raise HTTPException(status_code=500, detail=NOT_CONFIGURED)
+        return StreamingResponse(stream_events(gemini, request), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+
+    response = await gemini.generate_code_async(request.prompt, request.language, request.temperature,
+                                                request.max_output_tokens, request.cache)
     if response.status != "success":
         raise HTTPException(status_code=500, detail=response.error)
-    
-    return {"code": response.content}
+
+    return {"code": response.content, "cached": response.cached}
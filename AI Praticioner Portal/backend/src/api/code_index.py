@@ -0,0 +1,47 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from src.api.dependencies import get_code_index
+from src.services.code_index import CodeIndex, CodeIndexError
+
+router = APIRouter(prefix="/index", tags=["code-index"])
+
+@router.get("/definition")
+def get_definition(name: str, path: Optional[str] = None, limit: int = Query(20, ge=1, le=200),
+                   index: CodeIndex = Depends(get_code_index)):
+    """
+    Go to definition
+
+    name is the identifier or dotted name at the cursor; with path, the
+    file's own definitions and the imports it resolves through come first.
+    """
+    try:
+        return index.definition(name, path, limit)
+    except CodeIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/references")
+def get_references(name: str, limit: int = Query(200, ge=1, le=5000), index: CodeIndex = Depends(get_code_index)):
+    """Calls, base classes, decorators and imports that name a symbol"""
+    try:
+        return index.references(name, limit)
+    except CodeIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/symbols")
+def search_symbols(q: str, kind: Optional[str] = None, limit: int = Query(50, ge=1, le=500),
+                   index: CodeIndex = Depends(get_code_index)):
+    """Workspace symbol search: exact names, then prefixes, then substrings"""
+    try:
+        return index.search(q, kind, limit)
+    except CodeIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/outline")
+def get_outline(path: str, index: CodeIndex = Depends(get_code_index)):
+    """Symbols defined in one file, in source order"""
+    return index.outline(path)
+
+@router.post("/sync")
+def sync_index(index: CodeIndex = Depends(get_code_index)):
+    """Re-scan the whole workspace; unchanged files are not re-parsed"""
+    return index.sync()
@@ -1,20 +1,83 @@
-from fastapi import APIRouter, HTTPException
-from src.services.mock_api_service import MockApiService
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from src.api.conditional import catalog_list_response, batch_lookup
+from src.api.dependencies import get_catalog_store, get_component_search
+from src.services.catalog_service import CatalogStore, CatalogError
+from src.services.component_search import ComponentSearchIndex
 
 router = APIRouter(prefix="/components", tags=["components"])
-mock_service = MockApiService()
 
 @router.get("/")
-async def get_components():
-    response = mock_service.get_components()
-    if response.status != "success":
-        raise HTTPException(status_code=500, detail="Failed to fetch components")
-    return response.data["components"]
+async def get_components(
+    request: Request,
+    type: Optional[List[str]] = Query(None),
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    catalog: CatalogStore = Depends(get_catalog_store),
+):
+    """
+    List components, optionally filtered, sorted (sort=-name), projected (fields=id,name) and paginated
+
+    ids=1,2,3 returns just those components; ids that do not exist are listed in X-Missing-Ids.
+    """
+    filters = {"type": type}
+    return catalog_list_response(request, catalog.components, filters, sort, fields, limit, cursor, ids)
+
+@router.get("/search")
+async def search_components(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    type: Optional[str] = None,
+    index: ComponentSearchIndex = Depends(get_component_search),
+):
+    """Components ranked by BM25 over name, type, tags and description, with prefix and typo matching"""
+    results, total = index.search(q, limit, type)
+    return {
+        "query": q,
+        "total": total,
+        "items": [dict(component, score=round(score, 4)) for component, score in results],
+    }
+
+@router.post(":batchGet")
+async def batch_get_components(
+    ids: List[int] = Body(..., embed=True),
+    fields: Optional[str] = Body(None, embed=True),
+    catalog: CatalogStore = Depends(get_catalog_store),
+):
+    """Resolve many components in one call; returns {"items": [...], "missing": [ids]}"""
+    return batch_lookup(catalog.components, ids, fields)
 
 @router.get("/{component_id}")
-async def get_component(component_id: int):
-    components = mock_service.get_components().data["components"]
-    component = next((c for c in components if c["id"] == component_id), None)
+async def get_component(component_id: int, catalog: CatalogStore = Depends(get_catalog_store)):
+    component = catalog.components.get(component_id)
+    if not component:
+        raise HTTPException(status_code=404, detail="Component not found")
+    return component
+
+@router.post("/", status_code=201)
+async def create_component(data: Dict[str, Any] = Body(...), catalog: CatalogStore = Depends(get_catalog_store)):
+    if not data.get("name"):
+        raise HTTPException(status_code=400, detail="Component name is required")
+    try:
+        return catalog.components.create(data)
+    except CatalogError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.put("/{component_id}")
+async def update_component(component_id: int, data: Dict[str, Any] = Body(...),
+                         catalog: CatalogStore = Depends(get_catalog_store)):
+    if not data.get("name"):
+        raise HTTPException(status_code=400, detail="Component name is required")
+    component = catalog.components.update(component_id, data)
     if not component:
         raise HTTPException(status_code=404, detail="Component not found")
     return component
+
+@router.delete("/{component_id}")
+async def delete_component(component_id: int, catalog: CatalogStore = Depends(get_catalog_store)):
+    if not catalog.components.delete(component_id):
+        raise HTTPException(status_code=404, detail="Component not found")
+    return {"deleted": component_id}
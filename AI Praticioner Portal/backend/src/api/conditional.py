@@ -0,0 +1,156 @@
+import gzip
+import json
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from src.services.catalog_service import CatalogCollection, CatalogError, select_fields
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Largest number of ids a single batch lookup may resolve
+MAX_BATCH_IDS = 1000
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 512
+
+CACHE_CONTROL = "no-cache"
+
+class Representation:
+    """
+    A serialized JSON body with its strong ETag and lazily compressed variants
+
+    Instances are memoized per catalog version, so serialization, hashing and
+    compression each happen once per write rather than once per request. Each
+    content-coding gets its own strong ETag ("<hash>-gzip"), as the encoded
+    bytes differ from the identity body.
+    """
+
+    def __init__(self, content: Any):
+        self.body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return self.etag if encoding is None else f"{self.etag[:-1]}-{encoding}\""
+
+    @property
+    def etags(self) -> Tuple[str, ...]:
+        """ETags of every variant of this body"""
+        return (self.etag, self.etag_for("gzip"), self.etag_for("br"))
+
+    def encoded(self, encoding: str) -> bytes:
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    if encoding == "br":
+                        body = brotli.compress(self.body)
+                    else:
+                        body = gzip.compress(self.body, compresslevel=6, mtime=0)
+                    self._encoded[encoding] = body
+        return body
+
+def represent(collection: CatalogCollection) -> Representation:
+    """Representation of the whole collection for its current version"""
+    return collection.memo("representation", lambda: Representation(collection.list()))
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored; any of etags may match"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def conditional_response(request: Request, representation: Representation) -> Response:
+    """200 with the cached body, or 304 when the client already holds this version in any encoding"""
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if len(representation.body) < MIN_COMPRESS_SIZE:
+        encoding = None
+    headers = {"ETag": representation.etag_for(encoding), "Cache-Control": CACHE_CONTROL,
+               "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), *representation.etags):
+        return Response(status_code=304, headers=headers)
+
+    body = representation.body
+    if encoding is not None:
+        body = representation.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def parse_ids(values: List[str]) -> List[int]:
+    """Ids from repeated and/or comma-separated query values"""
+    try:
+        return [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+
+def projected(items: List[Dict[str, Any]], fields: Optional[str]) -> List[Dict[str, Any]]:
+    if not fields:
+        return items
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    return [select_fields(item, selected) for item in items]
+
+def batch_lookup(collection: CatalogCollection, ids: List[int],
+                 fields: Optional[str] = None) -> Dict[str, Any]:
+    """Resolve ids through CatalogCollection.get_many, reporting the ones that do not exist"""
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    items, missing = collection.get_many(ids)
+    return {"items": projected(items, fields), "missing": missing}
+
+def catalog_list_response(request: Request, collection: CatalogCollection, filters: Dict[str, List[Any]],
+                          sort: Optional[str], fields: Optional[str], limit: Optional[int],
+                          cursor: Optional[str], ids: Optional[List[str]] = None) -> Response:
+    """
+    List endpoint shared by the catalog routers
+
+    Without query parameters the whole collection is served from its cached
+    representation. ids=1,2,3 resolves those items in one call and names the
+    ones that do not exist in X-Missing-Ids. Otherwise the query runs against
+    the collection indexes; the body stays a plain list and the next page is
+    named by X-Next-Cursor.
+    """
+    if ids:
+        batch = batch_lookup(collection, parse_ids(ids), fields)
+        headers = {"X-Missing-Ids": ",".join(map(str, batch["missing"]))} if batch["missing"] else None
+        return JSONResponse(content=batch["items"], headers=headers)
+
+    filters = {field: values for field, values in filters.items() if values}
+    if not (filters or sort or fields or limit or cursor):
+        return conditional_response(request, represent(collection))
+
+    try:
+        items, next_cursor = collection.query(filters, sort or "id", limit, cursor)
+    except CatalogError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(content=projected(items, fields), headers=headers)
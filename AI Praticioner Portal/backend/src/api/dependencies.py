@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from src.services.database_service import DatabaseService
+from src.services.async_database_service import AsyncDatabaseService
+from src.services.user_cache import UserCache
+from src.services.password_hasher import PasswordHasher
+from src.services.security_service import SecurityService
+from src.services.user_store import DatabaseUserStore
+from src.services.catalog_service import CatalogStore
+from src.services.component_search import ComponentSearchIndex
+from src.services.workflow_graph import WorkflowStore
+from src.services.workflow_executor import WorkflowExecutor
+from src.services.gemini_service import GeminiService
+from src.services.generation_cache import GenerationCache
+from src.services.workspace_service import Workspace
+from src.services.directory_listing import DirectoryListing
+from src.services.workspace_events import ChangeHub
+from src.services.code_index import CodeIndex
+
+@lru_cache(maxsize=None)
+def get_database_service() -> DatabaseService:
+    """Shared DatabaseService, created on first use so importing the app needs no database"""
+    return DatabaseService(cache=UserCache.from_env())
+
+@lru_cache(maxsize=None)
+def get_async_database_service() -> AsyncDatabaseService:
+    """Shared AsyncDatabaseService for endpoints that should not block the event loop"""
+    return AsyncDatabaseService(cache=UserCache.from_env())
+
+@lru_cache(maxsize=None)
+def get_password_hasher() -> PasswordHasher:
+    """Process-wide bcrypt pool; worker processes start on first use"""
+    return PasswordHasher()
+
+@lru_cache(maxsize=None)
+def get_security_service() -> SecurityService:
+    """Token verification with roles read from the users table, so every worker sees the same roles"""
+    return SecurityService(hasher=get_password_hasher(), user_store=DatabaseUserStore(get_database_service()))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def require_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+                  security: SecurityService = Depends(get_security_service)) -> Dict[str, Any]:
+    """Claims and roles of the caller's bearer token; 401 without a valid token, 403 without the admin role"""
+    identity = security.authorize(credentials.credentials) if credentials else None
+    if identity is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if "admin" not in identity["roles"]:
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return identity
+
+@lru_cache(maxsize=None)
+def get_gemini_service() -> GeminiService:
+    """Shared Gemini client so generation requests reuse pooled connections and cached completions"""
+    return GeminiService(cache=GenerationCache.from_env())
+
+@lru_cache(maxsize=None)
+def get_catalog_store() -> CatalogStore:
+    """Projects and components catalog, persisted at CATALOG_PATH when set"""
+    return CatalogStore.from_env()
+
+
+@lru_cache(maxsize=None)
+def _component_search_index(catalog: CatalogStore) -> ComponentSearchIndex:
+    return ComponentSearchIndex.for_collection(catalog.components)
+
+def get_component_search(catalog: CatalogStore = Depends(get_catalog_store)) -> ComponentSearchIndex:
+    """Search index over the catalog's components, built once per store and then updated on writes"""
+    return _component_search_index(catalog)
+
+@lru_cache(maxsize=None)
+def get_workflow_executor() -> WorkflowExecutor:
+    """Shared workflow runtime; its memoized node results are reused across runs"""
+    return WorkflowExecutor()
+
+@lru_cache(maxsize=None)
+def _workflow_store(catalog: CatalogStore) -> WorkflowStore:
+    return WorkflowStore(catalog.components)
+
+def get_workflow_store(catalog: CatalogStore = Depends(get_catalog_store)) -> WorkflowStore:
+    """Agent Builder workflows, validated against the catalog's components"""
+    return _workflow_store(catalog)
+
+@lru_cache(maxsize=None)
+def get_workspace() -> Workspace:
+    """IDE workspace files under WORKSPACE_ROOT"""
+    return Workspace.from_env()
+
+@lru_cache(maxsize=None)
+def _directory_listing(workspace: Workspace) -> DirectoryListing:
+    return DirectoryListing.for_workspace(workspace)
+
+def get_directory_listing(workspace: Workspace = Depends(get_workspace)) -> DirectoryListing:
+    """Cached one-level listings of the workspace, invalidated by its writes and by watchdog when installed"""
+    return _directory_listing(workspace)
+
+@lru_cache(maxsize=None)
+def _change_hub(listing: DirectoryListing) -> ChangeHub:
+    return ChangeHub.from_env(listing.workspace, is_ignored=listing.is_ignored_below)
+
+def get_change_hub(listing: DirectoryListing = Depends(get_directory_listing)) -> ChangeHub:
+    """Debounced workspace change events for WebSocket clients, skipping ignored paths"""
+    return _change_hub(listing)
+
+@lru_cache(maxsize=None)
+def _code_index(listing: DirectoryListing) -> CodeIndex:
+    return CodeIndex.from_env(listing.workspace, is_ignored=listing.is_ignored_below)
+
+def get_code_index(listing: DirectoryListing = Depends(get_directory_listing)) -> CodeIndex:
+    """Semantic index of the workspace's Python files, persisted at CODE_INDEX_PATH"""
+    return _code_index(listing)
@@ -0,0 +1,104 @@
+import os
+import json
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from src.api.dependencies import get_change_hub
+from src.services.workspace_events import ChangeHub, Subscription
+from src.services.workspace_service import WorkspaceError
+
+# Changes a client may have pending before it is told to resync
+MAX_PENDING = int(os.getenv("WS_MAX_PENDING", "1000"))
+# Changes per message
+BATCH_SIZE = int(os.getenv("WS_BATCH_SIZE", "200"))
+MAX_PATHS = 100
+MAX_MESSAGE_BYTES = 64 * 1024
+MAX_REPLIES = 64
+
+router = APIRouter(tags=["events"])
+
+async def send_messages(websocket: WebSocket, replies: Deque[Dict[str, Any]],
+                        subscriptions: Dict[str, Subscription], wakeup: asyncio.Event) -> None:
+    """Single writer for the socket; while a send is blocked, new changes coalesce in the subscriptions"""
+    while True:
+        await wakeup.wait()
+        wakeup.clear()
+        while replies:
+            await websocket.send_json(replies.popleft())
+        for channel, subscription in list(subscriptions.items()):
+            message = subscription.drain(BATCH_SIZE)
+            if message is not None:
+                await websocket.send_json(dict(message, channel=channel))
+
+@router.websocket("/ws")
+async def events_socket(websocket: WebSocket, hub: ChangeHub = Depends(get_change_hub)):
+    """
+    Multiplexed push channel for the IDE
+
+    Clients send {"op": "subscribe", "channel": "files", "paths": ["/src"]},
+    {"op": "unsubscribe", "channel": "files"} or {"op": "ping"}. The files
+    channel pushes {"type": "changes", "changes": [{type, path, kind, size,
+    hash}]} with created, modified and deleted events, debounced and
+    coalesced per path, or {"type": "resync"} when the client fell too far
+    behind and should re-fetch what it shows.
+    """
+    await websocket.accept()
+    hubs = {"files": hub}
+    wakeup = asyncio.Event()
+    replies: Deque[Dict[str, Any]] = deque()
+    subscriptions: Dict[str, Subscription] = {}
+    sender = asyncio.create_task(send_messages(websocket, replies, subscriptions, wakeup))
+
+    def reply(message: Dict[str, Any]) -> None:
+        replies.append(message)
+        wakeup.set()
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            if len(replies) >= MAX_REPLIES:
+                await websocket.close(code=1008, reason="Too many unanswered messages")
+                break
+            try:
+                if len(text) > MAX_MESSAGE_BYTES:
+                    raise ValueError("Message too large")
+                message = json.loads(text)
+                op, channel = message.get("op"), message.get("channel")
+            except (ValueError, AttributeError) as e:
+                reply({"type": "error", "detail": f"Invalid message: {e}"})
+                continue
+            if op == "ping":
+                reply({"type": "pong"})
+            elif not isinstance(channel, str):
+                reply({"type": "error", "detail": "channel must be a string"})
+            elif channel not in hubs:
+                reply({"type": "error", "detail": f"Unknown channel: {channel}"})
+            elif op == "subscribe":
+                paths = message.get("paths") or ["/"]
+                try:
+                    if not isinstance(paths, list) or len(paths) > MAX_PATHS:
+                        raise WorkspaceError(f"paths must be a list of at most {MAX_PATHS} paths")
+                    prefixes = [hub.workspace.relative(hub.workspace.resolve(str(path))) for path in paths]
+                except WorkspaceError as e:
+                    reply({"type": "error", "channel": channel, "detail": str(e)})
+                    continue
+                if channel in subscriptions:
+                    hubs[channel].unsubscribe(subscriptions.pop(channel))
+                subscription = Subscription(wakeup, prefixes, MAX_PENDING)
+                hubs[channel].subscribe(subscription)
+                subscriptions[channel] = subscription
+                reply({"type": "subscribed", "channel": channel, "paths": prefixes})
+            elif op == "unsubscribe":
+                if channel in subscriptions:
+                    hubs[channel].unsubscribe(subscriptions.pop(channel))
+                reply({"type": "unsubscribed", "channel": channel})
+            else:
+                reply({"type": "error", "detail": f"Unknown op: {op}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for channel, subscription in subscriptions.items():
+            hubs[channel].unsubscribe(subscription)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
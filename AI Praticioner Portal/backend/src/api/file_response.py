@@ -0,0 +1,53 @@
+import os
+from typing import BinaryIO, Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+class FileRangeResponse(Response):
+    """
+    Stream a byte range of an already opened file
+
+    Servers implementing the ASGI zero-copy send extension get the file
+    descriptor and transfer it with sendfile. Otherwise the range is read
+    with pread in CHUNK_SIZE pieces off the event loop, so at most one chunk
+    per response is held in memory whatever the file size. The response
+    closes the file.
+    """
+
+    def __init__(self, file: BinaryIO, start: int, length: int, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None, media_type: Optional[str] = None):
+        self.file = file
+        self.start = start
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.body = b""
+        self.init_headers(dict(headers or {}, **{"content-length": str(length)}))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope.get("method") == "HEAD" or not self.length:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({"type": ZEROCOPY_EXTENSION, "file": self.file, "offset": self.start,
+                            "count": self.length, "more_body": False})
+            else:
+                fd = self.file.fileno()
+                offset, end = self.start, self.start + self.length
+                while offset < end:
+                    chunk = await run_in_threadpool(os.pread, fd, min(CHUNK_SIZE, end - offset), offset)
+                    if not chunk:
+                        # Truncated since it was opened; the client sees a short body
+                        break
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": offset < end})
+                if offset < end:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
@@ -0,0 +1,233 @@
+import os
+import mimetypes
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from src.api.dependencies import get_workspace, get_directory_listing
+from src.api.file_response import FileRangeResponse
+from src.services.directory_listing import DirectoryListing
+from src.services.workspace_service import (Workspace, WorkspaceError, FileTooLargeError, UploadOffsetError,
+                                            ConflictError, TextEdit, file_etag, language_for, parse_range,
+                                            parse_content_range)
+
+# Largest file /files/content returns inline; larger files are read through /files/raw in ranges
+INLINE_MAX_BYTES = int(os.getenv("WORKSPACE_INLINE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+router = APIRouter(tags=["files"])
+
+class FileEdit(BaseModel):
+    offset: int = Field(..., ge=0)
+    length: int = Field(..., ge=0)
+    text: str = ""
+
+class FileSaveRequest(BaseModel):
+    path: str
+    content: Optional[str] = None
+    edits: Optional[List[FileEdit]] = None
+    base_hash: Optional[str] = None
+
+@contextmanager
+def workspace_errors() -> Iterator[None]:
+    try:
+        yield
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="File already exists")
+    except IsADirectoryError:
+        raise HTTPException(status_code=400, detail="Path is a directory")
+    except NotADirectoryError:
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+    except (UploadOffsetError, ConflictError):
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except WorkspaceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/files")
+def get_file_structure(path: str = "/", depth: int = Query(1, ge=0),
+                       listing: DirectoryListing = Depends(get_directory_listing)):
+    """
+    Workspace tree as nested {name, path, type, children} nodes, skipping ignored directories
+
+    Only depth levels are returned, one by default; deeper directories come back without
+    children and are expanded through /directories, so a refresh costs the visible levels
+    rather than the whole workspace.
+    """
+    with workspace_errors():
+        return listing.tree(path, depth)
+
+@router.post("/files", status_code=201)
+def create_file(path: str = Body(..., embed=True), content: str = Body("", embed=True),
+                workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        return workspace.write_text(path, content, create=True)
+
+@router.delete("/files")
+def delete_file(path: str, workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        workspace.delete_file(path)
+    return {"deleted": path}
+
+@router.get("/files/content")
+def get_file_content(path: str, workspace: Workspace = Depends(get_workspace)):
+    """
+    Text content of a file for the editor
+
+    Files over WORKSPACE_INLINE_MAX_BYTES are rejected with 413; read them
+    from /files/raw with Range requests instead.
+    """
+    with workspace_errors():
+        text = workspace.read_text(path, INLINE_MAX_BYTES)
+    return {"path": path, "content": text.content, "language": language_for(path), "size": text.stat.st_size,
+            "etag": file_etag(text.stat), "hash": text.hash}
+
+@router.put("/files/content")
+def save_file(request: FileSaveRequest, workspace: Workspace = Depends(get_workspace)):
+    """
+    Save a file from its full content, or from edits against base_hash
+
+    Edits are {offset, length, text} in editor (UTF-16) offsets, applied in
+    order, so a save costs bytes proportional to the change. A base_hash
+    that is not the file's current hash, with either form, answers 409 with
+    the current hash; the replaced version is kept in /files/history. The
+    hash of a file too large for /files/content is the X-Content-Hash header
+    of HEAD /files/raw. Files over WORKSPACE_SAVE_MAX_BYTES answer 413.
+    """
+    edits = None
+    if request.edits is not None:
+        edits = [TextEdit(edit.offset, edit.length, edit.text) for edit in request.edits]
+    try:
+        with workspace_errors():
+            return workspace.save(request.path, request.content, edits, request.base_hash)
+    except ConflictError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "current_hash": e.current_hash})
+
+@router.get("/files/history")
+def get_file_history(path: str, workspace: Workspace = Depends(get_workspace)):
+    """Previous versions of a file as {hash, size, saved}, newest first"""
+    with workspace_errors():
+        return workspace.versions(path)
+
+@router.get("/files/history/content")
+def get_file_version(path: str, hash: str, workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        return {"path": path, "hash": hash, "content": workspace.read_version(path, hash)}
+
+@router.api_route("/files/raw", methods=["GET", "HEAD"])
+def get_file_raw(request: Request, path: str, workspace: Workspace = Depends(get_workspace)):
+    """
+    Stream a file's bytes, honouring Range, If-Range and If-None-Match
+
+    A single byte range is answered with 206 and Content-Range; multiple
+    ranges are not supported and get the whole file. HEAD also returns the
+    content hash in X-Content-Hash, for delta saves of large files.
+    """
+    with workspace_errors():
+        file, stat = workspace.open(path)
+    etag = file_etag(stat)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "no-cache"}
+    if request.method == "HEAD":
+        try:
+            with workspace_errors():
+                headers["X-Content-Hash"] = workspace.file_hash(path)
+        except HTTPException:
+            file.close()
+            raise
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        file.close()
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except WorkspaceError:
+        file.close()
+        return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{stat.st_size}"}))
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if byte_range is None:
+        return FileRangeResponse(file, 0, stat.st_size, headers=headers, media_type=media_type)
+    headers["Content-Range"] = f"bytes {byte_range.start}-{byte_range.end}/{stat.st_size}"
+    return FileRangeResponse(file, byte_range.start, byte_range.length, status_code=206, headers=headers,
+                             media_type=media_type)
+
+@router.get("/files/upload")
+def get_upload_status(path: str, workspace: Workspace = Depends(get_workspace)):
+    """Bytes received so far for an interrupted chunked upload, to resume from"""
+    with workspace_errors():
+        return {"path": path, "received": workspace.upload_offset(path)}
+
+@router.put("/files/upload")
+async def upload_file(request: Request, response: Response, path: str,
+                      workspace: Workspace = Depends(get_workspace)):
+    """
+    Upload a file as a raw request body, optionally in chunks
+
+    Each chunk carries Content-Range: bytes start-end/total and must start
+    where the previous one ended. Partial uploads answer 202 with the bytes
+    received; the final chunk moves the file into place and answers 201.
+    Without Content-Range the body is the whole file. The body is written
+    to disk as it arrives, never buffered whole.
+    """
+    with workspace_errors():
+        content_range = parse_content_range(request.headers.get("content-range"))
+    start = content_range[0] if content_range else 0
+    try:
+        with workspace_errors():
+            part = await run_in_threadpool(workspace.begin_chunk, path, start)
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "received": e.received})
+
+    written = 0
+    file = await run_in_threadpool(open, part, "ab")
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(file.write, chunk)
+                written += len(chunk)
+        if content_range and written != content_range[1] - content_range[0] + 1:
+            await run_in_threadpool(file.truncate, start)
+            raise HTTPException(status_code=400, detail="Chunk length does not match Content-Range")
+    finally:
+        await run_in_threadpool(file.close)
+
+    if content_range and content_range[1] + 1 < content_range[2]:
+        response.status_code = 202
+        return {"path": path, "received": content_range[1] + 1}
+    response.status_code = 201
+    with workspace_errors():
+        return await run_in_threadpool(workspace.finish_upload, path)
+
+@router.delete("/files/upload")
+def cancel_upload(path: str, workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        workspace.discard_upload(path)
+    return {"cancelled": path}
+
+@router.get("/directories")
+def list_directory(path: str = "/", limit: Optional[int] = Query(None, ge=1, le=5000), cursor: Optional[str] = None,
+                   listing: DirectoryListing = Depends(get_directory_listing)):
+    """Entries directly inside a directory, directories first; the next page is named by X-Next-Cursor"""
+    with workspace_errors():
+        entries, next_cursor = listing.list(path, limit, cursor)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(content=entries, headers=headers)
+
+@router.post("/directories", status_code=201)
+def create_directory(path: str = Body(..., embed=True), workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        return workspace.create_directory(path)
+
+@router.delete("/directories")
+def delete_directory(path: str, workspace: Workspace = Depends(get_workspace)):
+    with workspace_errors():
+        workspace.delete_directory(path)
+    return {"deleted": path}
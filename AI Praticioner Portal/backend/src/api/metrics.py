@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends
+from src.api.dependencies import (get_database_service, get_password_hasher, get_workflow_executor, get_gemini_service,
+                                  get_directory_listing, get_change_hub, get_code_index)
+from src.services.database_service import DatabaseService
+from src.services.password_hasher import PasswordHasher
+from src.services.workflow_executor import WorkflowExecutor
+from src.services.gemini_service import GeminiService
+from src.services.directory_listing import DirectoryListing
+from src.services.workspace_events import ChangeHub
+from src.services.code_index import CodeIndex
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/db")
+async def get_database_metrics(db: DatabaseService = Depends(get_database_service)):
+    """Statement latency, slow queries, pool usage and user cache counters"""
+    metrics = db.metrics.snapshot()
+    metrics["user_cache"] = db.cache.stats() if db.cache is not None else None
+    return metrics
+
+@router.get("/hashing")
+async def get_hashing_metrics(hasher: PasswordHasher = Depends(get_password_hasher)):
+    """Password hashing pool queue depth and throughput counters"""
+    return hasher.stats()
+
+@router.get("/workflows")
+async def get_workflow_metrics(executor: WorkflowExecutor = Depends(get_workflow_executor)):
+    """Workflow runtime concurrency limit and node result memo counters"""
+    return executor.stats()
+
+@router.get("/generation")
+async def get_generation_metrics(gemini: GeminiService = Depends(get_gemini_service)):
+    """Code generation time to first token, latency and error counters"""
+    return gemini.stats()
+
+@router.get("/files")
+async def get_file_metrics(listing: DirectoryListing = Depends(get_directory_listing)):
+    """Directory listing cache counters and whether filesystem events are watched"""
+    return listing.stats()
+
+@router.get("/events")
+async def get_event_metrics(hub: ChangeHub = Depends(get_change_hub)):
+    """WebSocket subscriptions, published changes and changes dropped for slow clients"""
+    return hub.stats()
+
+@router.get("/index")
+def get_index_metrics(index: CodeIndex = Depends(get_code_index)):
+    """Indexed files, symbols and references, and re-parse counters"""
+    return index.stats()
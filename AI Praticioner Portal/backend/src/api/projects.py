@@ -1,20 +1,68 @@
-from fastapi import APIRouter, HTTPException
-from src.services.mock_api_service import MockApiService
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from src.api.conditional import catalog_list_response, batch_lookup
+from src.api.dependencies import get_catalog_store
+from src.services.catalog_service import CatalogStore, CatalogError
 
 router = APIRouter(prefix="/projects", tags=["projects"])
-mock_service = MockApiService()
 
 @router.get("/")
-async def get_projects():
-    response = mock_service.get_projects()
-    if response.status != "success":
-        raise HTTPException(status_code=500, detail="Failed to fetch projects")
-    return response.data["projects"]
+async def get_projects(
+    request: Request,
+    owner: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    ids: Optional[List[str]] = Query(None),
+    catalog: CatalogStore = Depends(get_catalog_store),
+):
+    """
+    List projects, optionally filtered, sorted (sort=-name), projected (fields=id,name) and paginated
+
+    ids=1,2,3 returns just those projects; ids that do not exist are listed in X-Missing-Ids.
+    """
+    filters = {"owner": owner, "status": status}
+    return catalog_list_response(request, catalog.projects, filters, sort, fields, limit, cursor, ids)
+
+@router.post(":batchGet")
+async def batch_get_projects(
+    ids: List[int] = Body(..., embed=True),
+    fields: Optional[str] = Body(None, embed=True),
+    catalog: CatalogStore = Depends(get_catalog_store),
+):
+    """Resolve many projects in one call; returns {"items": [...], "missing": [ids]}"""
+    return batch_lookup(catalog.projects, ids, fields)
 
 @router.get("/{project_id}")
-async def get_project(project_id: int):
-    projects = mock_service.get_projects().data["projects"]
-    project = next((p for p in projects if p["id"] == project_id), None)
+async def get_project(project_id: int, catalog: CatalogStore = Depends(get_catalog_store)):
+    project = catalog.projects.get(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
+
+@router.post("/", status_code=201)
+async def create_project(data: Dict[str, Any] = Body(...), catalog: CatalogStore = Depends(get_catalog_store)):
+    if not data.get("name"):
+        raise HTTPException(status_code=400, detail="Project name is required")
+    try:
+        return catalog.projects.create(data)
+    except CatalogError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.put("/{project_id}")
+async def update_project(project_id: int, data: Dict[str, Any] = Body(...),
+                         catalog: CatalogStore = Depends(get_catalog_store)):
+    if not data.get("name"):
+        raise HTTPException(status_code=400, detail="Project name is required")
+    project = catalog.projects.update(project_id, data)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+@router.delete("/{project_id}")
+async def delete_project(project_id: int, catalog: CatalogStore = Depends(get_catalog_store)):
+    if not catalog.projects.delete(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"deleted": project_id}
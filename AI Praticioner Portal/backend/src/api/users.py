@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from src.api.dependencies import get_async_database_service, get_database_service, require_admin
+from src.services.async_database_service import AsyncDatabaseService
+from src.services.database_service import DatabaseService, DatabaseError, decode_cursor
+from src.services.user_search import MATCH_MODES
+from src.services.user_transfer import (
+    EXPORT_CSV_FIELDS, UserTransferError, detect_format, iter_user_records, iter_ndjson, iter_csv,
+    without_password_hashes,
+)
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+@router.post("/import", dependencies=[Depends(require_admin)])
+async def import_users(
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = 1000,
+    db: DatabaseService = Depends(get_database_service),
+):
+    """Stream an NDJSON or CSV body into the users table in batches"""
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be at least 1")
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except UserTransferError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    inserted = 0
+    conflicts = []
+    batch = []
+    batch_indexes = []
+
+    async def flush():
+        nonlocal inserted
+        result = await run_in_threadpool(db.store_users_bulk, batch, batch_size)
+        inserted += result["inserted"]
+        for conflict in result["conflicts"]:
+            conflicts.append(dict(conflict, index=batch_indexes[conflict["index"]]))
+        batch.clear()
+        batch_indexes.clear()
+
+    index = 0
+    try:
+        async for record, error in iter_user_records(request.stream(), fmt):
+            if error:
+                conflicts.append({"index": index, "username": None, "error": error})
+            else:
+                batch.append(record)
+                batch_indexes.append(index)
+                if len(batch) >= batch_size:
+                    await flush()
+            index += 1
+        if batch:
+            await flush()
+    except DatabaseError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"inserted": inserted, "conflicts": conflicts}
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+async def export_users(
+    format: str = "ndjson",
+    chunk_size: int = 1000,
+    include_password_hashes: bool = False,
+    db: DatabaseService = Depends(get_database_service),
+):
+    """
+    Stream every user as NDJSON or CSV without loading the table into memory
+
+    hashed_password is left out unless include_password_hashes is set, e.g.
+    to migrate accounts into another deployment.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+    try:
+        fmt = detect_format(None, format)
+    except UserTransferError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunks = db.export_users(chunk_size)
+    fields = EXPORT_CSV_FIELDS
+    if not include_password_hashes:
+        chunks = without_password_hashes(chunks)
+        fields = [field for field in fields if field != "hashed_password"]
+    if fmt == "csv":
+        return StreamingResponse(iter_csv(chunks, fields), media_type="text/csv")
+    return StreamingResponse(iter_ndjson(chunks), media_type="application/x-ndjson")
+
+# Largest page the read endpoints return
+MAX_PAGE_SIZE = 100
+
+def public_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in user.items() if key != "hashed_password"}
+
+def public_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    """A list_users/search_users page without password hashes"""
+    return dict(page, users=[public_user(user) for user in page["users"]])
+
+def check_cursor(cursor: Optional[str]) -> None:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except DatabaseError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", dependencies=[Depends(require_admin)])
+async def list_users(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncDatabaseService = Depends(get_async_database_service),
+):
+    """Page through users in id order; pass next_cursor back as cursor for keyset paging"""
+    check_cursor(cursor)
+    try:
+        return public_page(await db.list_users(page, page_size, cursor, include_total))
+    except DatabaseError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search", dependencies=[Depends(require_admin)])
+async def search_users(
+    q: str = "",
+    roles: Optional[List[str]] = Query(None),
+    match: str = "contains",
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncDatabaseService = Depends(get_async_database_service),
+):
+    """Users whose username matches q and who hold all of roles"""
+    if match not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"match must be one of {', '.join(MATCH_MODES)}")
+    check_cursor(cursor)
+    try:
+        return public_page(await db.search_users(q, roles, page, page_size, cursor, include_total, match))
+    except DatabaseError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{username}", dependencies=[Depends(require_admin)])
+async def get_user(username: str, db: AsyncDatabaseService = Depends(get_async_database_service)):
+    """One user by username, served through the user cache"""
+    try:
+        user = await db.get_user(username)
+    except DatabaseError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return public_user(user)
@@ -0,0 +1,120 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from src.api.dependencies import get_workflow_store, get_workflow_executor
+from src.services.workflow_graph import WorkflowGraph, WorkflowStore, GraphError
+from src.services.workflow_executor import WorkflowExecutor, ExecutionError
+
+router = APIRouter(prefix="/workflows", tags=["workflows"])
+
+def get_graph(workflow_id: str, store: WorkflowStore) -> WorkflowGraph:
+    graph = store.get(workflow_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return graph
+
+@router.post("/validate")
+async def validate_workflow(data: Dict[str, Any] = Body(...), store: WorkflowStore = Depends(get_workflow_store)):
+    """Validate a full {nodes, edges} graph without storing it"""
+    try:
+        graph = WorkflowGraph.from_dict(data, store.lookup)
+    except GraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return graph.summary(include_order=True)
+
+@router.post("/", status_code=201)
+async def create_workflow(data: Dict[str, Any] = Body(...), store: WorkflowStore = Depends(get_workflow_store)):
+    try:
+        workflow_id, graph = store.create(data)
+    except GraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dict(graph.summary(include_order=True), id=workflow_id)
+
+@router.get("/{workflow_id}")
+async def get_workflow(workflow_id: str, store: WorkflowStore = Depends(get_workflow_store)):
+    graph = get_graph(workflow_id, store)
+    return dict(graph.to_dict(), id=workflow_id, validation=graph.summary())
+
+@router.delete("/{workflow_id}")
+async def delete_workflow(workflow_id: str, store: WorkflowStore = Depends(get_workflow_store)):
+    if not store.delete(workflow_id):
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return {"deleted": workflow_id}
+
+@router.get("/{workflow_id}/validation")
+async def get_workflow_validation(workflow_id: str, store: WorkflowStore = Depends(get_workflow_store)):
+    """Issues, cycles and the topological execution order"""
+    return get_graph(workflow_id, store).summary(include_order=True)
+
+@router.put("/{workflow_id}/nodes/{node_id}")
+async def put_workflow_node(workflow_id: str, node_id: str, node: Dict[str, Any] = Body(...),
+                            store: WorkflowStore = Depends(get_workflow_store)):
+    """Add or replace a node; only it and its edges are re-validated"""
+    graph = get_graph(workflow_id, store)
+    graph.put_node(dict(node, id=node_id))
+    return graph.summary()
+
+@router.delete("/{workflow_id}/nodes/{node_id}")
+async def delete_workflow_node(workflow_id: str, node_id: str, store: WorkflowStore = Depends(get_workflow_store)):
+    graph = get_graph(workflow_id, store)
+    try:
+        graph.remove_node(node_id)
+    except GraphError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return graph.summary()
+
+@router.post("/{workflow_id}/edges", status_code=201)
+async def add_workflow_edge(workflow_id: str, edge: Dict[str, Any] = Body(...),
+                            store: WorkflowStore = Depends(get_workflow_store)):
+    """Add an edge; an edge closing a cycle is kept and reported as an issue"""
+    graph = get_graph(workflow_id, store)
+    try:
+        graph.add_edge(edge)
+    except GraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return graph.summary()
+
+@router.delete("/{workflow_id}/edges/{edge_id}")
+async def delete_workflow_edge(workflow_id: str, edge_id: str, store: WorkflowStore = Depends(get_workflow_store)):
+    graph = get_graph(workflow_id, store)
+    try:
+        graph.remove_edge(edge_id)
+    except GraphError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return graph.summary()
+
+async def sse_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.post("/{workflow_id}/run")
+async def run_workflow(
+    workflow_id: str,
+    inputs: Optional[Dict[str, Any]] = Body(None, embed=True),
+    use_cache: bool = Body(True, embed=True),
+    stream: bool = True,
+    store: WorkflowStore = Depends(get_workflow_store),
+    executor: WorkflowExecutor = Depends(get_workflow_executor),
+):
+    """
+    Execute a workflow
+
+    With stream=true (the default) per-node events are sent as server-sent
+    events as nodes start and finish; otherwise the events are collected and
+    returned together with the final result.
+    """
+    graph = get_graph(workflow_id, store)
+    if graph.summary()["cycle_count"]:
+        raise HTTPException(status_code=400, detail="Workflow contains cycles")
+    # Run a snapshot so edits made while the run is in flight do not affect it
+    snapshot = WorkflowGraph.from_dict(graph.to_dict(), graph.lookup)
+    events = executor.execute(snapshot, inputs, use_cache)
+    if stream:
+        return StreamingResponse(sse_events(events), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    try:
+        collected = [event async for event in events]
+    except ExecutionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return dict(collected[-1], events=collected[:-1])
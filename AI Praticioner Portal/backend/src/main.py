@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.api import projects, components, code_generator
+from src.api import projects, components, code_generator, users, metrics, workflows, files, events, code_index
 
 app = FastAPI(
     title="AI Practitioner Canvas API",
@@ -15,12 +15,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Content-Hash", "Content-Range", "Accept-Ranges", "Content-Length"],
 )
 
 # Include routers
 app.include_router(projects.router)
 app.include_router(components.router)
 app.include_router(code_generator.router)
+app.include_router(users.router)
+app.include_router(metrics.router)
+app.include_router(workflows.router)
+app.include_router(files.router)
+app.include_router(events.router)
+app.include_router(code_index.router)
 
 @app.get("/")
 async def root():
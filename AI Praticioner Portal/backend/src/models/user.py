@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
 Base = declarative_base()
@@ -13,3 +13,12 @@ class User(Base):
     roles = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    role_links = relationship("UserRole", cascade="all, delete-orphan")
+
+class UserRole(Base):
+    """Normalized copy of User.roles, one row per (user, role), indexed by role"""
+    __tablename__ = "user_roles"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    role = Column(String, primary_key=True, index=True)
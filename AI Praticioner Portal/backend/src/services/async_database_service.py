@@ -0,0 +1,210 @@
+import os
+import asyncio
+from typing import Dict, Any, Optional, List
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import selectinload
+from dotenv import load_dotenv
+from ..models.user import Base, User
+from .user_search import UserSearchIndex
+from .user_cache import UserCache
+from .db_metrics import DatabaseMetrics
+from .database_service import (
+    DatabaseError, CountCache, DEFAULT_COUNT_CACHE_TTL, DEFAULT_SLOW_QUERY_MS, SQL_ECHO, USER_REQUIRED_FIELDS,
+    serialize_user, build_user, apply_user_update, page_statement, count_statement,
+    build_page, search_statement
+)
+
+# Load environment variables
+load_dotenv()
+
+# Async drivers used when a URL names only the backend (e.g. postgresql://)
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def to_async_url(db_url: str) -> str:
+    """Rewrite a sync database URL to use the matching asyncio driver"""
+    url = make_url(db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise DatabaseError(f"No async driver configured for {backend}")
+    if url.get_driver_name() != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+class AsyncDatabaseService:
+    """
+    asyncio counterpart of DatabaseService with the same method surface
+
+    Queries run on SQLAlchemy's asyncio engine, so endpoints awaiting them
+    release the event loop while the database round-trip is in flight. Tables
+    and search indexes are created on first use.
+    """
+
+    def __init__(self, db_url: Optional[str] = None, count_cache_ttl: float = DEFAULT_COUNT_CACHE_TTL,
+                 pool_size: int = 20, max_overflow: int = 80, cache: Optional[UserCache] = None,
+                 slow_query_threshold_ms: float = DEFAULT_SLOW_QUERY_MS):
+        """Initialize the async database service"""
+        self._counts = CountCache(count_cache_ttl)
+        self.cache = cache
+        self.metrics = DatabaseMetrics(slow_query_threshold_ms)
+        self.search_index = UserSearchIndex()
+        self._ready = False
+        self._ready_lock = asyncio.Lock()
+        try:
+            # Use provided URL or environment variable
+            if db_url is None:
+                db_url = os.getenv("DATABASE_URL")
+                if not db_url:
+                    raise DatabaseError("DATABASE_URL environment variable not set")
+
+            async_url = to_async_url(db_url)
+            engine_args: Dict[str, Any] = {}
+            if not async_url.startswith("sqlite"):
+                engine_args.update(pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+            self.engine = create_async_engine(async_url, echo=SQL_ECHO, **engine_args)
+            self.metrics.attach(self.engine.sync_engine)
+            self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+
+            if async_url.startswith("sqlite"):
+                @event.listens_for(self.engine.sync_engine, "connect")
+                def set_sqlite_pragma(dbapi_connection, connection_record):
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute("PRAGMA foreign_keys=ON")
+                    cursor.close()
+        except (SQLAlchemyError, ImportError) as e:
+            raise DatabaseError(f"Failed to initialize database connection: {str(e)}") from e
+
+    async def initialize(self) -> None:
+        """Create tables and search indexes; called automatically before the first query"""
+        if self._ready:
+            return
+        async with self._ready_lock:
+            if self._ready:
+                return
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                    await conn.run_sync(self.search_index.install)
+            except SQLAlchemyError as e:
+                raise DatabaseError(f"Failed to initialize database connection: {str(e)}") from e
+            self._ready = True
+
+    async def _session(self) -> AsyncSession:
+        await self.initialize()
+        return self.SessionLocal()
+
+    async def close(self) -> None:
+        """Dispose of the connection pool"""
+        await self.engine.dispose()
+
+    async def store_user(self, user_data: Dict[str, Any]) -> bool:
+        """Store a new user; see DatabaseService.store_user"""
+        if not all(field in user_data for field in USER_REQUIRED_FIELDS):
+            raise DatabaseError("Missing required fields in user data")
+
+        try:
+            async with await self._session() as db:
+                db.add(build_user(user_data))
+                await db.commit()
+                self._counts.clear()
+                return True
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to store user: {str(e)}")
+
+    async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """Retrieve user data by username; see DatabaseService.get_user"""
+        if self.cache is not None:
+            cached = await self.cache.get_async(username)
+            if cached is not None:
+                return cached
+
+        try:
+            async with await self._session() as db:
+                user = await db.scalar(select(User).where(User.username == username))
+                if user:
+                    data = serialize_user(user)
+                    if self.cache is not None:
+                        await self.cache.set_async(username, data)
+                    return data
+                return None
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to get user: {str(e)}")
+
+    async def _paginate(self, db: AsyncSession, stmt, count_key: Any, page: int, page_size: int,
+                        cursor: Optional[str], include_total: bool) -> Dict[str, Any]:
+        page_stmt = page_statement(stmt, page, page_size, cursor)
+
+        total = None
+        if include_total:
+            total = self._counts.get(count_key)
+            if total is None:
+                total = await db.scalar(count_statement(stmt))
+                self._counts.set(count_key, total)
+
+        users = (await db.scalars(page_stmt)).all()
+        return build_page(users, page, page_size, total)
+
+    async def list_users(self, page: int = 1, page_size: int = 10, cursor: Optional[str] = None,
+                         include_total: bool = True) -> Dict[str, Any]:
+        """List all users with pagination; see DatabaseService.list_users"""
+        try:
+            async with await self._session() as db:
+                return await self._paginate(db, select(User), ("list",), page, page_size, cursor, include_total)
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to list users: {str(e)}")
+
+    async def search_users(self, query: str = "", roles: Optional[List[str]] = None, page: int = 1,
+                           page_size: int = 10, cursor: Optional[str] = None, include_total: bool = True,
+                           match: str = "contains") -> Dict[str, Any]:
+        """Search users by username or role; see DatabaseService.search_users"""
+        try:
+            async with await self._session() as db:
+                stmt, count_key = search_statement(self.search_index, query, roles, match)
+                return await self._paginate(db, stmt, count_key, page, page_size, cursor, include_total)
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to search users: {str(e)}")
+
+    async def _load_for_write(self, db: AsyncSession, username: str) -> User:
+        # Role links are loaded eagerly; lazy loads are not allowed under asyncio
+        user = await db.scalar(
+            select(User).options(selectinload(User.role_links)).where(User.username == username)
+        )
+        if not user:
+            raise DatabaseError(f"User {username} does not exist")
+        return user
+
+    async def update_user(self, username: str, updated_data: Dict[str, Any]) -> bool:
+        """Update existing user data; see DatabaseService.update_user"""
+        if not all(field in updated_data for field in USER_REQUIRED_FIELDS):
+            raise DatabaseError("Missing required fields in updated data")
+
+        try:
+            async with await self._session() as db:
+                user = await self._load_for_write(db, username)
+                apply_user_update(user, updated_data)
+                await db.commit()
+                self._counts.clear()
+                if self.cache is not None:
+                    await self.cache.invalidate_async(username, updated_data["username"])
+                return True
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to update user: {str(e)}")
+
+    async def delete_user(self, username: str) -> bool:
+        """Delete a user from the database; see DatabaseService.delete_user"""
+        try:
+            async with await self._session() as db:
+                user = await self._load_for_write(db, username)
+                await db.delete(user)
+                await db.commit()
+                self._counts.clear()
+                if self.cache is not None:
+                    await self.cache.invalidate_async(username)
+                return True
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to delete user: {str(e)}")
@@ -0,0 +1,387 @@
+import os
+import json
+import copy
+import base64
+import binascii
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+
+# Seed data used when no catalog file exists yet
+DEFAULT_CATALOG: Dict[str, List[Dict[str, Any]]] = {
+    "projects": [
+        {"id": 1, "name": "Project 1", "description": "First project"},
+        {"id": 2, "name": "Project 2", "description": "Second project"}
+    ],
+    "components": [
+        {"id": 1, "name": "Component 1", "type": "processor"},
+        {"id": 2, "name": "Component 2", "type": "connector"}
+    ]
+}
+
+# Secondary indexes maintained per collection
+INDEXED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "projects": ("owner", "status"),
+    "components": ("type",),
+}
+
+# Fields a collection can be ordered by; each gets a sorted index on first use
+SORTABLE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "projects": ("id", "name", "owner", "status"),
+    "components": ("id", "name", "type"),
+}
+
+# Rewrite the journal as a snapshot once it holds this many operations
+COMPACT_AFTER_OPS = 1000
+
+Listener = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+class CatalogError(Exception):
+    """Raised for invalid catalog writes"""
+    pass
+
+def _index_key(value: Any) -> Any:
+    """Lists are indexed as tuples so they stay hashable"""
+    return tuple(value) if isinstance(value, list) else value
+
+def sort_key(value: Any) -> Tuple[int, Any]:
+    """Total order over mixed field values: numbers, then strings, then missing"""
+    if value is None:
+        return (2, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, value if isinstance(value, str) else json.dumps(value, sort_keys=True))
+
+Position = Tuple[Tuple[int, Any], int]
+
+def encode_position(sort: str, position: Position) -> str:
+    """Encode the keyset position after a page into an opaque cursor"""
+    (rank, value), item_id = position
+    raw = json.dumps({"sort": sort, "key": [rank, value], "id": item_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_position(sort: str, cursor: str) -> Position:
+    """Decode a cursor produced by encode_position for the same sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        rank, value = data["key"]
+        item_id = data["id"]
+        cursor_sort = data["sort"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise CatalogError("Invalid pagination cursor") from e
+    if cursor_sort != sort or not _valid_key(sort, rank, value) or not _is_int(item_id):
+        raise CatalogError("Invalid pagination cursor")
+    return (rank, value), item_id
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _valid_key(sort: str, rank: Any, value: Any) -> bool:
+    """Whether (rank, value) could have come from sort_key, so it compares safely with real keys"""
+    if not _is_int(rank):
+        return False
+    if sort == "id":
+        return rank == 0 and _is_int(value)
+    if rank == 0:
+        return _is_int(value) or isinstance(value, float)
+    if rank == 1:
+        return isinstance(value, str)
+    return rank == 2 and value == ""
+
+def select_fields(item: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Projection of item onto fields; id is always kept"""
+    selected = {"id": item["id"]}
+    for field in fields:
+        if field in item:
+            selected[field] = item[field]
+    return selected
+
+class CatalogCollection:
+    """
+    Items keyed by integer id with secondary indexes
+
+    Lookups by id and by an indexed field are dict hits. Every write bumps
+    version and updates the indexes incrementally; list() returns a snapshot
+    that is rebuilt only after the collection changes.
+    """
+
+    def __init__(self, name: str, indexed_fields: Iterable[str] = (), sortable_fields: Iterable[str] = ("id",)):
+        self.name = name
+        self.sortable_fields = tuple(sortable_fields)
+        self.version = 0
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Dict[int, None]]] = {field: {} for field in indexed_fields}
+        self._snapshot: Optional[List[Dict[str, Any]]] = None
+        self._next_id = 1
+        self._listeners: List[Listener] = []
+        self._memo: Dict[Any, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def indexed_fields(self) -> Tuple[str, ...]:
+        return tuple(self._indexes)
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call listener(event, old_item, new_item) after every create, update and delete"""
+        self._listeners.append(listener)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        return self._items.get(item_id)
+
+    def get_many(self, item_ids: Iterable[int]) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """
+        Resolve many ids in one call
+
+        Returns:
+            (items, missing): found items in request order without duplicates,
+            and the ids that do not exist
+        """
+        items, missing = [], []
+        for item_id in dict.fromkeys(item_ids):
+            item = self.get(item_id)
+            if item is None:
+                missing.append(item_id)
+            else:
+                items.append(item)
+        return items, missing
+
+    def list(self) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot = list(self._items.values())
+        return snapshot
+
+    def memo(self, key: Any, build: Callable[[], Any]) -> Any:
+        """Result of build() cached until the next write to the collection"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        version = self.version
+        value = build()
+        if self.version == version:
+            self._memo[key] = value
+        return value
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Items whose indexed field equals value"""
+        if field not in self._indexes:
+            raise CatalogError(f"{self.name}.{field} is not indexed")
+        ids = self._indexes[field].get(_index_key(value), {})
+        return [self._items[item_id] for item_id in ids]
+
+    def _matching_ids(self, filters: Dict[str, List[Any]]) -> Iterable[int]:
+        """Ids matching every filter, where each filter accepts any of its values"""
+        matches = []
+        for field, values in filters.items():
+            if field not in self._indexes:
+                raise CatalogError(f"{self.name}.{field} is not indexed")
+            ids = set()
+            for value in values:
+                ids.update(self._indexes[field].get(_index_key(value), ()))
+            matches.append(ids)
+        matches.sort(key=len)
+        return set.intersection(*matches) if matches else self._items.keys()
+
+    def _order(self, field: str, ids: Iterable[int]) -> List[Position]:
+        return sorted((sort_key(self._items[item_id].get(field)), item_id) for item_id in ids)
+
+    def query(self, filters: Optional[Dict[str, List[Any]]] = None, sort: str = "id", limit: Optional[int] = None,
+              cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Filter on indexed fields, order and paginate with a keyset cursor
+
+        Args:
+            filters: Indexed field -> accepted values
+            sort: Sortable field name, prefixed with "-" for descending order
+            limit: Maximum number of items to return (all when None)
+            cursor: Cursor returned by the previous page
+
+        Returns:
+            (items, next_cursor): next_cursor is None on the last page
+        """
+        field = sort[1:] if sort.startswith("-") else sort
+        if field not in self.sortable_fields:
+            raise CatalogError(f"{self.name} cannot be sorted by {field}")
+        after = decode_position(sort, cursor) if cursor else None
+
+        with self._lock:
+            if filters:
+                order = self._order(field, self._matching_ids(filters))
+            else:
+                # Unfiltered orderings are kept as sorted indexes until the next write
+                order = self.memo(("order", field), lambda: self._order(field, self._items))
+
+            if sort.startswith("-"):
+                end = bisect_left(order, after) if after else len(order)
+                start = max(0, end - limit) if limit is not None else 0
+                page = order[start:end][::-1]
+                more = start > 0
+            else:
+                start = bisect_right(order, after) if after else 0
+                end = start + limit if limit is not None else len(order)
+                page = order[start:end]
+                more = end < len(order)
+            items = [self._items[item_id] for _, item_id in page]
+
+        next_cursor = encode_position(sort, page[-1]) if more and page else None
+        return items, next_cursor
+
+    def _index(self, item: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            if item.get(field) is not None:
+                index.setdefault(_index_key(item[field]), {})[item["id"]] = None
+
+    def _unindex(self, item: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            if item.get(field) is None:
+                continue
+            key = _index_key(item[field])
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(item["id"], None)
+                if not ids:
+                    del index[key]
+
+    def _changed(self, event: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        self.version += 1
+        self._snapshot = None
+        self._memo = {}
+        for listener in self._listeners:
+            listener(event, old, new)
+
+    def put(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace an item that already carries its id"""
+        with self._lock:
+            item_id = item["id"]
+            old = self._items.get(item_id)
+            if old is not None:
+                self._unindex(old)
+            self._items[item_id] = item
+            self._index(item)
+            self._next_id = max(self._next_id, item_id + 1)
+            self._changed("update" if old is not None else "create", old, item)
+            return item
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            item = copy.deepcopy(data)
+            item_id = item.get("id")
+            if item_id is None:
+                item_id = self._next_id
+            elif not isinstance(item_id, int) or item_id in self._items:
+                raise CatalogError(f"{self.name} id {item_id} is invalid or already exists")
+            item["id"] = item_id
+            return self.put(item)
+
+    def update(self, item_id: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replace the fields of an existing item; returns None if it does not exist"""
+        with self._lock:
+            if item_id not in self._items:
+                return None
+            item = copy.deepcopy(data)
+            item["id"] = item_id
+            return self.put(item)
+
+    def delete(self, item_id: int) -> bool:
+        with self._lock:
+            old = self._items.pop(item_id, None)
+            if old is None:
+                return False
+            self._unindex(old)
+            self._changed("delete", old, None)
+            return True
+
+class CatalogStore:
+    """
+    Projects and components, loaded from and journaled to a JSON-lines file
+
+    Each write appends one line to the journal, so persistence costs O(1) per
+    write; the journal is compacted into a single snapshot line on load once
+    it grows past COMPACT_AFTER_OPS. Without a path the catalog lives in
+    memory only, seeded from DEFAULT_CATALOG.
+    """
+
+    def __init__(self, path: Optional[str] = None, seed: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.path = Path(path) if path else None
+        self.collections: Dict[str, CatalogCollection] = {
+            name: CatalogCollection(name, INDEXED_FIELDS.get(name, ()), SORTABLE_FIELDS.get(name, ("id",)))
+            for name in DEFAULT_CATALOG
+        }
+        self._journal_lock = threading.Lock()
+        self._load(seed if seed is not None else DEFAULT_CATALOG)
+        for name, collection in self.collections.items():
+            collection.subscribe(self._journal_writer(name))
+
+    @classmethod
+    def from_env(cls) -> "CatalogStore":
+        """Catalog persisted at CATALOG_PATH, or in memory when it is unset"""
+        return cls(os.getenv("CATALOG_PATH") or None)
+
+    @property
+    def projects(self) -> CatalogCollection:
+        return self.collections["projects"]
+
+    @property
+    def components(self) -> CatalogCollection:
+        return self.collections["components"]
+
+    def _load(self, seed: Dict[str, List[Dict[str, Any]]]) -> None:
+        if self.path is None or not self.path.exists():
+            for name, items in seed.items():
+                for item in items:
+                    self.collections[name].put(copy.deepcopy(item))
+            if self.path is not None:
+                self._write_snapshot()
+            return
+
+        ops = 0
+        with self.path.open(encoding="utf-8") as journal:
+            for line in journal:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted write
+                    continue
+                ops += 1
+                self._apply(entry)
+        if ops > COMPACT_AFTER_OPS:
+            self._write_snapshot()
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        if op == "snapshot":
+            for name, items in entry["collections"].items():
+                for item in items:
+                    self.collections[name].put(item)
+        elif op == "put":
+            self.collections[entry["collection"]].put(entry["item"])
+        elif op == "delete":
+            self.collections[entry["collection"]].delete(entry["id"])
+
+    def _write_snapshot(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        snapshot = {"op": "snapshot", "collections": {name: c.list() for name, c in self.collections.items()}}
+        tmp_path.write_text(json.dumps(snapshot) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def _journal_writer(self, name: str) -> Listener:
+        def write(event: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+            if self.path is None:
+                return
+            if event == "delete":
+                entry = {"op": "delete", "collection": name, "id": old["id"]}
+            else:
+                entry = {"op": "put", "collection": name, "item": new}
+            with self._journal_lock, self.path.open("a", encoding="utf-8") as journal:
+                journal.write(json.dumps(entry) + "\n")
+        return write
@@ -0,0 +1,467 @@
+import os
+import ast
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple
+from .workspace_service import Workspace, WorkspaceError, INTERNAL_DIRS
+
+DEFAULT_CODE_INDEX_PATH = "data/code_index.sqlite"
+
+# Batches smaller than this are parsed in-process; starting workers costs more
+PARALLEL_THRESHOLD = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_module ON files (module);
+CREATE TABLE IF NOT EXISTS symbols (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_name_lower ON symbols (name_lower);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT NOT NULL,
+    module TEXT NOT NULL,
+    name TEXT,
+    alias TEXT,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_path ON imports (path);
+CREATE INDEX IF NOT EXISTS imports_name ON imports (name, path, line);
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name, path, line, col);
+"""
+
+class CodeIndexError(Exception):
+    """Raised for invalid code index queries"""
+    pass
+
+def module_name(path: str) -> str:
+    """Dotted module for a workspace path: /src/api/files.py -> src.api.files, a package's __init__ -> the package"""
+    parts = list(PurePosixPath(path.lstrip("/")).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+def _callee(node: ast.AST) -> Optional[ast.AST]:
+    while isinstance(node, ast.Call):
+        node = node.func
+    return node if isinstance(node, (ast.Name, ast.Attribute)) else None
+
+class _Extractor(ast.NodeVisitor):
+    """Definitions, imports and call, base class and decorator references of one module"""
+
+    def __init__(self, module: str, is_package: bool):
+        self.package = module if is_package else module.rpartition(".")[0]
+        self.scope: List[Tuple[str, str]] = []
+        self.symbols: List[Tuple] = []
+        self.imports: List[Tuple] = []
+        self.refs: List[Tuple] = []
+
+    def _define(self, name: str, kind: str, node: ast.AST) -> None:
+        qualname = ".".join([part for part, _ in self.scope] + [name])
+        self.symbols.append((name, qualname, kind, node.lineno, node.col_offset,
+                             getattr(node, "end_lineno", None) or node.lineno))
+
+    def _reference(self, node: Optional[ast.AST], kind: str) -> None:
+        node = _callee(node) if node is not None else None
+        if isinstance(node, ast.Name):
+            self.refs.append((node.id, kind, node.lineno, node.col_offset))
+        elif isinstance(node, ast.Attribute):
+            # Point at the attribute itself rather than the start of the dotted expression
+            col = (node.end_col_offset or 0) - len(node.attr) if node.end_lineno == node.lineno else node.col_offset
+            self.refs.append((node.attr, kind, node.end_lineno or node.lineno, col))
+
+    def _scoped(self, node: ast.AST, name: str, kind: str) -> None:
+        self.scope.append((name, kind))
+        self.generic_visit(node)
+        self.scope.pop()
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._define(node.name, "class", node)
+        for base in node.bases:
+            self._reference(base, "inherit")
+        for decorator in node.decorator_list:
+            self._reference(decorator, "decorator")
+        self._scoped(node, node.name, "class")
+
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        in_class = bool(self.scope) and self.scope[-1][1] == "class"
+        self._define(node.name, "method" if in_class else "function", node)
+        for decorator in node.decorator_list:
+            self._reference(decorator, "decorator")
+        self._scoped(node, node.name, "function")
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _assigned(self, targets: Iterable[ast.AST]) -> None:
+        if self.scope and self.scope[-1][1] == "function":
+            return
+        for target in targets:
+            for name in ast.walk(target):
+                if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Store):
+                    self._define(name.id, "variable", name)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        self._assigned(node.targets)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        self._assigned([node.target])
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append((alias.name, None, alias.asname, node.lineno))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = node.module or ""
+        if node.level:
+            base = self.package.split(".") if self.package else []
+            base = base[:len(base) - (node.level - 1)] if node.level > 1 else base
+            module = ".".join(part for part in base + ([module] if module else []) if part)
+        for alias in node.names:
+            self.imports.append((module, alias.name, alias.asname, node.lineno))
+
+    def visit_Call(self, node: ast.Call) -> None:
+        self._reference(node.func, "call")
+        self.generic_visit(node)
+
+def parse_source(source: bytes, path: str) -> Dict[str, Any]:
+    """Symbols, imports and references of a Python file; an unparseable file yields an empty result with the error"""
+    module = module_name(path)
+    extractor = _Extractor(module, PurePosixPath(path).name == "__init__.py")
+    try:
+        extractor.visit(ast.parse(source, filename=path))
+    except (SyntaxError, ValueError) as e:
+        return {"module": module, "error": str(e), "symbols": [], "imports": [], "refs": []}
+    except (RecursionError, MemoryError) as e:
+        # Deeply nested source exhausts the parser or the visitor
+        return {"module": module, "error": f"{type(e).__name__}: too deeply nested",
+                "symbols": [], "imports": [], "refs": []}
+    return {"module": module, "error": None, "symbols": extractor.symbols, "imports": extractor.imports,
+            "refs": extractor.refs}
+
+def parse_file(absolute: str, path: str,
+               known_hash: Optional[str] = None) -> Tuple[str, str, int, int, Optional[Dict[str, Any]]]:
+    """Read, hash and parse one file, skipping the parse when the hash is known_hash; runs in worker processes"""
+    with open(absolute, "rb") as file:
+        stat = os.fstat(file.fileno())
+        source = file.read()
+    file_hash = hashlib.sha256(source).hexdigest()
+    parsed = parse_source(source, path) if file_hash != known_hash else None
+    return path, file_hash, stat.st_size, stat.st_mtime_ns, parsed
+
+class CodeIndex:
+    """
+    Persistent semantic index of the workspace's Python files
+
+    Files are parsed with ast and their definitions, imports and references
+    stored in SQLite next to the content hash they were parsed from. A sync
+    only re-reads files whose size or mtime changed and only re-parses those
+    whose hash changed, so restarting on an unchanged tree parses nothing.
+    Large batches are parsed across a process pool. Workspace changes mark
+    files dirty and the next query re-indexes just those files first.
+    """
+
+    def __init__(self, workspace: Workspace, db_path: str = ":memory:", max_workers: Optional[int] = None,
+                 is_ignored: Optional[Callable[[str], bool]] = None):
+        self.workspace = workspace
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.is_ignored = is_ignored
+        self.parsed = 0
+        self.syncs = 0
+        self.last_sync_ms = 0.0
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._needs_sync = True
+        workspace.subscribe(self.on_change)
+
+    @classmethod
+    def from_env(cls, workspace: Workspace, is_ignored: Optional[Callable[[str], bool]] = None) -> "CodeIndex":
+        """Index stored at CODE_INDEX_PATH"""
+        return cls(workspace, os.getenv("CODE_INDEX_PATH", DEFAULT_CODE_INDEX_PATH), is_ignored=is_ignored)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def on_change(self, event: str, path: str) -> None:
+        """Workspace listener; a change to anything but a .py file may be a directory, so it triggers a full sync"""
+        if self.is_ignored and self.is_ignored(path):
+            return
+        with self._lock:
+            if path.endswith(".py"):
+                self._dirty.add(path)
+            elif event != "modified":
+                self._needs_sync = True
+
+    def _python_files(self) -> Iterable[Tuple[str, os.stat_result]]:
+        root = self.workspace.root
+        for directory, dirnames, filenames in os.walk(root):
+            relative = self.workspace.relative(Path(directory))
+            dirnames[:] = [name for name in dirnames
+                           if not (relative == "/" and name in INTERNAL_DIRS)
+                           and not (self.is_ignored and self.is_ignored(f"{relative.rstrip('/')}/{name}"))]
+            for name in filenames:
+                if not name.endswith(".py"):
+                    continue
+                path = f"{relative.rstrip('/')}/{name}"
+                if self.is_ignored and self.is_ignored(path):
+                    continue
+                try:
+                    yield path, os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+
+    def _parse(self, jobs: List[Tuple[str, str, Optional[str]]]) -> List[Tuple]:
+        if len(jobs) < PARALLEL_THRESHOLD or self.max_workers == 1:
+            results = []
+            for job in jobs:
+                try:
+                    results.append(parse_file(*job))
+                except Exception:
+                    # An unreadable file is left out rather than failing the whole batch
+                    continue
+            return results
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(parse_file, *job) for job in jobs]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception:
+                    continue
+            return results
+
+    def _store(self, results: Iterable[Tuple[str, str, int, int, Dict[str, Any]]]) -> None:
+        for path, file_hash, size, mtime_ns, parsed in results:
+            self._forget(path)
+            self._db.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             (path, parsed["module"], file_hash, size, mtime_ns, parsed["error"]))
+            self._db.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(path, name, name.lower(), qualname, kind, line, col, end_line)
+                                  for name, qualname, kind, line, col, end_line in parsed["symbols"]])
+            self._db.executemany("INSERT INTO imports VALUES (?, ?, ?, ?, ?)",
+                                 [(path, *row) for row in parsed["imports"]])
+            self._db.executemany("INSERT INTO refs VALUES (?, ?, ?, ?, ?)", [(path, *row) for row in parsed["refs"]])
+
+    def _forget(self, path: str) -> None:
+        for table in ("files", "symbols", "imports", "refs"):
+            self._db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def _index(self, candidates: Dict[str, os.stat_result], removed: Iterable[str]) -> int:
+        """Re-parse candidates whose content changed and drop removed paths; returns the number parsed"""
+        known = {}
+        for path in candidates:
+            row = self._db.execute("SELECT hash, size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                known[path] = row
+        jobs, removed = [], list(removed)
+        for path, stat in candidates.items():
+            row = known.get(path)
+            if row is not None and (row[1], row[2]) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            try:
+                absolute = self.workspace.resolve(path)
+            except WorkspaceError:
+                # Symlinks pointing outside the workspace are not indexed
+                removed.append(path)
+                continue
+            jobs.append((str(absolute), path, row[0] if row is not None else None))
+        results = self._parse(jobs)
+        # Files rewritten with identical content only need their stat refreshed
+        changed = []
+        for result in results:
+            if result[4] is None:
+                self._db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                                 (result[2], result[3], result[0]))
+            else:
+                changed.append(result)
+        with self._db:
+            self._store(changed)
+            for path in removed:
+                self._forget(path)
+        self.parsed += len(changed)
+        return len(changed)
+
+    def sync(self) -> Dict[str, Any]:
+        """Bring the whole index up to date with the workspace"""
+        started = time.perf_counter()
+        with self._lock:
+            candidates = dict(self._python_files())
+            stored = {row[0] for row in self._db.execute("SELECT path FROM files")}
+            parsed = self._index(candidates, stored - set(candidates))
+            # Cleared only once indexed, so a failed sync is retried by the next query
+            self._dirty.clear()
+            self._needs_sync = False
+            self.syncs += 1
+            self.last_sync_ms = (time.perf_counter() - started) * 1000
+        return {"files": len(candidates), "parsed": parsed, "duration_ms": self.last_sync_ms}
+
+    def refresh(self) -> None:
+        """Apply pending workspace changes before answering a query"""
+        with self._lock:
+            if self._needs_sync:
+                self.sync()
+                return
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            candidates, removed = {}, []
+            for path in dirty:
+                try:
+                    resolved = self.workspace.resolve(path)
+                    candidates[path] = resolved.stat()
+                except (OSError, WorkspaceError):
+                    removed.append(path)
+            self._index(candidates, removed)
+
+    def _symbols(self, where: str, params: Tuple, limit: int, order: str = "path, line, col") -> List[Dict[str, Any]]:
+        rows = self._db.execute(f"SELECT path, name, qualname, kind, line, col, end_line FROM symbols "
+                                f"WHERE {where} ORDER BY {order} LIMIT ?", params + (limit,))
+        return [{"path": path, "name": name, "qualname": qualname, "kind": kind, "line": line, "col": col,
+                 "end_line": end_line} for path, name, qualname, kind, line, col, end_line in rows]
+
+    def definition(self, name: str, path: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Where a name is defined
+
+        Args:
+            name: Identifier or dotted name as written at the use site (models.User)
+            path: File the name is used in; its own definitions and imports are preferred
+            limit: Maximum results
+
+        Returns:
+            Definitions, best match first
+        """
+        if not name:
+            raise CodeIndexError("name is required")
+        self.refresh()
+        head, _, symbol = name.rpartition(".")
+        with self._lock:
+            results: List[Dict[str, Any]] = []
+            if path:
+                if not head:
+                    results += self._symbols("path = ? AND name = ? AND qualname = name", (path, symbol), limit)
+                for module, imported in self._imports_for(path, head or symbol, symbol if head else None):
+                    found = self._symbols(
+                        "path IN (SELECT path FROM files WHERE module = ?) AND name = ? AND qualname = name",
+                        (module, imported), limit)
+                    if not found:
+                        # The imported name may be a submodule of a package
+                        found = [{"path": row[0], "name": imported, "qualname": imported, "kind": "module",
+                                  "line": 1, "col": 0, "end_line": 1} for row in
+                                 self._db.execute("SELECT path FROM files WHERE module = ?",
+                                                  (f"{module}.{imported}",))]
+                    results += found
+            results += self._symbols("name = ?", (symbol,), limit)
+            unique, seen = [], set()
+            for result in results:
+                key = (result["path"], result["qualname"], result["line"])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(result)
+            return unique[:limit]
+
+    def _imports_for(self, path: str, alias: str, attribute: Optional[str]) -> List[Tuple[str, str]]:
+        """(module, name) pairs that alias refers to in path, with attribute applied to module imports"""
+        targets = []
+        rows = self._db.execute("SELECT module, name, alias FROM imports WHERE path = ?", (path,)).fetchall()
+        for module, name, imported_as in rows:
+            if name is None:
+                # import module [as alias], used as alias.attribute
+                if attribute and (imported_as or module) == alias:
+                    targets.append((module, attribute))
+            elif (imported_as or name) == alias:
+                # from module import name [as alias]; with an attribute, name is a submodule
+                targets.append((f"{module}.{name}", attribute) if attribute else (module, name))
+        return targets
+
+    def references(self, name: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """Calls, base classes, decorators and imports naming name (its last dotted part)"""
+        if not name:
+            raise CodeIndexError("name is required")
+        self.refresh()
+        symbol = name.rpartition(".")[2]
+        with self._lock:
+            refs = [{"path": path, "name": symbol, "kind": kind, "line": line, "col": col}
+                    for path, kind, line, col in self._db.execute(
+                        "SELECT path, kind, line, col FROM refs WHERE name = ? ORDER BY path, line, col LIMIT ?",
+                        (symbol, limit))]
+            imports = [{"path": path, "name": symbol, "kind": "import", "line": line, "col": 0}
+                       for path, line in self._db.execute(
+                           "SELECT path, line FROM imports WHERE name = ? ORDER BY path, line LIMIT ?",
+                           (symbol, limit))]
+        return sorted(refs + imports, key=lambda ref: (ref["path"], ref["line"], ref["col"]))[:limit]
+
+    def search(self, query: str, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Symbols whose name matches query: exact names first, then prefixes, then substrings"""
+        query = query.strip().lower()
+        if not query:
+            raise CodeIndexError("query is required")
+        self.refresh()
+        kind_filter, kind_params = (" AND kind = ?", (kind,)) if kind else ("", ())
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            results = self._symbols("name_lower = ?" + kind_filter, (query,) + kind_params, limit)
+            if len(results) < limit:
+                results += self._symbols("name_lower > ? AND name_lower < ?" + kind_filter,
+                                         (query, query + "\uffff") + kind_params, limit - len(results),
+                                         order="length(name), name_lower, path")
+            if len(results) < limit:
+                results += self._symbols("name_lower LIKE ? ESCAPE '\\' AND NOT name_lower LIKE ? ESCAPE '\\'"
+                                         + kind_filter, (f"%{escaped}%", f"{escaped}%") + kind_params,
+                                         limit - len(results), order="length(name), name_lower, path")
+        return results
+
+    def outline(self, path: str) -> List[Dict[str, Any]]:
+        """Symbols defined in one file, in source order"""
+        self.refresh()
+        with self._lock:
+            return self._symbols("path = ?", (path,), -1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files, errors = self._db.execute("SELECT COUNT(*), COUNT(error) FROM files").fetchone()
+            symbols = self._db.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+            refs = self._db.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {
+            "files": files,
+            "syntax_errors": errors,
+            "symbols": symbols,
+            "references": refs,
+            "parsed": self.parsed,
+            "syncs": self.syncs,
+            "last_sync_ms": self.last_sync_ms,
+            "dirty": len(self._dirty),
+            "workers": self.max_workers,
+        }
@@ -0,0 +1,235 @@
+import re
+import math
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Any, List, Optional, Set, Tuple
+from .catalog_service import CatalogCollection
+
+# Field weights: a term in the name counts three times as much as one in the description
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 3.0,
+    "type": 2.0,
+    "tags": 2.0,
+    "description": 1.0,
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Score multipliers for terms matched by prefix or with a typo rather than exactly
+PREFIX_PENALTY = 0.8
+FUZZY_PENALTY = 0.5
+
+# Shortest query term expanded as a prefix / corrected for typos
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+
+# Most vocabulary terms a single prefix may expand to
+MAX_EXPANSIONS = 64
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _deletes(term: str) -> Set[str]:
+    """Every string formed by deleting one character; shared deletes mean edit distance <= 1"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True for one insertion, deletion, substitution or adjacent transposition"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            return True
+    return False
+
+class ComponentSearchIndex:
+    """
+    Inverted index over the component catalog with BM25 ranking
+
+    Postings map each term to per-component weighted term frequencies, so a
+    query touches only the components containing its terms. The last query
+    term also matches as a prefix (search-as-you-type) and terms with no exact
+    hit are matched within one edit through a deletion index. Attached to a
+    CatalogCollection, the index follows every create, update and delete.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+        self._deletes: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_collection(cls, collection: CatalogCollection) -> "ComponentSearchIndex":
+        """Index built from collection and kept up to date by its change events"""
+        index = cls()
+        collection.subscribe(index.on_change)
+        for item in collection.list():
+            index.add(item)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def on_change(self, event: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        if old is not None:
+            self.remove(old["id"])
+        if new is not None:
+            self.add(new)
+
+    def _weighted_terms(self, item: Dict[str, Any]) -> Dict[str, float]:
+        terms: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = item.get(field)
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            for term in tokenize(str(value)):
+                terms[term] += weight
+        return dict(terms)
+
+    def _add_term(self, term: str) -> None:
+        insort(self._vocabulary, term)
+        for deleted in _deletes(term):
+            self._deletes.setdefault(deleted, set()).add(term)
+
+    def _drop_term(self, term: str) -> None:
+        position = bisect_left(self._vocabulary, term)
+        if position < len(self._vocabulary) and self._vocabulary[position] == term:
+            del self._vocabulary[position]
+        for deleted in _deletes(term):
+            terms = self._deletes.get(deleted)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._deletes[deleted]
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Index a component, replacing any previous version of it"""
+        with self._lock:
+            item_id = item["id"]
+            if item_id in self._docs:
+                self.remove(item_id)
+            terms = self._weighted_terms(item)
+            for term, frequency in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._add_term(term)
+                postings[item_id] = frequency
+            length = sum(terms.values())
+            self._doc_terms[item_id] = terms
+            self._doc_lengths[item_id] = length
+            self._docs[item_id] = item
+            self._total_length += length
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            terms = self._doc_terms.pop(item_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                postings = self._postings[term]
+                postings.pop(item_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._drop_term(term)
+            self._total_length -= self._doc_lengths.pop(item_id)
+            del self._docs[item_id]
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + MAX_EXPANSIONS + 1]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                terms.append(term)
+        return terms[:MAX_EXPANSIONS]
+
+    def _fuzzy_terms(self, term: str) -> List[str]:
+        candidates: Set[str] = set(self._deletes.get(term, ()))
+        for deleted in _deletes(term) | {term}:
+            if deleted in self._postings:
+                candidates.add(deleted)
+            candidates.update(self._deletes.get(deleted, ()))
+        candidates.discard(term)
+        return [candidate for candidate in candidates if within_one_edit(term, candidate)]
+
+    def _expand(self, term: str, is_last: bool) -> List[Tuple[str, float]]:
+        """Vocabulary terms matching a query term, with their score multipliers"""
+        expansions = []
+        if term in self._postings:
+            expansions.append((term, 1.0))
+        if is_last and len(term) >= MIN_PREFIX_LENGTH:
+            expansions.extend((prefixed, PREFIX_PENALTY) for prefixed in self._prefix_terms(term))
+        if not expansions and len(term) >= MIN_FUZZY_LENGTH:
+            expansions.extend((corrected, FUZZY_PENALTY) for corrected in self._fuzzy_terms(term))
+        return expansions
+
+    def search(self, query: str, limit: int = 20, type: Optional[str] = None) -> Tuple[List[Tuple[Dict[str, Any], float]], int]:
+        """
+        Rank components against a free-text query
+
+        Args:
+            query: Free text; the last word also matches as a prefix
+            limit: Maximum number of results
+            type: Only return components of this type
+
+        Returns:
+            (results, total): (component, score) pairs best first, and the
+            number of components that matched
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            doc_count = len(self._docs)
+            if not terms or not doc_count:
+                return [], 0
+            lengths = self._doc_lengths
+            length_scale = K1 * B * doc_count / self._total_length
+            length_base = K1 * (1 - B)
+            scores: Dict[int, float] = {}
+            for position, term in enumerate(terms):
+                expansions = self._expand(term, position == len(terms) - 1)
+                # A component scores once per query term, through its best matching expansion
+                best: Dict[int, float] = scores if len(expansions) == 1 else {}
+                for expanded, multiplier in expansions:
+                    postings = self._postings[expanded]
+                    df = len(postings)
+                    weight = multiplier * math.log(1 + (doc_count - df + 0.5) / (df + 0.5)) * (K1 + 1)
+                    if best is scores:
+                        for item_id, frequency in postings.items():
+                            score = weight * frequency / (frequency + length_base + length_scale * lengths[item_id])
+                            scores[item_id] = scores.get(item_id, 0.0) + score
+                        continue
+                    for item_id, frequency in postings.items():
+                        score = weight * frequency / (frequency + length_base + length_scale * lengths[item_id])
+                        if score > best.get(item_id, 0.0):
+                            best[item_id] = score
+                if best is not scores:
+                    for item_id, score in best.items():
+                        scores[item_id] = scores.get(item_id, 0.0) + score
+
+            if type is not None:
+                scores = {item_id: score for item_id, score in scores.items() if self._docs[item_id].get("type") == type}
+            top = heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], -entry[0]))
+            return [(self._docs[item_id], score) for item_id, score in top], len(scores)
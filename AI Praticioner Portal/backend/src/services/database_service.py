@@ -1,22 +1,167 @@
 import os
-from typing import Dict, Any, Optional, List, Union
+import json
+import base64
+import binascii
+from typing import Dict, Any, Optional, List, Union, Iterable, Iterator, Tuple
 from datetime import datetime
-from sqlalchemy import create_engine, event, String
+from sqlalchemy import create_engine, event, String, select, insert, func
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from dotenv import load_dotenv
-from ..models.user import Base, User
+from ..models.user import Base, User, UserRole
+from .user_search import UserSearchIndex, MATCH_MODES
+from .user_cache import UserCache, LRUCache
+from .db_metrics import DatabaseMetrics
 
 # Load environment variables
 load_dotenv()
 
+USER_REQUIRED_FIELDS = ("username", "hashed_password", "roles")
+
+# How long a cached total count may be served before it is recomputed
+DEFAULT_COUNT_CACHE_TTL = float(os.getenv("USER_COUNT_CACHE_TTL", "30"))
+# Distinct searches whose totals are kept; the least recently used are evicted past this
+DEFAULT_COUNT_CACHE_SIZE = 1024
+
+# Statements slower than this are kept in the slow-query log
+DEFAULT_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+# Set SQL_ECHO=1 to log every statement while debugging
+SQL_ECHO = os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes")
+
 class DatabaseError(Exception):
     """Custom exception for database operations"""
     pass
 
+def serialize_user(user: User) -> Dict[str, Any]:
+    """Convert a User row into the dict shape returned by the service"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "hashed_password": user.hashed_password,
+        "roles": user.roles,
+        "created_at": user.created_at.isoformat(),
+        "updated_at": user.updated_at.isoformat()
+    }
+
+def build_user(user_data: Dict[str, Any]) -> User:
+    """New User row, with its user_roles links, from a store_user dict"""
+    user = User(
+        username=user_data["username"],
+        hashed_password=user_data["hashed_password"],
+        roles=user_data["roles"]
+    )
+    user.role_links = [UserRole(role=role) for role in set(user_data["roles"] or [])]
+    return user
+
+def user_row_error(user_data: Any) -> Optional[str]:
+    """Why a bulk import row cannot be stored, or None if it is valid"""
+    if not isinstance(user_data, dict) or not all(field in user_data for field in USER_REQUIRED_FIELDS):
+        return "Missing required fields"
+    for field in ("username", "hashed_password"):
+        if not isinstance(user_data[field], str) or not user_data[field]:
+            return f"{field} must be a non-empty string"
+    roles = user_data["roles"]
+    if not isinstance(roles, list) or not all(isinstance(role, str) for role in roles):
+        return "roles must be a list of strings"
+    return None
+
+def apply_user_update(user: User, updated_data: Dict[str, Any]) -> None:
+    """Copy update_user fields onto user and diff its user_roles links"""
+    user.username = updated_data["username"]
+    user.hashed_password = updated_data["hashed_password"]
+    user.roles = updated_data["roles"]
+
+    wanted = set(updated_data["roles"] or [])
+    for link in list(user.role_links):
+        if link.role not in wanted:
+            user.role_links.remove(link)
+    for role in wanted - {link.role for link in user.role_links}:
+        user.role_links.append(UserRole(role=role))
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the keyset position after a page into an opaque cursor"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor back into the last seen id"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise DatabaseError("Invalid pagination cursor") from e
+    if not isinstance(last_id, int):
+        raise DatabaseError("Invalid pagination cursor")
+    return last_id
+
+class CountCache(LRUCache):
+    """Short-lived, bounded cache of total counts, cleared on every write made through the service"""
+
+    def __init__(self, ttl: float, maxsize: int = DEFAULT_COUNT_CACHE_SIZE):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+
+    def set(self, key: Any, total: int) -> None:
+        if self.ttl > 0:
+            super().set(key, total)
+
+def page_statement(stmt, page: int, page_size: int, cursor: Optional[str]):
+    """Apply offset or keyset (cursor) paging to stmt, fetching one extra row"""
+    if page < 1:
+        raise DatabaseError("page must be at least 1")
+    if page_size < 1:
+        raise DatabaseError("page_size must be at least 1")
+    stmt = stmt.order_by(User.id)
+    if cursor:
+        stmt = stmt.where(User.id > decode_cursor(cursor))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    # The extra row tells us whether another page exists
+    return stmt.limit(page_size + 1)
+
+def count_statement(stmt):
+    """SELECT count(*) over the rows matched by stmt"""
+    return select(func.count()).select_from(stmt.order_by(None).subquery())
+
+def build_page(users: List[User], page: int, page_size: int, total: Optional[int]) -> Dict[str, Any]:
+    """Page dict returned by list_users/search_users from a page_statement result"""
+    has_more = len(users) > page_size
+    users = users[:page_size]
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": encode_cursor(users[-1].id) if has_more else None,
+        "users": [serialize_user(user) for user in users]
+    }
+
+def search_statement(search_index: UserSearchIndex, query: str, roles: Optional[List[str]], match: str):
+    """Build the search_users statement and its count cache key"""
+    if match not in MATCH_MODES:
+        raise DatabaseError(f"match must be one of {', '.join(MATCH_MODES)}")
+
+    query_lower = query.lower()
+    
+    # Build query
+    stmt = select(User)
+    
+    # Add username filter if query is provided
+    if query:
+        stmt = stmt.where(search_index.username_filter(query_lower, match))
+    
+    # Add roles filter if roles are provided
+    if roles:
+        stmt = stmt.where(search_index.roles_filter(roles))
+    
+    return stmt, ("search", match, query_lower, tuple(sorted(set(roles or []))))
+
 class DatabaseService:
-    def __init__(self, db_url: Optional[str] = None):
+    def __init__(self, db_url: Optional[str] = None, count_cache_ttl: float = DEFAULT_COUNT_CACHE_TTL,
+                 cache: Optional[UserCache] = None, slow_query_threshold_ms: float = DEFAULT_SLOW_QUERY_MS):
         """Initialize the database service with SQLAlchemy"""
+        self._counts = CountCache(count_cache_ttl)
+        self.cache = cache
+        self.metrics = DatabaseMetrics(slow_query_threshold_ms)
         try:
             # Use provided URL or environment variable
             if db_url is None:
@@ -24,13 +169,11 @@ class DatabaseService:
                 if not db_url:
                     raise DatabaseError("DATABASE_URL environment variable not set")
             
-            self.engine = create_engine(db_url, echo=True)
+            self.engine = create_engine(db_url, echo=SQL_ECHO)
+            self.metrics.attach(self.engine)
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            
-            # Create tables if they don't exist
-            Base.metadata.create_all(bind=self.engine)
-            
-            # Configure database connection pooling
+
+            # Configure database connection pooling (before the first connection is opened)
             if db_url.startswith("sqlite:"):
                 @event.listens_for(self.engine, "connect")
                 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -38,6 +181,14 @@ class DatabaseService:
                     cursor.execute("PRAGMA foreign_keys=ON")
                     cursor.close()
             
+            # Create tables if they don't exist
+            Base.metadata.create_all(bind=self.engine)
+
+            # Username search indexes and user_roles backfill
+            self.search_index = UserSearchIndex()
+            with self.engine.begin() as conn:
+                self.search_index.install(conn)
+            
 
         except SQLAlchemyError as e:
             raise DatabaseError(f"Failed to initialize database connection: {str(e)}") from e
@@ -61,24 +212,162 @@ class DatabaseService:
         Raises:
             DatabaseError: If required fields are missing or user already exists
         """
-        required_fields = ["username", "hashed_password", "roles"]
-        if not all(field in user_data for field in required_fields):
+        if not all(field in user_data for field in USER_REQUIRED_FIELDS):
             raise DatabaseError("Missing required fields in user data")
 
         try:
             with self.SessionLocal() as db:
-                user = User(
-                    username=user_data["username"],
-                    hashed_password=user_data["hashed_password"],
-                    roles=user_data["roles"]
-                )
-                db.add(user)
+                db.add(build_user(user_data))
                 db.commit()
+                self._counts.clear()
                 return True
         except SQLAlchemyError as e:
             db.rollback()
             raise DatabaseError(f"Failed to store user: {str(e)}")
 
+    def store_users_bulk(self, users: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Store many users using batched multi-row inserts
+
+        Rows that are invalid or collide with an existing username are reported
+        as conflicts and skipped; the rest of the batch is still stored.
+
+        Args:
+            users: Iterable of user dictionaries (same shape as store_user)
+            batch_size: Number of rows sent per INSERT statement
+
+        Returns:
+            Dict containing:
+                - inserted: Number of users stored
+                - conflicts: List of {"index", "username", "error"} for skipped rows
+
+        Raises:
+            DatabaseError: If batch_size is invalid or the database fails
+        """
+        if batch_size < 1:
+            raise DatabaseError("batch_size must be at least 1")
+
+        result: Dict[str, Any] = {"inserted": 0, "conflicts": []}
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        for index, user_data in enumerate(users):
+            batch.append((index, user_data))
+            if len(batch) >= batch_size:
+                self._insert_user_batch(batch, result)
+                batch = []
+        if batch:
+            self._insert_user_batch(batch, result)
+        return result
+
+    def _insert_user_batch(self, batch: List[Tuple[int, Dict[str, Any]]], result: Dict[str, Any]) -> None:
+        """Insert one batch of users, recording conflicts in result"""
+        conflicts = result["conflicts"]
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        seen = set()
+        for index, user_data in batch:
+            username = user_data.get("username") if isinstance(user_data, dict) else None
+            error = user_row_error(user_data)
+            if error:
+                conflicts.append({"index": index, "username": username if isinstance(username, str) else None,
+                                  "error": error})
+                continue
+            if username in seen:
+                conflicts.append({"index": index, "username": username, "error": "Duplicate username in batch"})
+                continue
+            seen.add(username)
+            rows.append((index, {field: user_data[field] for field in USER_REQUIRED_FIELDS}))
+
+        if not rows:
+            return
+
+        try:
+            with self.SessionLocal() as db:
+                existing = set(db.scalars(
+                    select(User.username).where(User.username.in_([row["username"] for _, row in rows]))
+                ))
+                fresh = []
+                for index, row in rows:
+                    if row["username"] in existing:
+                        conflicts.append({"index": index, "username": row["username"], "error": "User already exists"})
+                    else:
+                        fresh.append((index, row))
+                if not fresh:
+                    return
+                try:
+                    db.execute(insert(User), [row for _, row in fresh])
+                    self._insert_role_links(db, [row for _, row in fresh])
+                    db.commit()
+                    self._counts.clear()
+                    result["inserted"] += len(fresh)
+                    return
+                except IntegrityError:
+                    # A concurrent writer claimed one of the usernames; retry row by row
+                    db.rollback()
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to store users: {str(e)}") from e
+
+        self._insert_users_individually(fresh, result)
+
+    def _insert_users_individually(self, rows: List[Tuple[int, Dict[str, Any]]], result: Dict[str, Any]) -> None:
+        """Fallback for a batch that hit a constraint violation"""
+        for index, row in rows:
+            try:
+                with self.SessionLocal() as db:
+                    db.execute(insert(User), [row])
+                    self._insert_role_links(db, [row])
+                    db.commit()
+                    self._counts.clear()
+                    result["inserted"] += 1
+            except IntegrityError as e:
+                result["conflicts"].append({"index": index, "username": row["username"], "error": str(e.orig)})
+            except SQLAlchemyError as e:
+                raise DatabaseError(f"Failed to store users: {str(e)}") from e
+
+    @staticmethod
+    def _insert_role_links(db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Write user_roles rows for users that were just inserted with a Core insert"""
+        ids = dict(db.execute(
+            select(User.username, User.id).where(User.username.in_([row["username"] for row in rows]))
+        ).all())
+        links = [
+            {"user_id": ids[row["username"]], "role": role}
+            for row in rows for role in set(row["roles"] or [])
+        ]
+        if links:
+            db.execute(insert(UserRole), links)
+
+    def export_users(self, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream all users in id order, one chunk at a time
+
+        Each chunk is read in its own short session using keyset pagination on
+        the primary key, so the full table is never held in memory.
+
+        Args:
+            chunk_size: Number of users per yielded chunk
+
+        Yields:
+            List[Dict[str, Any]]: Serialized users
+        """
+        if chunk_size < 1:
+            raise DatabaseError("chunk_size must be at least 1")
+
+        last_id = 0
+        while True:
+            try:
+                with self.SessionLocal() as db:
+                    users = db.scalars(
+                        select(User).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+                    ).all()
+                    chunk = [serialize_user(user) for user in users]
+            except SQLAlchemyError as e:
+                raise DatabaseError(f"Failed to export users: {str(e)}") from e
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1]["id"]
+
     def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve user data by username
@@ -89,112 +378,103 @@ class DatabaseService:
         Returns:
             Dict[str, Any]: User data if found, None otherwise
         """
+        if self.cache is not None:
+            cached = self.cache.get(username)
+            if cached is not None:
+                return cached
+
         try:
             with self.SessionLocal() as db:
                 user = db.query(User).filter(User.username == username).first()
                 if user:
-                    return {
-                        "id": user.id,
-                        "username": user.username,
-                        "hashed_password": user.hashed_password,
-                        "roles": user.roles,
-                        "created_at": user.created_at.isoformat(),
-                        "updated_at": user.updated_at.isoformat()
-                    }
+                    data = serialize_user(user)
+                    if self.cache is not None:
+                        self.cache.set(username, data)
+                    return data
                 return None
         except SQLAlchemyError as e:
             raise DatabaseError(f"Failed to get user: {str(e)}")
 
-    def list_users(self, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+    def _paginate(self, db: Session, stmt, count_key: Any, page: int, page_size: int,
+                  cursor: Optional[str], include_total: bool) -> Dict[str, Any]:
+        """Run stmt with offset or keyset pagination and build the page dict"""
+        page_stmt = page_statement(stmt, page, page_size, cursor)
+
+        total = None
+        if include_total:
+            total = self._counts.get(count_key)
+            if total is None:
+                total = db.scalar(count_statement(stmt))
+                self._counts.set(count_key, total)
+
+        users = db.scalars(page_stmt).all()
+        return build_page(users, page, page_size, total)
+
+    def list_users(self, page: int = 1, page_size: int = 10, cursor: Optional[str] = None,
+                   include_total: bool = True) -> Dict[str, Any]:
         """
         List all users with pagination
 
+        Pass the returned next_cursor back as cursor to fetch the following page
+        with a keyset seek on id; page is ignored when a cursor is given.
+
         Args:
             page: Page number (1-based)
             page_size: Number of items per page
+            cursor: Opaque cursor from a previous call's next_cursor
+            include_total: Whether to compute total (cached for count_cache_ttl seconds)
 
         Returns:
             Dict containing:
-                - total: Total number of users
+                - total: Total number of users, or None when include_total is False
                 - page: Current page number
                 - page_size: Number of items per page
+                - next_cursor: Cursor for the next page, or None on the last page
                 - users: List of user data
         """
         try:
             with self.SessionLocal() as db:
-                total = db.query(User).count()
-                users = db.query(User).offset((page - 1) * page_size).limit(page_size).all()
-                
-                return {
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "users": [{
-                        "id": user.id,
-                        "username": user.username,
-                        "hashed_password": user.hashed_password,
-                        "roles": user.roles,
-                        "created_at": user.created_at.isoformat(),
-                        "updated_at": user.updated_at.isoformat()
-                    } for user in users]
-                }
+                return self._paginate(db, select(User), ("list",), page, page_size, cursor, include_total)
         except SQLAlchemyError as e:
             raise DatabaseError(f"Failed to list users: {str(e)}")
 
-    def search_users(self, query: str, roles: Optional[List[str]] = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+    def search_users(self, query: str = "", roles: Optional[List[str]] = None, page: int = 1, page_size: int = 10,
+                     cursor: Optional[str] = None, include_total: bool = True, match: str = "contains") -> Dict[str, Any]:
         """
         Search users by username or role
 
+        Username matching is served by the backend's search index (pg_trgm on
+        PostgreSQL, FTS5 trigram on SQLite) and roles by the user_roles table.
+
         Args:
-            query: Search term to match against username
-            roles: List of roles to filter by
+            query: Search term to match against username (case-insensitive)
+            roles: List of roles to filter by; users must hold all of them
+            match: "contains" (default) or "prefix"
             page: Page number (1-based)
             page_size: Number of items per page
+            cursor: Opaque cursor from a previous call's next_cursor
+            include_total: Whether to compute total (cached for count_cache_ttl seconds)
 
         Returns:
             Dict containing:
-                - total: Total number of matching users
+                - total: Total number of matching users, or None when include_total is False
                 - page: Current page number
                 - page_size: Number of items per page
+                - next_cursor: Cursor for the next page, or None on the last page
                 - users: List of matching user data
         """
         try:
             with self.SessionLocal() as db:
-                query_lower = query.lower()
-                
-                # Build query
-                query = db.query(User)
-                
-                # Add username filter if query is provided
-                if query:
-                    query = query.filter(User.username.ilike(f"%{query_lower}%"))
-                
-                # Add roles filter if roles are provided
-                if roles:
-                    query = query.filter(User.roles.contains(roles))
-                
-                # Get total count
-                total = query.count()
-                
-                # Apply pagination
-                users = query.offset((page - 1) * page_size).limit(page_size).all()
-                
-                return {
-                    "total": total,
-                    "page": page,
-                    "page_size": page_size,
-                    "users": [{
-                        "id": user.id,
-                        "username": user.username,
-                        "hashed_password": user.hashed_password,
-                        "roles": user.roles,
-                        "created_at": user.created_at.isoformat(),
-                        "updated_at": user.updated_at.isoformat()
-                    } for user in users]
-                }
+                stmt, count_key = search_statement(self.search_index, query, roles, match)
+                return self._paginate(db, stmt, count_key, page, page_size, cursor, include_total)
         except SQLAlchemyError as e:
             raise DatabaseError(f"Failed to search users: {str(e)}")
 
+    def _invalidate_user(self, *usernames: str) -> None:
+        """Drop cached copies of users changed through this service"""
+        if self.cache is not None:
+            self.cache.invalidate(*usernames)
+
     def update_user(self, username: str, updated_data: Dict[str, Any]) -> bool:
         """
         Update existing user data
@@ -209,8 +489,7 @@ class DatabaseService:
         Raises:
             DatabaseError: If user doesn't exist or required fields are missing
         """
-        required_fields = ["username", "hashed_password", "roles"]
-        if not all(field in updated_data for field in required_fields):
+        if not all(field in updated_data for field in USER_REQUIRED_FIELDS):
             raise DatabaseError("Missing required fields in updated data")
 
         try:
@@ -219,11 +498,11 @@ class DatabaseService:
                 if not user:
                     raise DatabaseError(f"User {username} does not exist")
 
-                user.username = updated_data["username"]
-                user.hashed_password = updated_data["hashed_password"]
-                user.roles = updated_data["roles"]
+                apply_user_update(user, updated_data)
                 
                 db.commit()
+                self._counts.clear()
+                self._invalidate_user(username, updated_data["username"])
                 return True
         except SQLAlchemyError as e:
             db.rollback()
@@ -250,7 +529,101 @@ class DatabaseService:
 
                 db.delete(user)
                 db.commit()
+                self._counts.clear()
+                self._invalidate_user(username)
                 return True
         except SQLAlchemyError as e:
             db.rollback()
             raise DatabaseError(f"Failed to delete user: {str(e)}")
+
+    def _patch_user(self, username: str, changes: Dict[str, Any], action: str) -> bool:
+        """Apply a partial update through apply_user_update"""
+        try:
+            with self.SessionLocal() as db:
+                user = db.query(User).filter(User.username == username).first()
+                if not user:
+                    raise DatabaseError(f"User {username} does not exist")
+
+                apply_user_update(user, {
+                    "username": user.username,
+                    "hashed_password": user.hashed_password,
+                    "roles": user.roles,
+                    **changes
+                })
+                db.commit()
+                self._counts.clear()
+                self._invalidate_user(username)
+                return True
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to {action}: {str(e)}")
+
+    def set_user_roles(self, username: str, roles: List[str]) -> bool:
+        """
+        Replace a user's roles, keeping user_roles in sync
+
+        Raises:
+            DatabaseError: If user doesn't exist
+        """
+        return self._patch_user(username, {"roles": sorted(set(roles))}, "set user roles")
+
+    def set_password_hash(self, username: str, hashed_password: str) -> bool:
+        """
+        Replace a user's stored password hash
+
+        Raises:
+            DatabaseError: If user doesn't exist
+        """
+        return self._patch_user(username, {"hashed_password": hashed_password}, "set password hash")
+
+    def get_user_roles(self, username: str) -> List[str]:
+        """
+        Roles of a user read from the user_roles table
+
+        Unlike get_user this never goes through the cache, so role changes made
+        by another worker are visible immediately.
+        """
+        try:
+            with self.SessionLocal() as db:
+                return sorted(db.scalars(
+                    select(UserRole.role).join(User, User.id == UserRole.user_id).where(User.username == username)
+                ))
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to get user roles: {str(e)}")
+
+    def user_has_role(self, username: str, role: str) -> bool:
+        """Index-backed check for a single (user, role) pair"""
+        try:
+            with self.SessionLocal() as db:
+                return db.scalar(
+                    select(UserRole.user_id)
+                    .join(User, User.id == UserRole.user_id)
+                    .where(User.username == username, UserRole.role == role)
+                    .limit(1)
+                ) is not None
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to check user role: {str(e)}")
+
+    def users_with_role(self, role: str, limit: Optional[int] = None, after: Optional[str] = None) -> List[str]:
+        """
+        Usernames holding role, in username order, served by the role index
+
+        Args:
+            role: Role to look up
+            limit: Maximum number of usernames to return
+            after: Only return usernames sorting after this one (keyset paging)
+        """
+        try:
+            with self.SessionLocal() as db:
+                stmt = (
+                    select(User.username)
+                    .join(UserRole, UserRole.user_id == User.id)
+                    .where(UserRole.role == role)
+                    .order_by(User.username)
+                )
+                if after is not None:
+                    stmt = stmt.where(User.username > after)
+                if limit is not None:
+                    stmt = stmt.limit(limit)
+                return list(db.scalars(stmt))
+        except SQLAlchemyError as e:
+            raise DatabaseError(f"Failed to list users with role: {str(e)}")
@@ -0,0 +1,176 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Any, List, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Distinct statements tracked individually before falling back to "other"
+MAX_TRACKED_STATEMENTS = 200
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        self.counts[bisect_left(self.buckets_ms, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in self.buckets_ms] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+class DatabaseMetrics:
+    """
+    Statement timing, slow-query log and pool statistics for an Engine
+
+    Everything is collected from SQLAlchemy engine and pool events, so it
+    replaces echo=True without printing each statement.
+    """
+
+    def __init__(self, slow_query_threshold_ms: float = 200.0, slow_query_log_size: int = 100):
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.statements = LatencyHistogram()
+        self.by_statement: Dict[str, LatencyHistogram] = {}
+        self.slow_queries: deque = deque(maxlen=slow_query_log_size)
+        self.errors = 0
+        self.checkout_wait = LatencyHistogram()
+        self.pool_timeouts = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+
+    def attach(self, engine: Engine) -> None:
+        """Register event listeners on engine (use AsyncEngine.sync_engine for async engines)"""
+        self._engine = engine
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "engine_disposed", lambda _engine: self._instrument_pool())
+        self._instrument_pool()
+
+    def _instrument_pool(self) -> None:
+        """Time how long callers wait for a pooled connection"""
+        pool = self._engine.pool
+        original = pool._do_get
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                return original()
+            except PoolTimeoutError:
+                with self._lock:
+                    self.pool_timeouts += 1
+                raise
+            finally:
+                with self._lock:
+                    self.checkout_wait.observe((time.perf_counter() - start) * 1000)
+
+        pool._do_get = timed_do_get
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        self.record(statement, (time.perf_counter() - started) * 1000)
+
+    def _on_error(self, context):
+        with self._lock:
+            self.errors += 1
+        starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_opened += 1
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        """Record one statement execution"""
+        with self._lock:
+            self.statements.observe(duration_ms)
+            histogram = self.by_statement.get(statement)
+            if histogram is None:
+                key = statement if len(self.by_statement) < MAX_TRACKED_STATEMENTS else "other"
+                histogram = self.by_statement.setdefault(key, LatencyHistogram())
+            histogram.observe(duration_ms)
+            if duration_ms >= self.slow_query_threshold_ms:
+                self.slow_queries.append({
+                    "statement": statement,
+                    "duration_ms": round(duration_ms, 3),
+                    "at": time.time(),
+                })
+                logger.warning("Slow query (%.1f ms): %s", duration_ms, statement)
+
+    def pool_status(self) -> Dict[str, Any]:
+        """Current pool occupancy; fields the pool class does not track are None"""
+        pool = self._engine.pool if self._engine is not None else None
+
+        def read(name: str) -> Optional[int]:
+            method = getattr(pool, name, None)
+            return method() if callable(method) else None
+
+        return {
+            "class": type(pool).__name__ if pool is not None else None,
+            "size": read("size"),
+            "checked_out": read("checkedout"),
+            "checked_in": read("checkedin"),
+            "overflow": read("overflow"),
+            "connections_opened": self.connections_opened,
+            "timeouts": self.pool_timeouts,
+            "checkout_wait": self.checkout_wait.snapshot(),
+        }
+
+    def top_statements(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Statements ordered by total time spent"""
+        ranked = sorted(self.by_statement.items(), key=lambda item: item[1].total_ms, reverse=True)
+        return [dict(statement=statement, **histogram.snapshot()) for statement, histogram in ranked[:limit]]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "statements": self.statements.snapshot(),
+                "errors": self.errors,
+                "slow_query_threshold_ms": self.slow_query_threshold_ms,
+                "slow_queries": list(self.slow_queries),
+                "top_statements": self.top_statements(),
+                "pool": self.pool_status(),
+            }
@@ -0,0 +1,229 @@
+import os
+import json
+import base64
+import binascii
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from fnmatch import fnmatch
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Tuple
+from .workspace_service import Workspace, WorkspaceError, INTERNAL_DIRS
+
+# Never listed: dependency trees, virtualenvs, caches and build output
+DEFAULT_IGNORE = (
+    ".git", "node_modules", "venv", ".venv", "__pycache__", ".pytest_cache", ".mypy_cache", ".tox",
+    "dist", "build", "*.pyc", ".DS_Store", *INTERNAL_DIRS,
+)
+
+EntryKey = Tuple[int, str, str]
+
+class Listing(NamedTuple):
+    mtime_ns: int
+    keys: List[EntryKey]
+    entries: List[Dict[str, Any]]
+
+def entry_key(entry: Dict[str, Any]) -> EntryKey:
+    """Directories first, then case-insensitive by name"""
+    return (0 if entry["type"] == "directory" else 1, entry["name"].lower(), entry["name"])
+
+def encode_cursor(key: EntryKey) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> EntryKey:
+    try:
+        rank, folded, name = json.loads(base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()))
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise WorkspaceError("Invalid pagination cursor") from e
+    if not isinstance(rank, int) or not isinstance(folded, str) or not isinstance(name, str):
+        raise WorkspaceError("Invalid pagination cursor")
+    return rank, folded, name
+
+def ignore_from_env() -> Tuple[str, ...]:
+    """DEFAULT_IGNORE plus the comma-separated patterns in WORKSPACE_IGNORE"""
+    extra = [pattern.strip() for pattern in os.getenv("WORKSPACE_IGNORE", "").split(",") if pattern.strip()]
+    return DEFAULT_IGNORE + tuple(extra)
+
+class DirectoryListing:
+    """
+    One-level directory listings of a workspace, cached per directory
+
+    Each directory is scanned once and its sorted entries, with their stat
+    results, are kept until the workspace reports a change. When the
+    workspace is watching the disk, changes made by other processes are
+    reported too and a cached listing is served without touching the disk;
+    otherwise the directory's mtime is checked on each request, which
+    catches entries being added or removed but not in-place edits by other
+    processes.
+    """
+
+    def __init__(self, workspace: Workspace, ignore: Iterable[str] = DEFAULT_IGNORE, max_directories: int = 10000):
+        self.workspace = workspace
+        self.ignore = tuple(ignore)
+        self.max_directories = max_directories
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listings: "OrderedDict[str, Listing]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_workspace(cls, workspace: Workspace, ignore: Optional[Iterable[str]] = None,
+                      watch: bool = True) -> "DirectoryListing":
+        """Listing kept in sync with the workspace, which also watches the disk when watchdog is available"""
+        listing = cls(workspace, ignore if ignore is not None else ignore_from_env())
+        workspace.subscribe(listing.on_change)
+        if watch:
+            workspace.watch()
+        return listing
+
+    @property
+    def watching(self) -> bool:
+        return self.workspace.watching
+
+    def is_ignored(self, path: str) -> bool:
+        relative = path.lstrip("/")
+        name = PurePosixPath(relative).name
+        return any(fnmatch(relative, pattern) if "/" in pattern else fnmatch(name, pattern)
+                   for pattern in self.ignore)
+
+    def is_ignored_below(self, path: str) -> bool:
+        """Whether path or any of its ancestors is ignored"""
+        posix = PurePosixPath(path)
+        return any(self.is_ignored(str(part)) for part in (posix, *posix.parents) if str(part) != "/")
+
+    def _scan(self, directory: Path, path: str) -> Listing:
+        mtime_ns = directory.stat().st_mtime_ns
+        entries = []
+        with os.scandir(directory) as scan:
+            for item in scan:
+                child = f"{path.rstrip('/')}/{item.name}"
+                if self.is_ignored(child):
+                    continue
+                try:
+                    is_dir = item.is_dir()
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append({
+                    "name": item.name,
+                    "path": child,
+                    "type": "directory" if is_dir else "file",
+                    "size": stat.st_size,
+                    "modified": stat.st_mtime,
+                    "symlink": item.is_symlink(),
+                })
+        entries.sort(key=entry_key)
+        return Listing(mtime_ns, [entry_key(entry) for entry in entries], entries)
+
+    def _listing(self, path: str) -> Listing:
+        directory = self.workspace.resolve(path)
+        path = self.workspace.relative(directory)
+        if self.is_ignored_below(path):
+            raise FileNotFoundError(path)
+        with self._lock:
+            cached = self._listings.get(path)
+            if cached is not None:
+                self._listings.move_to_end(path)
+        if cached is not None and (self.watching or directory.stat().st_mtime_ns == cached.mtime_ns):
+            self.hits += 1
+            return cached
+        if not directory.is_dir():
+            raise NotADirectoryError(path) if directory.exists() else FileNotFoundError(path)
+        self.misses += 1
+        listing = self._scan(directory, path)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_directories:
+                self._listings.popitem(last=False)
+        return listing
+
+    def list(self, path: str = "/", limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Entries directly inside a directory, directories first
+
+        Args:
+            path: Directory to list
+            limit: Page size; all remaining entries when None
+            cursor: next_cursor of the previous page
+
+        Returns:
+            (entries, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            FileNotFoundError: If the directory does not exist or is ignored
+            NotADirectoryError: If path is a file
+            WorkspaceError: If the path or cursor is invalid
+        """
+        listing = self._listing(path)
+        start = bisect_right(listing.keys, decode_cursor(cursor)) if cursor else 0
+        end = len(listing.entries) if limit is None else min(start + limit, len(listing.entries))
+        next_cursor = encode_cursor(listing.keys[end - 1]) if end < len(listing.entries) else None
+        return listing.entries[start:end], next_cursor
+
+    def tree(self, path: str = "/", depth: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Nested FileNode structure built from cached listings
+
+        Directories deeper than depth are returned without children, for
+        the client to expand lazily; depth None expands everything that is
+        not ignored. Symlinked directories are never expanded here, since a
+        link to an ancestor would recurse forever; they too are expanded
+        one level at a time through list().
+        """
+        directory = self.workspace.resolve(path)
+        path = self.workspace.relative(directory)
+        node = {"name": directory.name if path != "/" else "root", "path": path, "type": "directory"}
+        return self._expand(node, depth)
+
+    def _expand(self, node: Dict[str, Any], depth: Optional[int]) -> Dict[str, Any]:
+        if depth is not None and depth <= 0:
+            return node
+        children = []
+        for entry in self._listing(node["path"]).entries:
+            child = {"name": entry["name"], "path": entry["path"], "type": entry["type"]}
+            if entry["type"] == "file":
+                child["children"] = []
+            elif not entry["symlink"]:
+                child = self._expand(child, None if depth is None else depth - 1)
+            children.append(child)
+        return dict(node, children=children)
+
+    def invalidate(self, path: str, subtree: bool = False) -> None:
+        """Forget the listings of path and its parent, and of everything below path when subtree is set"""
+        parent = str(PurePosixPath(path).parent)
+        with self._lock:
+            self.invalidations += 1
+            self._listings.pop(parent, None)
+            self._listings.pop(path, None)
+            if subtree:
+                prefix = path.rstrip("/") + "/"
+                for cached in [cached for cached in self._listings if cached == path or cached.startswith(prefix)]:
+                    del self._listings[cached]
+
+    def on_change(self, event: str, path: str) -> None:
+        """Workspace listener; changes inside ignored directories such as node_modules are skipped"""
+        if self.is_ignored_below(path):
+            return
+        if event == "created":
+            # Writes create missing parent directories, so every ancestor may have changed
+            with self._lock:
+                self.invalidations += 1
+                for ancestor in PurePosixPath(path).parents:
+                    self._listings.pop(str(ancestor), None)
+        else:
+            self.invalidate(path, subtree=event == "deleted")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "watching": self.watching,
+            "cached_directories": len(self._listings),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
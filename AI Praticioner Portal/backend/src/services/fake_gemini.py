@@ -0,0 +1,96 @@
+import re
+import json
+import asyncio
+import argparse
+from typing import Dict, Any, List
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKEN_PATTERN = re.compile(r"\s*\S+(?:\s+$)?")
+
+def fake_completion(prompt: str) -> str:
+    """Deterministic code for a prompt, so repeated requests are comparable"""
+    request = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+    name = "_".join(re.findall(r"[a-z0-9]+", request.lower())[:4]) or "example"
+    return f"def {name}():\n    # {request}\n    return 'Hello World'\n"
+
+def split_tokens(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text) or [text]
+
+def candidate(text: str) -> Dict[str, Any]:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+def create_app(first_token_delay: float = 0.0, token_delay: float = 0.0, api_key: str = "test-key") -> FastAPI:
+    """
+    Local stand-in for the Gemini generateContent API
+
+    Serves generateContent and streamGenerateContent (alt=sse) with a
+    deterministic completion, optionally delayed to imitate model latency.
+    /batch imitates a synchronous batch gateway (GEMINI_BATCH_URL) that
+    answers several prompts in one call.
+    app.state.requests counts upstream calls for tests and benchmarks.
+    """
+    app = FastAPI(title="Fake Gemini")
+    app.state.requests = 0
+    app.state.batched_prompts = 0
+
+    def prompt_of(body: Dict[str, Any]) -> str:
+        return "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+
+    def check_key(key: str):
+        if key != api_key:
+            return JSONResponse(status_code=400, content={"error": {"code": 400, "message": "API key not valid"}})
+        return None
+
+    @app.post("/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request, x_goog_api_key: str = Header("")):
+        rejected = check_key(x_goog_api_key)
+        if rejected:
+            return rejected
+        app.state.requests += 1
+        body = await request.json()
+        text = fake_completion(prompt_of(body))
+        await asyncio.sleep(first_token_delay + token_delay * len(split_tokens(text)))
+        return candidate(text)
+
+    @app.post("/batch")
+    async def batch_generate_content(request: Request, x_goog_api_key: str = Header("")):
+        rejected = check_key(x_goog_api_key)
+        if rejected:
+            return rejected
+        app.state.requests += 1
+        body = await request.json()
+        texts = [fake_completion(prompt_of(item)) for item in body.get("requests", [])]
+        app.state.batched_prompts += len(texts)
+        await asyncio.sleep(first_token_delay + token_delay * max((len(split_tokens(t)) for t in texts), default=0))
+        return {"responses": [candidate(text) for text in texts]}
+
+    @app.post("/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request, x_goog_api_key: str = Header("")):
+        rejected = check_key(x_goog_api_key)
+        if rejected:
+            return rejected
+        app.state.requests += 1
+        body = await request.json()
+        tokens = split_tokens(fake_completion(prompt_of(body)))
+
+        async def events():
+            await asyncio.sleep(first_token_delay)
+            for token in tokens:
+                yield f"data: {json.dumps(candidate(token))}\r\n\r\n"
+                await asyncio.sleep(token_delay)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--api-key", default="test-key")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.first_token_delay, args.token_delay, args.api_key), port=args.port)
@@ -1,27 +1,369 @@
-from typing import Optional
+from typing import Optional, Dict, Any, AsyncIterator, List
 from pydantic import BaseModel
 import os
+import json
+import time
+import asyncio
+import threading
+import httpx
+from .db_metrics import LatencyHistogram
+from .generation_cache import GenerationCache, generation_key
+from .request_coalescing import SingleFlight, MicroBatcher
+
+DEFAULT_GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+DEFAULT_GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+DEFAULT_GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+# Micro-batching needs both a window and a synchronous batch gateway: POST {"requests": [...]} answered
+# with {"responses": [...]}. Gemini's own batchGenerateContent creates an asynchronous batch job instead.
+DEFAULT_GEMINI_BATCH_WINDOW_MS = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "0"))
+DEFAULT_GEMINI_BATCH_URL = os.getenv("GEMINI_BATCH_URL") or None
+DEFAULT_GEMINI_MAX_BATCH_SIZE = int(os.getenv("GEMINI_MAX_BATCH_SIZE", "16"))
+
+# Only prompts up to this length are batched; long prompts gain little from sharing a request
+BATCH_MAX_PROMPT_CHARS = 2000
+
+NOT_CONFIGURED = "Gemini API not configured. Please set GEMINI_API_KEY environment variable."
 
 class GeminiResponse(BaseModel):
     status: str
     content: str
     error: Optional[str] = None
+    cached: bool = False
+
+class GeminiError(Exception):
+    """Raised when a streamed generation fails"""
+    pass
+
+def build_prompt(prompt: str, language: Optional[str] = None) -> str:
+    if language:
+        return f"Write {language} code for the following request. Reply with code only.\n\n{prompt}"
+    return f"Write code for the following request. Reply with code only.\n\n{prompt}"
+
+def build_request(prompt: str, language: Optional[str] = None, temperature: Optional[float] = None,
+                  max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """generateContent request body"""
+    body: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": build_prompt(prompt, language)}]}]}
+    config = {}
+    if temperature is not None:
+        config["temperature"] = temperature
+    if max_output_tokens is not None:
+        config["maxOutputTokens"] = max_output_tokens
+    if config:
+        body["generationConfig"] = config
+    return body
+
+def response_text(payload: Dict[str, Any]) -> str:
+    """Concatenated text parts of the first candidate"""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+def payload_error(payload: Any) -> Optional[str]:
+    """Why a 200 generateContent payload carries no completion: an error, a blocked prompt or no candidates"""
+    if not isinstance(payload, dict):
+        return "Gemini API returned an invalid response"
+    error = payload.get("error")
+    if error:
+        return error.get("message", "Gemini API returned an error") if isinstance(error, dict) else str(error)
+    if not payload.get("candidates"):
+        reason = (payload.get("promptFeedback") or {}).get("blockReason")
+        return f"Prompt blocked: {reason}" if reason else "Gemini API returned no candidates"
+    return None
+
+def error_message(response: httpx.Response) -> str:
+    try:
+        return response.json()["error"]["message"]
+    except (ValueError, KeyError, TypeError):
+        return f"Gemini API returned HTTP {response.status_code}"
+
+class GenerationMetrics:
+    """Time to first token, total latency and outcome counters for code generation"""
 
-class GeminiService:
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
+        self.time_to_first_token = LatencyHistogram()
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+        self.chunks = 0
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms: float, ttft_ms: Optional[float] = None, chunks: int = 0,
+               error: bool = False, stream: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.streams += stream
+            self.errors += error
+            self.chunks += chunks
+            self.latency.observe(duration_ms)
+            if ttft_ms is not None:
+                self.time_to_first_token.observe(ttft_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streams": self.streams,
+                "errors": self.errors,
+                "chunks": self.chunks,
+                "time_to_first_token": self.time_to_first_token.snapshot(),
+                "latency": self.latency.snapshot(),
+            }
+
+class GeminiService:
+    """
+    Code generation through the Gemini REST API
+
+    Requests go through long-lived pooled httpx clients, so consecutive
+    calls reuse TLS connections. generate_code_async and stream_code are the
+    async entry points; stream_code yields text as the model produces it.
+    generate_code is kept for synchronous callers. With a GenerationCache,
+    successful completions are reused for identical requests unless the
+    caller passes use_cache=False.
+
+    Concurrent identical async requests share one upstream call. With a
+    batch window and a batch_url, distinct short prompts arriving within the
+    window are sent together in one request to that gateway; a batch that
+    fails is retried as one generateContent call per prompt.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_GEMINI_MODEL,
+                 base_url: str = DEFAULT_GEMINI_API_BASE, timeout: float = DEFAULT_GEMINI_TIMEOUT,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, cache: Optional[GenerationCache] = None,
+                 batch_window_ms: float = DEFAULT_GEMINI_BATCH_WINDOW_MS,
+                 max_batch_size: int = DEFAULT_GEMINI_MAX_BATCH_SIZE,
+                 batch_url: Optional[str] = DEFAULT_GEMINI_BATCH_URL):
+        self.api_key = api_key if api_key is not None else os.getenv("GEMINI_API_KEY")
         self.enabled = bool(self.api_key)
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.transport = transport
+        self.cache = cache
+        self.metrics = GenerationMetrics()
+        self.inflight = SingleFlight()
+        self.batch_url = batch_url
+        self.batch_fallbacks = 0
+        self.batcher = None
+        if batch_window_ms > 0 and batch_url:
+            self.batcher = MicroBatcher(self._send_batch, batch_window_ms, max_batch_size)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_client: Optional[httpx.Client] = None
+
+    def _url(self, method: str) -> str:
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {"x-goog-api-key": self.api_key or "", "Content-Type": "application/json"}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self.transport)
+            self._client_loop = loop
+        return self._client
+
+    def _get_sync_client(self) -> httpx.Client:
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._sync_client
 
-    def generate_code(self, prompt: str) -> GeminiResponse:
+    def _cache_key(self, prompt: str, language: Optional[str], temperature: Optional[float],
+                   max_output_tokens: Optional[int], use_cache: bool) -> Optional[str]:
+        if self.cache is None or not use_cache:
+            return None
+        return generation_key(prompt, self.model, language=language, temperature=temperature,
+                              max_output_tokens=max_output_tokens)
+
+    def _cached(self, key: Optional[str]) -> Optional[GeminiResponse]:
+        content = self.cache.get(key) if key is not None else None
+        return GeminiResponse(status="success", content=content, cached=True) if content is not None else None
+
+    def _store(self, key: Optional[str], response: GeminiResponse) -> GeminiResponse:
+        # Empty completions are never cached, whatever the upstream reported
+        if key is not None and response.status == "success" and response.content:
+            self.cache.set(key, response.content)
+        return response
+
+    async def _cached_async(self, key: Optional[str]) -> Optional[GeminiResponse]:
+        content = await self.cache.get_async(key) if key is not None else None
+        return GeminiResponse(status="success", content=content, cached=True) if content is not None else None
+
+    async def _store_async(self, key: Optional[str], response: GeminiResponse) -> GeminiResponse:
+        # Empty completions are never cached, whatever the upstream reported
+        if key is not None and response.status == "success" and response.content:
+            await self.cache.set_async(key, response.content)
+        return response
+
+    def generate_code(self, prompt: str, language: Optional[str] = None, temperature: Optional[float] = None,
+                      max_output_tokens: Optional[int] = None, use_cache: bool = True) -> GeminiResponse:
+        """Generate code and return the whole completion"""
         if not self.enabled:
-            return GeminiResponse(
-                status="error",
-                content="",
-                error="Gemini API not configured. Please set GEMINI_API_KEY environment variable."
+            return GeminiResponse(status="error", content="", error=NOT_CONFIGURED)
+        key = self._cache_key(prompt, language, temperature, max_output_tokens, use_cache)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        try:
+            response = self._get_sync_client().post(
+                self._url("generateContent"), headers=self._headers(),
+                json=build_request(prompt, language, temperature, max_output_tokens),
             )
-            
-        # TODO: Implement actual Gemini API call
-        return GeminiResponse(
-            status="success",
-            content="def example_function():\n    return 'Hello World'"
-        )
+        except httpx.HTTPError as e:
+            self.metrics.record((time.perf_counter() - started) * 1000, error=True)
+            return GeminiResponse(status="error", content="", error=f"Gemini API request failed: {e}")
+        return self._store(key, self._to_response(response, started))
+
+    async def generate_code_async(self, prompt: str, language: Optional[str] = None,
+                                  temperature: Optional[float] = None,
+                                  max_output_tokens: Optional[int] = None, use_cache: bool = True) -> GeminiResponse:
+        """Async generate_code; the event loop is free while the model runs"""
+        if not self.enabled:
+            return GeminiResponse(status="error", content="", error=NOT_CONFIGURED)
+        key = self._cache_key(prompt, language, temperature, max_output_tokens, use_cache)
+        cached = await self._cached_async(key)
+        if cached is not None:
+            return cached
+
+        body = build_request(prompt, language, temperature, max_output_tokens)
+        if not use_cache:
+            return await self._generate(body)
+        flight_key = generation_key(prompt, self.model, language=language, temperature=temperature,
+                                    max_output_tokens=max_output_tokens)
+        return await self.inflight.do(flight_key, lambda: self._generate_and_store(key, body))
+
+    async def _generate_and_store(self, key: Optional[str], body: Dict[str, Any]) -> GeminiResponse:
+        return await self._store_async(key, await self._generate(body))
+
+    async def _generate(self, body: Dict[str, Any]) -> GeminiResponse:
+        """One upstream generation, through the micro-batcher when it is enabled and the prompt is short"""
+        prompt_chars = sum(len(part.get("text", "")) for part in body["contents"][0]["parts"])
+        if self.batcher is not None and prompt_chars <= BATCH_MAX_PROMPT_CHARS:
+            return await self.batcher.submit(body)
+        return await self._post_generate(body)
+
+    async def _post_generate(self, body: Dict[str, Any]) -> GeminiResponse:
+        started = time.perf_counter()
+        try:
+            response = await self._get_client().post(self._url("generateContent"), headers=self._headers(), json=body)
+        except httpx.HTTPError as e:
+            self.metrics.record((time.perf_counter() - started) * 1000, error=True)
+            return GeminiResponse(status="error", content="", error=f"Gemini API request failed: {e}")
+        return self._to_response(response, started)
+
+    async def _send_batch(self, bodies: List[Dict[str, Any]]) -> List[GeminiResponse]:
+        if len(bodies) == 1:
+            return [await self._post_generate(bodies[0])]
+
+        started = time.perf_counter()
+        requests = [dict(body, model=f"models/{self.model}") for body in bodies]
+        try:
+            response = await self._get_client().post(self.batch_url, headers=self._headers(),
+                                                     json={"requests": requests})
+            payloads = response.json().get("responses") if response.status_code == 200 else None
+        except (httpx.HTTPError, ValueError, AttributeError):
+            payloads = None
+        if not isinstance(payloads, list) or len(payloads) != len(bodies):
+            # The gateway is down or answered something else; send the prompts one by one instead
+            self.batch_fallbacks += 1
+            return list(await asyncio.gather(*(self._post_generate(body) for body in bodies)))
+        duration_ms = (time.perf_counter() - started) * 1000
+        return [self._payload_response(payload, duration_ms) for payload in payloads]
+
+    def _payload_response(self, payload: Any, duration_ms: float) -> GeminiResponse:
+        error = payload_error(payload)
+        if error:
+            self.metrics.record(duration_ms, error=True)
+            return GeminiResponse(status="error", content="", error=error)
+        self.metrics.record(duration_ms, ttft_ms=duration_ms, chunks=1)
+        return GeminiResponse(status="success", content=response_text(payload))
+
+    def _to_response(self, response: httpx.Response, started: float) -> GeminiResponse:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            self.metrics.record(duration_ms, error=True)
+            return GeminiResponse(status="error", content="", error=error_message(response))
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return self._payload_response(payload, duration_ms)
+
+    async def stream_code(self, prompt: str, language: Optional[str] = None, temperature: Optional[float] = None,
+                          max_output_tokens: Optional[int] = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Generate code, yielding text chunks as they arrive
+
+        A cached completion is yielded as a single chunk; a streamed one is
+        cached once it has been received in full.
+
+        Raises:
+            GeminiError: If the service is not configured or the request fails
+        """
+        if not self.enabled:
+            raise GeminiError(NOT_CONFIGURED)
+        key = self._cache_key(prompt, language, temperature, max_output_tokens, use_cache)
+        cached = await self._cached_async(key)
+        if cached is not None:
+            yield cached.content
+            return
+        received = []
+
+        started = time.perf_counter()
+        ttft_ms = None
+        chunks = 0
+        failed = True
+        try:
+            async with self._get_client().stream(
+                "POST", self._url("streamGenerateContent"), params={"alt": "sse"}, headers=self._headers(),
+                json=build_request(prompt, language, temperature, max_output_tokens),
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise GeminiError(error_message(response))
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        text = response_text(json.loads(line[5:]))
+                    except ValueError:
+                        continue
+                    if not text:
+                        continue
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    chunks += 1
+                    received.append(text)
+                    yield text
+            failed = False
+            await self._store_async(key, GeminiResponse(status="success", content="".join(received)))
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Gemini API request failed: {e}") from e
+        finally:
+            self.metrics.record((time.perf_counter() - started) * 1000, ttft_ms=ttft_ms, chunks=chunks,
+                                error=failed, stream=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.metrics.snapshot(), model=self.model, enabled=self.enabled,
+                    cache=self.cache.stats() if self.cache is not None else None,
+                    coalescing=self.inflight.stats(),
+                    batching=dict(self.batcher.stats(), fallbacks=self.batch_fallbacks)
+                    if self.batcher is not None else None)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from .user_cache import LRUCache
+
+WHITESPACE = re.compile(r"[ \t]+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Trim, unify newlines and collapse runs of spaces so trivially different prompts share an entry"""
+    lines = prompt.replace("\r\n", "\n").replace("\r", "\n").strip().split("\n")
+    return "\n".join(WHITESPACE.sub(" ", line).strip() for line in lines)
+
+def generation_key(prompt: str, model: str, **params: Any) -> str:
+    """Content address of a generation request: normalized prompt, model and parameters"""
+    params = {name: value for name, value in params.items() if value is not None}
+    if isinstance(params.get("language"), str):
+        params["language"] = params["language"].strip().lower()
+    raw = json.dumps({"prompt": normalize_prompt(prompt), "model": model, "params": params}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """
+    Completions stored one file per key under a directory
+
+    Entries expire after ttl seconds. When the directory grows past
+    max_bytes the least recently used files are removed until it is back
+    under 90% of the limit; hits refresh a file's mtime, which doubles as
+    its last-use time.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._index: Dict[str, Tuple[int, float]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+        for file in self.path.glob("*/*.json"):
+            stat = file.stat()
+            self._index[file.stem] = (stat.st_size, stat.st_mtime)
+            self._bytes += stat.st_size
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    def _forget(self, key: str) -> None:
+        size, _ = self._index.pop(key, (0, 0.0))
+        self._bytes -= size
+        try:
+            self._file(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._index:
+                return None
+            file = self._file(key)
+            try:
+                entry = json.loads(file.read_text(encoding="utf-8"))
+                created, content = float(entry["created"]), entry["content"]
+            except (OSError, ValueError, KeyError, TypeError):
+                # Unreadable or malformed entries are evicted like expired ones
+                self._forget(key)
+                return None
+            if created + self.ttl <= time.time() or not isinstance(content, str):
+                self._forget(key)
+                return None
+            now = time.time()
+            os.utime(file, (now, now))
+            self._index[key] = (self._index[key][0], now)
+            return content
+
+    def set(self, key: str, content: str) -> None:
+        data = json.dumps({"created": time.time(), "content": content}).encode("utf-8")
+        with self._lock:
+            file = self._file(key)
+            file.parent.mkdir(exist_ok=True)
+            tmp = file.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, file)
+            size, _ = self._index.get(key, (0, 0.0))
+            self._index[key] = (len(data), time.time())
+            self._bytes += len(data) - size
+            if self._bytes > self.max_bytes:
+                target = self.max_bytes * 0.9
+                for stale in sorted(self._index, key=lambda k: self._index[k][1]):
+                    if self._bytes <= target:
+                        break
+                    self._forget(stale)
+                    self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+class GenerationCache:
+    """
+    Two-tier cache of code generation results
+
+    Lookups try the in-process LRU, then the optional disk tier, promoting
+    disk hits into memory. Only successful completions should be stored.
+    Async callers use get_async and set_async, which run the disk tier in
+    the thread pool so file reads and writes never block the event loop.
+    """
+
+    def __init__(self, memory: Optional[LRUCache] = None, disk: Optional[DiskCache] = None):
+        self.memory = memory if memory is not None else LRUCache(maxsize=1000, ttl=3600)
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "GenerationCache":
+        """Build from GENERATION_CACHE_SIZE/_TTL and, for the disk tier, GENERATION_CACHE_DIR/_MAX_MB"""
+        ttl = float(os.getenv("GENERATION_CACHE_TTL", "86400"))
+        memory = LRUCache(maxsize=int(os.getenv("GENERATION_CACHE_SIZE", "1000")), ttl=ttl)
+        disk = None
+        disk_path = os.getenv("GENERATION_CACHE_DIR")
+        if disk_path:
+            max_bytes = int(float(os.getenv("GENERATION_CACHE_MAX_MB", "256")) * 1024 * 1024)
+            disk = DiskCache(disk_path, ttl=ttl, max_bytes=max_bytes)
+        return cls(memory=memory, disk=disk)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        content = self.memory.get(key)
+        if content is not None:
+            self.memory_hits += 1
+        return content
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        content = self.disk.get(key) if self.disk is not None else None
+        if content is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, content)
+        return content
+
+    def get(self, key: str) -> Optional[str]:
+        content = self._get_memory(key)
+        return content if content is not None else self._get_disk(key)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        content = self._get_memory(key)
+        if content is not None:
+            return content
+        if self.disk is None:
+            self.misses += 1
+            return None
+        return await run_in_threadpool(self._get_disk, key)
+
+    def set(self, key: str, content: str) -> None:
+        self.memory.set(key, content)
+        if self.disk is not None:
+            self.disk.set(key, content)
+
+    async def set_async(self, key: str, content: str) -> None:
+        self.memory.set(key, content)
+        if self.disk is not None:
+            await run_in_threadpool(self.disk.set, key, content)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_size": len(self.disk) if self.disk is not None else None,
+            "disk_bytes": self.disk.bytes if self.disk is not None else None,
+            "disk_evictions": self.disk.evictions if self.disk is not None else None,
+        }
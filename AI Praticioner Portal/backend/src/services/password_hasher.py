@@ -0,0 +1,128 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+import bcrypt
+
+DEFAULT_BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt only reads this many bytes; longer passwords are truncated explicitly,
+# as older bcrypt releases did silently, so existing hashes keep verifying
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+class HasherBusyError(Exception):
+    """Raised when too many hashing jobs are already waiting"""
+    pass
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password[:BCRYPT_MAX_PASSWORD_BYTES], bcrypt.gensalt(rounds=rounds))
+
+def _verify(password: bytes, hashed: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password[:BCRYPT_MAX_PASSWORD_BYTES], hashed)
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash ($2b$12$...), or None if it is not bcrypt"""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[1].startswith("2"):
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+class PasswordHasher:
+    """
+    bcrypt in a bounded process pool behind an async API
+
+    Hashing runs in worker processes so a login burst neither blocks the event
+    loop nor serializes on the GIL. At most max_pending jobs may be queued or
+    running; further calls raise HasherBusyError instead of piling up.
+    """
+
+    def __init__(self, rounds: int = DEFAULT_BCRYPT_ROUNDS, max_workers: Optional[int] = None,
+                 max_pending: int = 256):
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError("Too many password hashing requests in flight")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost factor"""
+        hashed = await self._submit(_hash, password.encode("utf-8"), self.rounds)
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a stored bcrypt hash"""
+        return await self._submit(_verify, password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password in the calling thread, for code that is not on the event loop"""
+        return _hash(password.encode("utf-8"), self.rounds).decode("utf-8")
+
+    def verify_sync(self, password: str, hashed_password: str) -> bool:
+        """Verify a password in the calling thread, for code that is not on the event loop"""
+        return _verify(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True when the stored hash was made with a different cost factor"""
+        return hash_rounds(hashed_password) != self.rounds
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and rehash it when its cost factor is out of date
+
+        Returns:
+            (valid, new_hash): new_hash is None unless the password was valid
+            and the stored hash should be replaced
+        """
+        if not await self.verify(password, hashed_password):
+            return False, None
+        if not self.needs_rehash(hashed_password):
+            return True, None
+        self.rehashed += 1
+        return True, await self.hash(password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "workers": self.max_workers,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.max_workers),
+            "peak_in_flight": self.peak_pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
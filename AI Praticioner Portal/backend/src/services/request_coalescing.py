@@ -0,0 +1,136 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+class _Flight:
+    """An in-flight call and the number of callers awaiting it"""
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers with the same key
+
+    The first caller for a key starts the call in its own task; every caller,
+    the first included, awaits that task through a shield, so cancelling
+    any one of them leaves the others waiting. The call itself is cancelled
+    only once no caller is left. Nothing is kept once the call completes, so
+    this only deduplicates overlapping work.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls: Dict[Any, _Flight] = {}
+
+    async def do(self, key: Any, call: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        flight = self._calls.get(key)
+        if flight is not None and flight.task.get_loop() is loop and not flight.task.done():
+            self.followers += 1
+        else:
+            self.leaders += 1
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finish(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _finish(self, key: Any, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        if not flight.task.cancelled():
+            # Retrieve it here so a failure nobody awaited any more is not logged
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.followers
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_rate": self.followers / calls if calls else 0.0,
+        }
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Group calls arriving within a short window into one batched call
+
+    submit() queues an item; the batch is sent when window_ms has passed
+    since its first item or when it reaches max_batch_size, whichever comes
+    first. send_batch receives the items in order and must return one
+    result per item.
+    """
+
+    def __init__(self, send_batch: Callable[[List[T]], Awaitable[List[R]]], window_ms: float = 10.0,
+                 max_batch_size: int = 16):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.send_batch = send_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[T, "asyncio.Future"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Batches never span event loops
+            self._pending = []
+            self._timer = None
+            self._loop = loop
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            self.items += len(batch)
+            task = self._loop.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[T, "asyncio.Future"]]) -> None:
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "batched_requests": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
@@ -1,36 +1,111 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, FrozenSet, NamedTuple, Iterable, Union
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import threading
+import time
 import jwt
 from fastapi import HTTPException
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from .password_hasher import PasswordHasher
+from .user_store import InMemoryUserStore, DatabaseUserStore
 
 # Security settings
 SECRET_KEY = "your-secret-key-here"  # In production, this should be in environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified token cache settings
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_MAX_TTL = 300  # Seconds; caps caching of tokens without an exp claim
 
 class AuthenticationError(Exception):
     """Raised when authentication fails"""
     pass
 
+class VerifiedToken(NamedTuple):
+    """Claims of a token whose signature and expiry have been checked"""
+    claims: Dict[str, Any]
+    expires_at: float
+    roles: Optional[FrozenSet[str]]  # Set when roles travel as a signed claim
+
+class TokenCache:
+    """Bounded LRU of verified tokens, each dropped once its exp has passed"""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, VerifiedToken]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[VerifiedToken]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry.expires_at > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, entry: VerifiedToken) -> None:
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
 class SecurityService:
-    def __init__(self) -> None:
-        """Initialize security service with in-memory storage"""
-        self._users: Dict[str, Dict[str, Any]] = {}  # In-memory user store
-        self._roles: Dict[str, List[str]] = {}  # User roles mapping
+    def __init__(self, hasher: Optional[PasswordHasher] = None, token_cache_size: int = TOKEN_CACHE_SIZE,
+                 user_store: Optional[Union[InMemoryUserStore, DatabaseUserStore]] = None) -> None:
+        """
+        Initialize security service
 
-    def verify_token(self, token: str) -> bool:
-        """Verify JWT token"""
+        Credentials and roles live in user_store; pass a DatabaseUserStore to
+        share them across workers and restarts. Defaults to in-memory storage.
+        """
+        self.users = user_store if user_store is not None else InMemoryUserStore()
+        self.hasher = hasher if hasher is not None else PasswordHasher()
+        self.token_cache = TokenCache(token_cache_size)
+
+    def decode_token(self, token: str) -> Optional[VerifiedToken]:
+        """
+        Verify a JWT once and cache its claims until the token expires
+
+        Returns:
+            VerifiedToken if the signature, expiry and sub claim are valid, None otherwise
+        """
+        entry = self.token_cache.get(token)
+        if entry is not None:
+            return entry
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                return False
-            return True
         except jwt.exceptions.InvalidTokenError:
-            return False
+            return None
+        if payload.get("sub") is None:
+            return None
+
+        expires_at = time.time() + TOKEN_CACHE_MAX_TTL
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        roles = payload.get("roles")
+        entry = VerifiedToken(
+            claims=payload,
+            expires_at=expires_at,
+            roles=frozenset(roles) if isinstance(roles, list) else None,
+        )
+        self.token_cache.set(token, entry)
+        return entry
+
+    def verify_token(self, token: str) -> bool:
+        """Verify JWT token"""
+        return self.decode_token(token) is not None
 
     def authenticate(self, token: str) -> bool:
         """Authenticate user with token"""
@@ -38,9 +113,12 @@ class SecurityService:
             raise AuthenticationError("Invalid token")
         return True
 
-    def create_access_token(self, data: Dict[str, Any], expires_delta: timedelta = None) -> str:
-        """Create JWT access token"""
+    def create_access_token(self, data: Dict[str, Any], expires_delta: timedelta = None,
+                            roles: Optional[Iterable[str]] = None) -> str:
+        """Create JWT access token, optionally carrying the user's roles as a signed claim"""
         to_encode = data.copy()
+        if roles is not None:
+            to_encode["roles"] = sorted(set(roles))
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
         else:
@@ -49,41 +127,89 @@ class SecurityService:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
 
+    def authorize(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a token and resolve its roles with a single decode
+
+        Roles come from the signed roles claim when present, otherwise from
+        the service's role store.
+
+        Returns:
+            Dict with claims and roles (a frozenset), or None if the token is invalid
+        """
+        entry = self.decode_token(token)
+        if entry is None:
+            return None
+        roles = entry.roles
+        if roles is None:
+            roles = frozenset(self.users.get_roles(entry.claims["sub"]))
+        return {"claims": entry.claims, "roles": roles}
+
     def get_user_roles(self, token: str) -> List[str]:
         """Get user roles from token"""
-        if not self.verify_token(token):
+        entry = self.decode_token(token)
+        if entry is None:
             return []
-        
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        return self._roles.get(username, [])
+        if entry.roles is not None:
+            return sorted(entry.roles)
+        return self.users.get_roles(entry.claims["sub"])
 
     def authorize_user(self, token: str, required_role: str) -> bool:
         """Check if user has required role"""
-        roles = self.get_user_roles(token)
-        return required_role in roles
+        entry = self.decode_token(token)
+        if entry is None:
+            return False
+        if entry.roles is not None:
+            return required_role in entry.roles
+        return self.users.has_role(entry.claims["sub"], required_role)
+
+    def users_with_role(self, role: str) -> List[str]:
+        """Usernames holding role, answered from the store's reverse index"""
+        return self.users.users_with_role(role)
 
     def hash_password(self, password: str) -> str:
         """Hash a password for storing"""
-        return pwd_context.hash(password)
+        return self.hasher.hash_sync(password)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a stored password against a provided password"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return self.hasher.verify_sync(plain_password, hashed_password)
 
     def add_user(self, username: str, password: str, roles: List[str] = None) -> None:
         """Add a new user with hashed password and optional roles"""
         if roles is None:
             roles = []
         
-        self._users[username] = {
-            "password": self.hash_password(password)
-        }
-        self._roles[username] = roles
+        self.users.add_user(username, self.hash_password(password), roles)
 
     def verify_credentials(self, username: str, password: str) -> bool:
         """Verify user credentials"""
-        user = self._users.get(username)
-        if not user:
+        hashed_password = self.users.get_password_hash(username)
+        if not hashed_password:
+            return False
+        return self.verify_password(password, hashed_password)
+
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password in the hasher's process pool"""
+        return await self.hasher.hash(password)
+
+    async def add_user_async(self, username: str, password: str, roles: List[str] = None) -> None:
+        """add_user without running bcrypt or the user store on the event loop"""
+        hashed_password = await self.hash_password_async(password)
+        await run_in_threadpool(self.users.add_user, username, hashed_password, roles if roles is not None else [])
+
+    async def verify_credentials_async(self, username: str, password: str) -> bool:
+        """
+        Verify user credentials off the event loop
+
+        A stored hash made with a different cost factor than the hasher's is
+        replaced with a fresh hash after a successful login. User store reads
+        and writes, which may be database round-trips, run in the thread pool.
+        """
+        hashed_password = await run_in_threadpool(self.users.get_password_hash, username)
+        if not hashed_password:
             return False
-        return self.verify_password(password, user["password"])
+        valid, new_hash = await self.hasher.verify_and_update(password, hashed_password)
+        if new_hash is not None:
+            await run_in_threadpool(self.users.set_password_hash, username, new_hash)
+        return valid
@@ -0,0 +1,260 @@
+import os
+import copy
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class LocalSharedStore:
+    """
+    In-process stand-in for a Redis client
+
+    Implements the subset of the redis-py API used by SharedCache (get, set
+    with ex, delete, publish and pubsub) so the shared tier can be exercised
+    without a server. Messages are delivered synchronously on publish.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ex: Optional[float] = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def publish(self, channel: str, message: Any) -> int:
+        if isinstance(message, str):
+            message = message.encode()
+        handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            handler({"type": "message", "channel": channel.encode(), "data": message})
+        return len(handlers)
+
+    def pubsub(self, **options: Any) -> "LocalPubSub":
+        return LocalPubSub(self)
+
+class LocalPubSub:
+    """Subscriptions on a LocalSharedStore, shaped like redis-py's PubSub"""
+
+    def __init__(self, store: LocalSharedStore):
+        self.store = store
+
+    def subscribe(self, **handlers: Callable[[Dict[str, Any]], None]) -> None:
+        for channel, handler in handlers.items():
+            self.store._handlers.setdefault(channel, []).append(handler)
+
+    def run_in_thread(self, **options: Any) -> "LocalPubSub":
+        # Delivery already happens in publish; this stands in for the listener thread
+        return self
+
+    def stop(self) -> None:
+        self.store._handlers.clear()
+
+class SharedCache:
+    """
+    Cache tier shared across workers, backed by a redis-py compatible client
+
+    Deletes are also published on a channel, so every worker can drop its
+    own in-process copy of the entry.
+    """
+
+    def __init__(self, client: Any, ttl: float = 300.0, prefix: str = "user:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = prefix + "invalidate"
+        self._listener = None
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+        self.client.publish(self.channel, key)
+
+    def listen(self, on_delete: Callable[[str], None]) -> bool:
+        """Call on_delete(key) for deletes made by any worker; False when the client cannot subscribe"""
+        if self._listener is not None:
+            return True
+        try:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: lambda message: on_delete(_decode(message["data"]))})
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception as e:
+            logger.warning("Cannot subscribe to %s, in-process user cache disabled: %s", self.channel, e)
+            return False
+        return True
+
+def _decode(data: Any) -> str:
+    return data.decode() if isinstance(data, bytes) else str(data)
+
+class UserCache:
+    """
+    Read-through cache for DatabaseService.get_user
+
+    Lookups try the in-process LRU first, then the optional shared tier.
+    Writes through the service invalidate both tiers, and with a shared
+    tier every other worker drops its in-process copy through the tier's
+    invalidation channel. When that channel is unavailable the in-process
+    tier is skipped, so a worker never serves a user another worker has
+    changed. Returned dicts are copies, so callers cannot mutate cached
+    entries. The *_async methods serve in-process hits inline and run the
+    shared tier's blocking client in the thread pool, for use on the event
+    loop.
+    """
+
+    def __init__(self, local: Optional[LRUCache] = None, shared: Optional[SharedCache] = None):
+        self.local = local if local is not None else LRUCache()
+        self.shared = shared
+        self.local_enabled = shared is None or shared.listen(self.local.delete)
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    @classmethod
+    def from_env(cls) -> "UserCache":
+        """Build a cache from USER_CACHE_SIZE, USER_CACHE_TTL and (optionally) REDIS_URL"""
+        ttl = float(os.getenv("USER_CACHE_TTL", "300"))
+        local = LRUCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")), ttl=ttl)
+        shared = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            try:
+                import redis
+            except ImportError:
+                redis = None
+            if redis is not None:
+                shared = SharedCache(redis.Redis.from_url(redis_url), ttl=ttl)
+            else:
+                logger.warning("REDIS_URL is set but the redis package is not installed; user cache is per-process")
+        return cls(local=local, shared=shared)
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        user = self.local.get(username) if self.local_enabled else None
+        if user is None and self.shared is not None:
+            user = self.shared.get(username)
+            if user is not None:
+                self.shared_hits += 1
+                if self.local_enabled:
+                    self.local.set(username, user)
+        if user is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(user)
+
+    async def get_async(self, username: str) -> Optional[Dict[str, Any]]:
+        if self.shared is None:
+            return self.get(username)
+        user = self.local.get(username) if self.local_enabled else None
+        if user is not None:
+            self.hits += 1
+            return copy.deepcopy(user)
+        return await run_in_threadpool(self.get, username)
+
+    def set(self, username: str, user: Dict[str, Any]) -> None:
+        user = copy.deepcopy(user)
+        if self.local_enabled:
+            self.local.set(username, user)
+        if self.shared is not None:
+            self.shared.set(username, user)
+
+    async def set_async(self, username: str, user: Dict[str, Any]) -> None:
+        if self.shared is None:
+            self.set(username, user)
+        else:
+            await run_in_threadpool(self.set, username, user)
+
+    def invalidate(self, *usernames: str) -> None:
+        for username in usernames:
+            self.local.delete(username)
+            if self.shared is not None:
+                self.shared.delete(username)
+
+    async def invalidate_async(self, *usernames: str) -> None:
+        if self.shared is None:
+            self.invalidate(*usernames)
+        else:
+            await run_in_threadpool(self.invalidate, *usernames)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_hits": self.shared_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.local.evictions,
+            "size": len(self.local),
+        }
@@ -0,0 +1,107 @@
+from typing import List, Optional
+from sqlalchemy import select, func, distinct, text, inspect, column
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from ..models.user import User, UserRole
+
+MATCH_MODES = ("contains", "prefix")
+
+# Trigram indexes only help once the needle has at least one full trigram
+MIN_TRIGRAM_LENGTH = 3
+
+POSTGRES_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (lower(username) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_prefix ON users (lower(username) text_pattern_ops)",
+]
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "username, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); "
+    "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+]
+
+class UserSearchIndex:
+    """
+    Backend-specific username and role indexing for search_users
+
+    PostgreSQL gets pg_trgm and text_pattern_ops indexes on lower(username);
+    SQLite gets an FTS5 trigram table kept in sync by triggers. Anything else,
+    or a backend where the index cannot be created, falls back to a plain
+    LIKE on lower(username).
+    """
+
+    def __init__(self) -> None:
+        self.dialect: Optional[str] = None
+        self.trigram_enabled = False
+
+    def install(self, connection: Connection) -> None:
+        """Create the search structures and backfill user_roles if needed"""
+        self.dialect = connection.dialect.name
+        statements = {"postgresql": POSTGRES_INDEXES, "sqlite": SQLITE_FTS}.get(self.dialect, [])
+        if statements:
+            try:
+                with connection.begin_nested():
+                    fts_exists = self.dialect == "sqlite" and inspect(connection).has_table("users_fts")
+                    for statement in statements:
+                        connection.execute(text(statement))
+                    if self.dialect == "sqlite" and not fts_exists:
+                        connection.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                self.trigram_enabled = True
+            except SQLAlchemyError:
+                # Missing extension privileges or an SQLite build without FTS5 trigram support
+                self.trigram_enabled = False
+        self._backfill_roles(connection)
+
+    def _backfill_roles(self, connection: Connection, chunk_size: int = 1000) -> None:
+        """Populate user_roles from the JSON roles column for pre-existing rows"""
+        if connection.scalar(select(UserRole.user_id).limit(1)) is not None:
+            return
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(User.id, User.roles).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return
+            links = [{"user_id": user_id, "role": role} for user_id, roles in rows for role in set(roles or [])]
+            if links:
+                connection.execute(UserRole.__table__.insert(), links)
+            last_id = rows[-1][0]
+
+    def username_filter(self, query: str, match: str = "contains"):
+        """WHERE clause matching usernames that contain (or start with) query, case-insensitively"""
+        if match not in MATCH_MODES:
+            raise ValueError(f"match must be one of {', '.join(MATCH_MODES)}")
+        # lower(username) on both sides rather than ILIKE, so PostgreSQL can use the expression indexes
+        escaped = query.replace("/", "//").replace("%", "/%").replace("_", "/_")
+        pattern = f"{escaped}%" if match == "prefix" else f"%{escaped}%"
+        clause = func.lower(User.username).like(func.lower(pattern), escape="/")
+        if self.dialect == "sqlite" and self.trigram_enabled and len(query) >= MIN_TRIGRAM_LENGTH:
+            # Narrow candidates through the FTS5 index; the LIKE clause then runs on those rows only
+            phrase = '"' + query.replace('"', '""') + '"'
+            candidates = (
+                text("SELECT rowid FROM users_fts WHERE users_fts MATCH :phrase")
+                .bindparams(phrase=phrase)
+                .columns(column("rowid"))
+            )
+            clause = User.id.in_(candidates) & clause
+        return clause
+
+    @staticmethod
+    def roles_filter(roles: List[str]):
+        """WHERE clause matching users that hold every role in roles, using the role index"""
+        wanted = sorted(set(roles))
+        holders = (
+            select(UserRole.user_id)
+            .where(UserRole.role.in_(wanted))
+            .group_by(UserRole.user_id)
+            .having(func.count(distinct(UserRole.role)) == len(wanted))
+        )
+        return User.id.in_(holders)
@@ -0,0 +1,108 @@
+import threading
+from typing import Dict, List, Optional, Set
+from .database_service import DatabaseService
+
+class InMemoryUserStore:
+    """
+    Per-process credential and role store
+
+    Keeps a forward username -> roles map and a reverse role -> usernames
+    index, both updated incrementally, so role checks and membership queries
+    are O(1). Data does not survive a restart; use DatabaseUserStore for that.
+    """
+
+    def __init__(self):
+        self._passwords: Dict[str, str] = {}
+        self._roles: Dict[str, Set[str]] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def add_user(self, username: str, hashed_password: str, roles: List[str]) -> None:
+        with self._lock:
+            self._passwords[username] = hashed_password
+        self.set_roles(username, roles)
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        return self._passwords.get(username)
+
+    def set_password_hash(self, username: str, hashed_password: str) -> None:
+        with self._lock:
+            self._passwords[username] = hashed_password
+
+    def get_roles(self, username: str) -> List[str]:
+        return sorted(self._roles.get(username, ()))
+
+    def set_roles(self, username: str, roles: List[str]) -> None:
+        wanted = set(roles)
+        with self._lock:
+            current = self._roles.get(username, set())
+            for role in current - wanted:
+                members = self._members.get(role)
+                members.discard(username)
+                if not members:
+                    del self._members[role]
+            for role in wanted - current:
+                self._members.setdefault(role, set()).add(username)
+            self._roles[username] = wanted
+
+    def grant_role(self, username: str, role: str) -> None:
+        self.set_roles(username, self.get_roles(username) + [role])
+
+    def revoke_role(self, username: str, role: str) -> None:
+        self.set_roles(username, [r for r in self.get_roles(username) if r != role])
+
+    def has_role(self, username: str, role: str) -> bool:
+        return role in self._roles.get(username, ())
+
+    def users_with_role(self, role: str) -> List[str]:
+        return sorted(self._members.get(role, ()))
+
+    def remove_user(self, username: str) -> None:
+        self.set_roles(username, [])
+        with self._lock:
+            self._roles.pop(username, None)
+            self._passwords.pop(username, None)
+
+class DatabaseUserStore:
+    """
+    Credential and role store backed by the users and user_roles tables
+
+    State is shared by every worker and survives restarts. Role reads go
+    straight to the indexed user_roles table; password hashes go through
+    DatabaseService.get_user and therefore its cache when one is configured.
+    """
+
+    def __init__(self, database_service: DatabaseService):
+        self.db = database_service
+
+    def add_user(self, username: str, hashed_password: str, roles: List[str]) -> None:
+        self.db.store_user({"username": username, "hashed_password": hashed_password, "roles": sorted(set(roles))})
+
+    def get_password_hash(self, username: str) -> Optional[str]:
+        user = self.db.get_user(username)
+        return user["hashed_password"] if user else None
+
+    def set_password_hash(self, username: str, hashed_password: str) -> None:
+        self.db.set_password_hash(username, hashed_password)
+
+    def get_roles(self, username: str) -> List[str]:
+        return self.db.get_user_roles(username)
+
+    def set_roles(self, username: str, roles: List[str]) -> None:
+        self.db.set_user_roles(username, roles)
+
+    def grant_role(self, username: str, role: str) -> None:
+        self.set_roles(username, self.get_roles(username) + [role])
+
+    def revoke_role(self, username: str, role: str) -> None:
+        self.set_roles(username, [r for r in self.get_roles(username) if r != role])
+
+    def has_role(self, username: str, role: str) -> bool:
+        return self.db.user_has_role(username, role)
+
+    def users_with_role(self, role: str) -> List[str]:
+        return self.db.users_with_role(role)
+
+    def remove_user(self, username: str) -> None:
+        if self.db.get_user(username) is not None:
+            self.db.delete_user(username)
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import codecs
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+CSV_FIELDS = ["username", "hashed_password", "roles"]
+EXPORT_CSV_FIELDS = ["id", "username", "hashed_password", "roles", "created_at", "updated_at"]
+
+class UserTransferError(Exception):
+    """Raised when an import payload cannot be parsed"""
+    pass
+
+def detect_format(content_type: Optional[str], explicit: Optional[str] = None) -> str:
+    """Pick "ndjson" or "csv" from an explicit name or a Content-Type header"""
+    fmt = (explicit or "").lower()
+    if not fmt and content_type:
+        fmt = "csv" if "csv" in content_type.lower() else "ndjson"
+    if fmt in ("", "json", "jsonl", "ndjson"):
+        return "ndjson"
+    if fmt == "csv":
+        return "csv"
+    raise UserTransferError(f"Unsupported format: {fmt}")
+
+async def iter_lines(chunks: AsyncIterator[bytes], keepends: bool = False) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n" if keepends else line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending if keepends else pending.rstrip("\r")
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Parse a CSV stream into (values, error) pairs, one per record
+
+    Lines are gathered until their quotes balance, so a quoted field may
+    span lines; each record is then parsed by csv with its line endings
+    intact.
+    """
+    record: List[str] = []
+    quotes = 0
+    async for line in iter_lines(chunks, keepends=True):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text, record, quotes = "".join(record), [], 0
+        if not text.strip():
+            continue
+        try:
+            yield next(csv.reader(io.StringIO(text, newline=""))), None
+        except csv.Error as e:
+            yield None, f"Invalid CSV row: {e}"
+    if record:
+        yield None, "Invalid CSV row: unterminated quoted field"
+
+def _parse_roles(value: str) -> List[str]:
+    """CSV roles are either a JSON list or a semicolon separated string"""
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [role for role in value.split(";") if role]
+
+async def _iter_csv_records(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    header: Optional[List[str]] = None
+    async for values, error in iter_csv_rows(chunks):
+        if header is None:
+            if error:
+                yield None, error
+            else:
+                header = [name.strip() for name in values]
+            continue
+        if error:
+            yield None, error
+            continue
+        record: Dict[str, Any] = dict(zip(header, values))
+        if "roles" in record:
+            try:
+                record["roles"] = _parse_roles(record["roles"])
+            except ValueError as e:
+                yield None, f"Invalid CSV row: {e}"
+                continue
+        yield record, None
+
+async def iter_user_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Parse an NDJSON or CSV import stream
+
+    Yields (record, error) pairs, one per data row. Rows that cannot be parsed
+    yield (None, error) so the caller can report them without aborting.
+    """
+    if fmt == "csv":
+        async for record, error in _iter_csv_records(chunks):
+            yield record, error
+        return
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, "Expected a JSON object"
+            continue
+        yield record, None
+
+def without_password_hashes(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+    """Exported user chunks with hashed_password removed"""
+    for chunk in chunks:
+        yield [{key: value for key, value in user.items() if key != "hashed_password"} for user in chunk]
+
+def iter_ndjson(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    """Render exported user chunks as NDJSON, one write per chunk"""
+    for chunk in chunks:
+        yield "".join(json.dumps(user) + "\n" for user in chunk)
+
+def iter_csv(chunks: Iterable[List[Dict[str, Any]]], fields: List[str] = EXPORT_CSV_FIELDS) -> Iterator[str]:
+    """Render exported user chunks as CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in chunks:
+        for user in chunk:
+            writer.writerow(dict(user, roles=";".join(user.get("roles") or [])))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, AsyncIterator, Callable, List, NamedTuple, Optional
+from .user_cache import LRUCache
+from .workflow_graph import WorkflowGraph
+
+DEFAULT_WORKFLOW_CONCURRENCY = int(os.getenv("WORKFLOW_CONCURRENCY", "8"))
+
+class ExecutionError(Exception):
+    """Raised when a workflow cannot be executed"""
+    pass
+
+class Step(NamedTuple):
+    fn: Callable[[Dict[str, Any], Dict[str, Any]], Any]
+    cpu_bound: bool = False
+
+def input_step(config: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+    return config.get("value")
+
+def output_step(config: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+    return next(iter(inputs.values())) if len(inputs) == 1 else inputs
+
+def template_step(config: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+    """Fill config["template"] with upstream results keyed by target handle or source node"""
+    return str(config.get("template", "")).format_map({key: value for key, value in inputs.items()})
+
+def text_stats_step(config: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+    words = " ".join(str(value) for value in inputs.values()).lower().split()
+    return {"words": len(words), "top": Counter(words).most_common(int(config.get("top", 10)))}
+
+# Step implementations by name; a node uses data.step, else its component type
+STEPS: Dict[str, Step] = {
+    "input": Step(input_step),
+    "output": Step(output_step),
+    "template": Step(template_step),
+    "text_stats": Step(text_stats_step, cpu_bound=True),
+}
+
+DEFAULT_STEP = "output"
+
+def register_step(name: str, fn: Callable[[Dict[str, Any], Dict[str, Any]], Any], cpu_bound: bool = False) -> None:
+    """Register a step; cpu_bound steps must be picklable module-level functions"""
+    STEPS[name.lower()] = Step(fn, cpu_bound)
+
+def _fan_in(parents: List[str], values: Dict[str, Any]) -> Any:
+    """Input for one target handle: the parent's value, or a list in edge order when several edges share it"""
+    return values[parents[0]] if len(parents) == 1 else [values[parent] for parent in parents]
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class WorkflowExecutor:
+    """
+    Runs a WorkflowGraph as a DAG on the event loop
+
+    A node starts as soon as all of its predecessors have finished, with at
+    most max_concurrency nodes running at once. CPU-bound steps run in a
+    process pool. Results are memoized by a hash of the step, its config and
+    its inputs, so re-running after an edit recomputes only the nodes whose
+    inputs changed.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_WORKFLOW_CONCURRENCY, max_workers: Optional[int] = None,
+                 memo_size: int = 10000):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.memo = LRUCache(maxsize=memo_size, ttl=float("inf"))
+        self.hits = 0
+        self.misses = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _step_for(self, graph: WorkflowGraph, node_id: str) -> str:
+        data = graph.nodes[node_id].get("data", {})
+        name = str(data.get("step") or graph.node_type(node_id) or DEFAULT_STEP).lower()
+        return name if name in STEPS else DEFAULT_STEP
+
+    async def _run_step(self, step: Step, config: Dict[str, Any], inputs: Dict[str, Any]) -> Any:
+        if step.cpu_bound:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), step.fn, config, inputs)
+        result = step.fn(config, inputs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def execute(self, graph: WorkflowGraph, inputs: Optional[Dict[str, Any]] = None,
+                      use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute the graph, yielding progress events
+
+        Args:
+            graph: Workflow to run; it must be free of cycles
+            inputs: Values for input nodes, keyed by node id
+            use_cache: Reuse memoized node results
+
+        Yields:
+            run_started, node_started, node_finished (status ok, cached,
+            error or skipped, with duration_ms) and a final run_finished
+            event carrying the results of nodes without successors
+        """
+        summary = graph.summary()
+        if summary["cycle_count"]:
+            raise ExecutionError("Workflow contains cycles")
+        inputs = inputs or {}
+        order = graph.order()
+        waiting = {node_id: len(graph.predecessors(node_id)) for node_id in order}
+        results: Dict[str, Any] = {}
+        digests: Dict[str, str] = {}
+        failed: set = set()
+        events: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = []
+        run_started = time.perf_counter()
+
+        async def run_node(node_id: str) -> None:
+            if any(parent in failed for parent in graph.predecessors(node_id)):
+                failed.add(node_id)
+                await events.put({"event": "node_finished", "node": node_id, "status": "skipped", "duration_ms": 0.0})
+                return
+            name = self._step_for(graph, node_id)
+            config = dict(graph.nodes[node_id].get("data", {}).get("config") or {})
+            if node_id in inputs:
+                config["value"] = inputs[node_id]
+            sources: Dict[str, List[str]] = {}
+            for edge in graph.incoming_edges(node_id):
+                sources.setdefault(edge.target_handle or edge.source, []).append(edge.source)
+            node_inputs = {handle: _fan_in(parents, results) for handle, parents in sources.items()}
+            key = _digest([name, config, {handle: _fan_in(parents, digests) for handle, parents in sources.items()}])
+            async with semaphore:
+                await events.put({"event": "node_started", "node": node_id, "step": name})
+                started = time.perf_counter()
+                status = "ok"
+                cached = self.memo.get(key) if use_cache else None
+                try:
+                    if cached is not None:
+                        self.hits += 1
+                        result = cached[0]
+                        status = "cached"
+                    else:
+                        self.misses += 1
+                        result = await self._run_step(STEPS[name], config, node_inputs)
+                        self.memo.set(key, (result,))
+                except Exception as e:
+                    failed.add(node_id)
+                    await events.put({"event": "node_finished", "node": node_id, "status": "error",
+                                      "error": str(e), "duration_ms": (time.perf_counter() - started) * 1000})
+                    return
+            results[node_id] = result
+            digests[node_id] = _digest(result)
+            await events.put({"event": "node_finished", "node": node_id, "status": status, "result": result,
+                              "duration_ms": (time.perf_counter() - started) * 1000})
+
+        def schedule(node_id: str) -> None:
+            if aborted:
+                return
+            task = asyncio.ensure_future(run_node(node_id))
+            task.add_done_callback(lambda task, node_id=node_id: release(task, node_id))
+            tasks.append(task)
+
+        def release(task: asyncio.Future, node_id: str) -> None:
+            nonlocal remaining
+            # A cancelled node has no result for its successors to read
+            if aborted or task.cancelled():
+                return
+            for successor in graph.successors(node_id):
+                waiting[successor] -= 1
+                if waiting[successor] == 0:
+                    schedule(successor)
+            remaining -= 1
+            if remaining == 0:
+                events.put_nowait(None)
+
+        remaining = len(order)
+        aborted = False
+        yield {"event": "run_started", "nodes": len(order)}
+        if not order:
+            events.put_nowait(None)
+        for node_id in order:
+            if waiting[node_id] == 0:
+                schedule(node_id)
+
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # Reached early when the consumer stops iterating, e.g. an SSE client disconnects
+            aborted = True
+            for task in tasks:
+                task.cancel()
+
+        outputs = {node_id: results[node_id] for node_id in order
+                   if not graph.successors(node_id) and node_id in results}
+        yield {
+            "event": "run_finished",
+            "status": "error" if failed else "ok",
+            "duration_ms": (time.perf_counter() - run_started) * 1000,
+            "outputs": outputs,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "max_concurrency": self.max_concurrency,
+            "workers": self.max_workers,
+            "memo_size": len(self.memo),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
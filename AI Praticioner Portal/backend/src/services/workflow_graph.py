@@ -0,0 +1,452 @@
+import copy
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Iterable, NamedTuple, Set, Tuple
+
+# Component types that only produce or only consume data
+SOURCE_TYPES = {"input"}
+SINK_TYPES = {"output"}
+
+# Port type that connects to anything
+ANY_TYPE = "any"
+
+# Cycles reported per validation; the rest are only counted
+MAX_REPORTED_CYCLES = 20
+
+ComponentLookup = Callable[[Any], Optional[Dict[str, Any]]]
+
+class GraphError(Exception):
+    """Raised for edits that do not apply to the graph (unknown node, duplicate id, ...)"""
+    pass
+
+class Edge(NamedTuple):
+    id: str
+    source: str
+    target: str
+    source_handle: Optional[str]
+    target_handle: Optional[str]
+
+class Port(NamedTuple):
+    name: str
+    type: str
+
+def parse_ports(specs: Optional[Iterable[str]]) -> Dict[str, Port]:
+    """Ports declared as "name" or "name:type"; untyped ports accept anything"""
+    ports = {}
+    for spec in specs or ():
+        name, _, port_type = str(spec).partition(":")
+        ports[name.strip()] = Port(name.strip(), port_type.strip().lower() or ANY_TYPE)
+    return ports
+
+def edge_from_dict(data: Dict[str, Any]) -> Edge:
+    """Edge from a ReactFlow edge ({id, source, target, sourceHandle, targetHandle})"""
+    try:
+        source, target = str(data["source"]), str(data["target"])
+    except KeyError as e:
+        raise GraphError(f"Edge is missing {e.args[0]}") from e
+    edge_id = str(data.get("id") or f"e{source}-{target}")
+    return Edge(edge_id, source, target, data.get("sourceHandle"), data.get("targetHandle"))
+
+def edge_to_dict(edge: Edge) -> Dict[str, Any]:
+    data = {"id": edge.id, "source": edge.source, "target": edge.target}
+    if edge.source_handle is not None:
+        data["sourceHandle"] = edge.source_handle
+    if edge.target_handle is not None:
+        data["targetHandle"] = edge.target_handle
+    return data
+
+class WorkflowGraph:
+    """
+    Agent Builder workflow with incrementally maintained validation
+
+    Nodes and edges mirror the ReactFlow CustomNode/CustomEdge shapes. A
+    topological order is kept with the Pearce-Kelly dynamic algorithm: adding
+    an edge only reorders the nodes between its endpoints, and an edge that
+    would close a cycle is kept aside and reported instead. Port and type
+    checks run only for the node or edges an edit touches, so validation
+    cost follows the size of the edit rather than the size of the canvas.
+    """
+
+    def __init__(self, lookup: Optional[ComponentLookup] = None):
+        self.lookup = lookup or (lambda component_id: None)
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.edges: Dict[str, Edge] = {}
+        self.version = 0
+        self._ord: Dict[str, int] = {}
+        self._next_ord = 0
+        self._succ: Dict[str, Dict[str, int]] = {}
+        self._pred: Dict[str, Dict[str, int]] = {}
+        self._node_edges: Dict[str, Set[str]] = {}
+        self._component_nodes: Dict[Any, Set[str]] = {}
+        self._cycle_edges: Dict[str, Edge] = {}
+        self._issues: Dict[Tuple[str, str], List[str]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], lookup: Optional[ComponentLookup] = None) -> "WorkflowGraph":
+        graph = cls(lookup)
+        graph.load(data.get("nodes", []), data.get("edges", []))
+        return graph
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "nodes": list(self.nodes.values()),
+                "edges": [edge_to_dict(edge) for edge in self.edges.values()],
+            }
+
+
+    def _link(self, source: str, target: str) -> None:
+        self._succ[source][target] = self._succ[source].get(target, 0) + 1
+        self._pred[target][source] = self._pred[target].get(source, 0) + 1
+
+    def _unlink(self, source: str, target: str) -> None:
+        for adjacency, a, b in ((self._succ, source, target), (self._pred, target, source)):
+            count = adjacency[a][b] - 1
+            if count:
+                adjacency[a][b] = count
+            else:
+                del adjacency[a][b]
+
+    def _try_order(self, edge: Edge) -> bool:
+        """Insert edge into the ordering, or return False if it would close a cycle"""
+        source, target = edge.source, edge.target
+        if source == target:
+            return False
+        lower, upper = self._ord[target], self._ord[source]
+        if target in self._succ[source] or lower > upper:
+            self._link(source, target)
+            return True
+
+        # Nodes reachable from target that sit at or before source in the order
+        forward, seen, stack = [], {target}, [target]
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for successor in self._succ[node]:
+                if successor == source:
+                    return False
+                if successor not in seen and self._ord[successor] < upper:
+                    seen.add(successor)
+                    stack.append(successor)
+
+        # Nodes reaching source that sit after target in the order
+        backward, seen, stack = [], {source}, [source]
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for predecessor in self._pred[node]:
+                if predecessor not in seen and self._ord[predecessor] > lower:
+                    seen.add(predecessor)
+                    stack.append(predecessor)
+
+        # Reuse the same order slots: everything reaching source moves ahead of target
+        backward.sort(key=self._ord.__getitem__)
+        forward.sort(key=self._ord.__getitem__)
+        affected = backward + forward
+        slots = sorted(self._ord[node] for node in affected)
+        for node, slot in zip(affected, slots):
+            self._ord[node] = slot
+        self._link(source, target)
+        return True
+
+    def _retry_cycle_edges(self) -> None:
+        for edge in list(self._cycle_edges.values()):
+            if self._try_order(edge):
+                del self._cycle_edges[edge.id]
+                self._check_edge(edge)
+
+    def _path(self, start: str, goal: str) -> List[str]:
+        """Shortest path start -> goal through ordered edges"""
+        parents: Dict[str, Optional[str]] = {start: None}
+        queue = deque([start])
+        limit = self._ord[goal]
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            for successor in self._succ[node]:
+                if successor not in parents and self._ord[successor] <= limit:
+                    parents[successor] = node
+                    queue.append(successor)
+        return [start, goal]
+
+    def order(self) -> List[str]:
+        """Node ids in a valid execution order (edges closing cycles are ignored)"""
+        with self._lock:
+            return sorted(self.nodes, key=self._ord.__getitem__)
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return list(self._pred[node_id])
+
+    def successors(self, node_id: str) -> List[str]:
+        return list(self._succ[node_id])
+
+    def incoming_edges(self, node_id: str) -> List[Edge]:
+        """Edges into node_id, ordered by edge id"""
+        edges = (self.edges[edge_id] for edge_id in self._node_edges[node_id])
+        return sorted((edge for edge in edges if edge.target == node_id), key=lambda edge: edge.id)
+
+
+    def _set_issues(self, key: Tuple[str, str], issues: List[str]) -> None:
+        if issues:
+            self._issues[key] = issues
+        else:
+            self._issues.pop(key, None)
+
+    def component_for(self, node_id: str) -> Optional[Dict[str, Any]]:
+        component_id = self.nodes[node_id].get("data", {}).get("componentId")
+        return self.lookup(component_id) if component_id is not None else None
+
+    def node_type(self, node_id: str) -> Optional[str]:
+        node_type = self.nodes[node_id].get("data", {}).get("type")
+        if node_type is None:
+            component = self.component_for(node_id)
+            node_type = component.get("type") if component else None
+        return str(node_type).lower() if node_type is not None else None
+
+    def _check_node(self, node_id: str) -> None:
+        issues = []
+        component_id = self.nodes[node_id].get("data", {}).get("componentId")
+        if component_id is not None and self.lookup(component_id) is None:
+            issues.append(f"Unknown component {component_id}")
+        self._set_issues(("node", node_id), issues)
+
+    def _resolve_port(self, node_id: str, handle: Optional[str], side: str, issues: List[str]) -> Optional[Port]:
+        component = self.component_for(node_id)
+        if component is None or component.get(side) is None:
+            return None
+        ports = parse_ports(component.get(side))
+        label = "output" if side == "outputs" else "input"
+        if handle is None:
+            if len(ports) == 1:
+                return next(iter(ports.values()))
+            if not ports:
+                issues.append(f"{component.get('name', node_id)} has no {label} ports")
+            return None
+        port = ports.get(handle)
+        if port is None:
+            issues.append(f"{component.get('name', node_id)} has no {label} port {handle}")
+        return port
+
+    def _check_edge(self, edge: Edge) -> None:
+        issues = []
+        if edge.id in self._cycle_edges:
+            issues.append("Edge creates a cycle")
+        if self.node_type(edge.source) in SINK_TYPES:
+            issues.append("Output nodes cannot have outgoing edges")
+        if self.node_type(edge.target) in SOURCE_TYPES:
+            issues.append("Input nodes cannot have incoming edges")
+        output = self._resolve_port(edge.source, edge.source_handle, "outputs", issues)
+        input_port = self._resolve_port(edge.target, edge.target_handle, "inputs", issues)
+        if output and input_port and ANY_TYPE not in (output.type, input_port.type) and output.type != input_port.type:
+            issues.append(f"Port {output.name} ({output.type}) does not match {input_port.name} ({input_port.type})")
+        self._set_issues(("edge", edge.id), issues)
+
+    def _recheck_node(self, node_id: str) -> None:
+        self._check_node(node_id)
+        for edge_id in self._node_edges[node_id]:
+            self._check_edge(self.edges[edge_id])
+
+    def revalidate_component(self, component_id: Any) -> None:
+        """Re-run checks for the nodes using a component after it changed in the registry"""
+        with self._lock:
+            for node_id in list(self._component_nodes.get(component_id, ())):
+                self._recheck_node(node_id)
+
+    def issues(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"kind": kind, "id": element_id, "message": message}
+                for (kind, element_id), messages in self._issues.items()
+                for message in messages
+            ]
+
+    def cycles(self) -> List[List[str]]:
+        """One node path per edge that closes a cycle"""
+        with self._lock:
+            return [
+                self._path(edge.target, edge.source) + [edge.target]
+                for edge in list(self._cycle_edges.values())[:MAX_REPORTED_CYCLES]
+            ]
+
+    def summary(self, include_order: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            result = {
+                "version": self.version,
+                "valid": not self._issues,
+                "nodes": len(self.nodes),
+                "edges": len(self.edges),
+                "issues": self.issues(),
+                "cycle_count": len(self._cycle_edges),
+                "cycles": self.cycles(),
+            }
+            if include_order:
+                result["order"] = self.order()
+            return result
+
+
+    def _index_component(self, node_id: str, add: bool) -> None:
+        component_id = self.nodes[node_id].get("data", {}).get("componentId")
+        if component_id is None:
+            return
+        nodes = self._component_nodes.setdefault(component_id, set())
+        if add:
+            nodes.add(node_id)
+        else:
+            nodes.discard(node_id)
+            if not nodes:
+                del self._component_nodes[component_id]
+
+    def put_node(self, node: Dict[str, Any]) -> None:
+        """Add a node, or replace the data of an existing one"""
+        if "id" not in node:
+            raise GraphError("Node is missing id")
+        node = copy.deepcopy(node)
+        node_id = node["id"] = str(node["id"])
+        with self._lock:
+            if node_id in self.nodes:
+                self._index_component(node_id, add=False)
+            else:
+                self._ord[node_id] = self._next_ord
+                self._next_ord += 1
+                self._succ[node_id] = {}
+                self._pred[node_id] = {}
+                self._node_edges[node_id] = set()
+            self.nodes[node_id] = node
+            self._index_component(node_id, add=True)
+            self._recheck_node(node_id)
+            self.version += 1
+
+    def remove_node(self, node_id: str) -> None:
+        with self._lock:
+            if node_id not in self.nodes:
+                raise GraphError(f"Node {node_id} does not exist")
+            for edge_id in list(self._node_edges[node_id]):
+                self._detach_edge(edge_id)
+            self._index_component(node_id, add=False)
+            for index in (self.nodes, self._ord, self._succ, self._pred, self._node_edges):
+                del index[node_id]
+            self._issues.pop(("node", node_id), None)
+            self._retry_cycle_edges()
+            self.version += 1
+
+    def add_edge(self, data: Dict[str, Any]) -> Edge:
+        edge = edge_from_dict(data)
+        with self._lock:
+            if edge.id in self.edges:
+                raise GraphError(f"Edge {edge.id} already exists")
+            for node_id in (edge.source, edge.target):
+                if node_id not in self.nodes:
+                    raise GraphError(f"Node {node_id} does not exist")
+            self.edges[edge.id] = edge
+            self._node_edges[edge.source].add(edge.id)
+            self._node_edges[edge.target].add(edge.id)
+            if not self._try_order(edge):
+                self._cycle_edges[edge.id] = edge
+            self._check_edge(edge)
+            self.version += 1
+            return edge
+
+    def _detach_edge(self, edge_id: str) -> None:
+        edge = self.edges.pop(edge_id)
+        self._node_edges[edge.source].discard(edge_id)
+        self._node_edges[edge.target].discard(edge_id)
+        if self._cycle_edges.pop(edge_id, None) is None:
+            self._unlink(edge.source, edge.target)
+        self._issues.pop(("edge", edge_id), None)
+
+    def remove_edge(self, edge_id: str) -> None:
+        with self._lock:
+            if edge_id not in self.edges:
+                raise GraphError(f"Edge {edge_id} does not exist")
+            was_cycle = edge_id in self._cycle_edges
+            self._detach_edge(edge_id)
+            if not was_cycle:
+                self._retry_cycle_edges()
+            self.version += 1
+
+    def load(self, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add many nodes and edges at once
+
+        The initial order comes from one Kahn pass over all edges, so loading
+        a large canvas does not pay for an incremental reorder per edge.
+        """
+        with self._lock:
+            for node in nodes:
+                self.put_node(node)
+            edges = [edge_from_dict(data) for data in edges]
+            indegree = {node_id: 0 for node_id in self.nodes}
+            successors: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+            for edge in edges:
+                if edge.source in successors and edge.target in indegree:
+                    successors[edge.source].append(edge.target)
+                    indegree[edge.target] += 1
+            queue = deque(node_id for node_id in self.order() if indegree[node_id] == 0)
+            ranked = []
+            while queue:
+                node_id = queue.popleft()
+                ranked.append(node_id)
+                for successor in successors[node_id]:
+                    indegree[successor] -= 1
+                    if indegree[successor] == 0:
+                        queue.append(successor)
+            placed = set(ranked)
+            ranked.extend(node_id for node_id in self.order() if node_id not in placed)
+            base = self._next_ord
+            for offset, node_id in enumerate(ranked):
+                self._ord[node_id] = base + offset
+            self._next_ord = base + len(ranked)
+            for edge in edges:
+                self.add_edge(edge_to_dict(edge))
+
+def catalog_lookup(collection: Any) -> ComponentLookup:
+    """Resolve node componentId values against a CatalogCollection of components"""
+    def lookup(component_id: Any) -> Optional[Dict[str, Any]]:
+        try:
+            return collection.get(int(component_id))
+        except (TypeError, ValueError):
+            return None
+    return lookup
+
+class WorkflowStore:
+    """
+    In-memory workflows keyed by id
+
+    When given the components collection, node components are resolved from
+    it and nodes are re-validated whenever a component they use changes.
+    """
+
+    def __init__(self, components: Any = None):
+        self.lookup = catalog_lookup(components) if components is not None else None
+        self.workflows: Dict[str, WorkflowGraph] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        if components is not None:
+            components.subscribe(self._on_component_change)
+
+    def _on_component_change(self, event: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        component_id = (old or new)["id"]
+        for graph in list(self.workflows.values()):
+            graph.revalidate_component(component_id)
+            graph.revalidate_component(str(component_id))
+
+    def create(self, data: Dict[str, Any]) -> Tuple[str, WorkflowGraph]:
+        graph = WorkflowGraph.from_dict(data, self.lookup)
+        with self._lock:
+            workflow_id = str(self._next_id)
+            self._next_id += 1
+            self.workflows[workflow_id] = graph
+        return workflow_id, graph
+
+    def get(self, workflow_id: str) -> Optional[WorkflowGraph]:
+        return self.workflows.get(workflow_id)
+
+    def delete(self, workflow_id: str) -> bool:
+        with self._lock:
+            return self.workflows.pop(workflow_id, None) is not None
@@ -0,0 +1,194 @@
+import os
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Optional, Set
+from .workspace_service import Workspace
+
+# Files larger than this are reported without a content hash
+HASH_MAX_BYTES = 8 * 1024 * 1024
+
+def merge_events(previous: Optional[str], event: str) -> Optional[str]:
+    """
+    Net effect of two consecutive changes to the same path
+
+    None means the changes cancel out, e.g. a file created and deleted
+    again within one debounce window.
+    """
+    if previous is None or previous == event:
+        return event
+    if previous == "created":
+        return None if event == "deleted" else "created"
+    if previous == "deleted":
+        return "deleted" if event == "deleted" else "modified"
+    return event
+
+def describe_change(workspace: Workspace, event: str, path: str) -> Dict[str, Any]:
+    """Change message with the file's size and sha256, read after the debounce settles"""
+    change = {"type": event, "path": path, "kind": None, "size": None, "hash": None}
+    if event == "deleted":
+        return change
+    try:
+        resolved = workspace.resolve(path)
+        stat = resolved.stat()
+        if resolved.is_dir():
+            return dict(change, kind="directory")
+        change.update(kind="file", size=stat.st_size)
+        if stat.st_size <= HASH_MAX_BYTES:
+            digest = hashlib.sha256()
+            with open(resolved, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+            change["hash"] = digest.hexdigest()
+    except FileNotFoundError:
+        change["type"] = "deleted"
+    except OSError:
+        pass
+    return change
+
+class Subscription:
+    """
+    One client's pending changes under a set of path prefixes
+
+    Changes are coalesced per path while the client is busy, so a slow
+    reader costs at most max_pending entries. Past that the pending changes
+    are dropped and the client is told to resync instead.
+    """
+
+    def __init__(self, wakeup: asyncio.Event, prefixes: Iterable[str] = ("/",), max_pending: int = 1000):
+        self.wakeup = wakeup
+        self.prefixes = tuple(prefixes)
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.overflowed = False
+        self.dropped = 0
+
+    def matches(self, path: str) -> bool:
+        return any(prefix == "/" or path == prefix or path.startswith(prefix.rstrip("/") + "/")
+                   for prefix in self.prefixes)
+
+    def offer(self, changes: Iterable[Dict[str, Any]]) -> None:
+        offered = False
+        for change in changes:
+            if self.overflowed or not self.matches(change["path"]):
+                continue
+            offered = True
+            previous = self.pending.pop(change["path"], None)
+            event = merge_events(previous["type"] if previous else None, change["type"])
+            if event is not None:
+                self.pending[change["path"]] = dict(change, type=event)
+            if len(self.pending) > self.max_pending:
+                self.dropped += len(self.pending)
+                self.pending.clear()
+                self.overflowed = True
+        if offered:
+            self.wakeup.set()
+
+    def drain(self, batch_size: int) -> Optional[Dict[str, Any]]:
+        """Next message for the client, or None when nothing is pending"""
+        if self.overflowed:
+            self.overflowed = False
+            return {"type": "resync"}
+        if not self.pending:
+            return None
+        changes = []
+        while self.pending and len(changes) < batch_size:
+            changes.append(self.pending.popitem(last=False)[1])
+        if self.pending:
+            self.wakeup.set()
+        return {"type": "changes", "changes": changes}
+
+class ChangeHub:
+    """
+    Debounced fan-out of workspace changes to subscriptions
+
+    Workspace listeners may run on any thread; changes are handed to the
+    event loop, coalesced per path and published once no new change has
+    arrived for debounce_ms, or after max_delay_ms at the latest. Sizes and
+    hashes are read once per flush, off the event loop, however many
+    clients are subscribed.
+    """
+
+    def __init__(self, workspace: Workspace, debounce_ms: float = 100.0, max_delay_ms: float = 1000.0,
+                 is_ignored: Optional[Callable[[str], bool]] = None):
+        self.workspace = workspace
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.is_ignored = is_ignored
+        self.published = 0
+        self.flushes = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: Set[Subscription] = set()
+        self._pending: Dict[str, str] = {}
+        self._first_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        workspace.subscribe(self.publish)
+
+    @classmethod
+    def from_env(cls, workspace: Workspace, is_ignored: Optional[Callable[[str], bool]] = None) -> "ChangeHub":
+        """Hub debounced by WORKSPACE_EVENTS_DEBOUNCE_MS"""
+        return cls(workspace, debounce_ms=float(os.getenv("WORKSPACE_EVENTS_DEBOUNCE_MS", "100")),
+                   is_ignored=is_ignored)
+
+    def subscribe(self, subscription: Subscription) -> None:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop and not self._subscriptions:
+            self.loop = loop
+            self._pending = {}
+            self._first_at = None
+            self._timer = None
+        self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: str, path: str) -> None:
+        """Workspace listener; safe to call from any thread"""
+        if self.loop is None or not self._subscriptions or (self.is_ignored and self.is_ignored(path)):
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._record, event, path)
+        except RuntimeError:
+            # The loop has been closed
+            self.loop = None
+
+    def _record(self, event: str, path: str) -> None:
+        merged = merge_events(self._pending.get(path), event)
+        if merged is None:
+            self._pending.pop(path, None)
+        else:
+            self._pending[path] = merged
+        now = self.loop.time()
+        if self._first_at is None:
+            self._first_at = now
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = min(self.debounce, max(self._first_at + self.max_delay - now, 0.0))
+        self._timer = self.loop.call_later(delay, self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        self._first_at = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = self.loop.create_task(self._publish(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, pending: Dict[str, str]) -> None:
+        changes = await self.loop.run_in_executor(
+            None, lambda: [describe_change(self.workspace, event, path) for path, event in pending.items()])
+        self.flushes += 1
+        self.published += len(changes)
+        for subscription in list(self._subscriptions):
+            subscription.offer(changes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscriptions": len(self._subscriptions),
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "published": self.published,
+            "dropped": sum(subscription.dropped for subscription in self._subscriptions),
+        }
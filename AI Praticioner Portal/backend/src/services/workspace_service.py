@@ -0,0 +1,526 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, BinaryIO, Callable, Iterable, List, NamedTuple, Optional, Tuple
+from .user_cache import LRUCache
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+DEFAULT_WORKSPACE_ROOT = "data/workspace"
+UPLOADS_DIR = ".uploads"
+HISTORY_DIR = ".history"
+INTERNAL_DIRS = (UPLOADS_DIR, HISTORY_DIR)
+
+# Previous versions kept per file
+DEFAULT_HISTORY_LIMIT = 20
+# Largest file save() loads, edits and rewrites
+DEFAULT_SAVE_MAX_BYTES = 32 * 1024 * 1024
+# Versions larger than this are replaced without a copy in history
+DEFAULT_HISTORY_MAX_BYTES = 2 * 1024 * 1024
+# Content hashes remembered by path, size and mtime
+HASH_CACHE_SIZE = 1024
+
+# Characters outside the Basic Multilingual Plane take two UTF-16 code units
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "javascript", ".ts": "typescript", ".tsx": "typescript",
+    ".json": "json", ".md": "markdown", ".html": "html", ".css": "css", ".yml": "yaml", ".yaml": "yaml",
+    ".sql": "sql", ".sh": "shell", ".ipynb": "json", ".csv": "plaintext", ".log": "plaintext",
+}
+
+Listener = Callable[[str, str], None]
+
+class WorkspaceError(Exception):
+    """Raised for invalid workspace paths and requests"""
+    pass
+
+class FileTooLargeError(WorkspaceError):
+    """Raised when a file is too large to be returned whole"""
+    pass
+
+class UploadOffsetError(WorkspaceError):
+    """Raised when an upload chunk does not continue the bytes received so far"""
+
+    def __init__(self, received: int, start: int):
+        super().__init__(f"Upload expected offset {received}, got {start}")
+        self.received = received
+
+class ConflictError(WorkspaceError):
+    """Raised when a save's base hash is not the file's current hash"""
+
+    def __init__(self, current_hash: str):
+        super().__init__("File changed since the base version")
+        self.current_hash = current_hash
+
+class TextEdit(NamedTuple):
+    """Replace length UTF-16 code units at offset with text, as reported by the editor"""
+    offset: int
+    length: int
+    text: str
+
+class TextFile(NamedTuple):
+    content: str
+    stat: os.stat_result
+    hash: str
+
+class ByteRange(NamedTuple):
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+def language_for(path: str) -> str:
+    return LANGUAGES.get(PurePosixPath(path).suffix.lower(), "plaintext")
+
+def file_etag(stat: os.stat_result) -> str:
+    """Validator from size and mtime; changes whenever the file is rewritten"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def apply_edits(text: str, edits: Iterable[TextEdit]) -> str:
+    """
+    Apply edits one after another, each against the result of the previous
+
+    Offsets count UTF-16 code units, like the editor's model offsets, so
+    text outside the Basic Multilingual Plane is addressed the same way on
+    both sides.
+
+    Raises:
+        WorkspaceError: If an edit falls outside the text or splits a character
+    """
+    edits = list(edits)
+    if not _ASTRAL.search(text) and not any(_ASTRAL.search(edit.text) for edit in edits):
+        # Without astral characters UTF-16 offsets are string indexes, so skip the re-encode
+        for edit in edits:
+            end = edit.offset + edit.length
+            if edit.offset < 0 or edit.length < 0 or end > len(text):
+                raise WorkspaceError(f"Edit at offset {edit.offset} is outside the file")
+            text = text[:edit.offset] + edit.text + text[end:]
+        return text
+    units = bytearray(text.encode("utf-16-le"))
+    for edit in edits:
+        start = edit.offset * 2
+        end = start + edit.length * 2
+        if edit.offset < 0 or edit.length < 0 or end > len(units):
+            raise WorkspaceError(f"Edit at offset {edit.offset} is outside the file")
+        units[start:end] = edit.text.encode("utf-16-le")
+    try:
+        return units.decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise WorkspaceError("Edits split a character")
+
+def parse_range(header: Optional[str], size: int) -> Optional[ByteRange]:
+    """
+    Parse a single-range Range header against a file of size bytes
+
+    Returns None when the header is absent, malformed or asks for several
+    ranges, in which case the whole file is served.
+
+    Raises:
+        WorkspaceError: If the range cannot be satisfied
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise WorkspaceError("Range not satisfiable")
+            return ByteRange(max(size - suffix, 0), size - 1) if size else None
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise WorkspaceError("Range not satisfiable")
+    if end < start:
+        return None
+    return ByteRange(start, min(end, size - 1))
+
+def parse_content_range(header: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """Parse an upload's "bytes start-end/total" into (start, end, total)"""
+    if not header:
+        return None
+    try:
+        unit, _, spec = header.strip().partition(" ")
+        span, _, total = spec.partition("/")
+        start, _, end = span.partition("-")
+        parsed = int(start), int(end), int(total)
+    except ValueError:
+        raise WorkspaceError(f"Invalid Content-Range: {header}")
+    if unit != "bytes" or parsed[0] > parsed[1] or parsed[1] >= parsed[2]:
+        raise WorkspaceError(f"Invalid Content-Range: {header}")
+    return parsed
+
+class _EventForwarder:
+    """watchdog event handler turning filesystem events into workspace change events"""
+
+    def __init__(self, workspace: "Workspace"):
+        self.workspace = workspace
+
+    def dispatch(self, event: Any) -> None:
+        if event.event_type == "moved":
+            self.workspace.external_change("deleted", os.fsdecode(event.src_path))
+            self.workspace.external_change("created", os.fsdecode(event.dest_path))
+        elif event.event_type in ("created", "modified", "deleted"):
+            self.workspace.external_change(event.event_type, os.fsdecode(event.src_path))
+
+class Workspace:
+    """
+    Files of the IDE workspace, rooted at a directory on disk
+
+    Paths are POSIX style and relative to the root ("/src/main.py"); any
+    path resolving outside the root is rejected. File content is only
+    loaded whole by read_text, which callers bound with max_bytes; larger
+    files are opened and streamed in ranges.
+    """
+
+    def __init__(self, root: str, history_limit: int = DEFAULT_HISTORY_LIMIT,
+                 save_max_bytes: int = DEFAULT_SAVE_MAX_BYTES, history_max_bytes: int = DEFAULT_HISTORY_MAX_BYTES):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.uploads = self.root / UPLOADS_DIR
+        self.history = self.root / HISTORY_DIR
+        self.history_limit = history_limit
+        self.save_max_bytes = save_max_bytes
+        self.history_max_bytes = history_max_bytes
+        self._hashes = LRUCache(maxsize=HASH_CACHE_SIZE, ttl=float("inf"))
+        self._listeners: List[Listener] = []
+        self._save_lock = threading.Lock()
+        self._observer = None
+
+    @classmethod
+    def from_env(cls) -> "Workspace":
+        """Workspace rooted at WORKSPACE_ROOT, keeping WORKSPACE_HISTORY previous versions per file"""
+        return cls(os.getenv("WORKSPACE_ROOT", DEFAULT_WORKSPACE_ROOT),
+                   history_limit=int(os.getenv("WORKSPACE_HISTORY", str(DEFAULT_HISTORY_LIMIT))),
+                   save_max_bytes=int(os.getenv("WORKSPACE_SAVE_MAX_BYTES", str(DEFAULT_SAVE_MAX_BYTES))),
+                   history_max_bytes=int(os.getenv("WORKSPACE_HISTORY_MAX_BYTES", str(DEFAULT_HISTORY_MAX_BYTES))))
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call listener(event, path) after every create, modify and delete made through the workspace"""
+        self._listeners.append(listener)
+
+    def _changed(self, event: str, resolved: Path) -> None:
+        path = self.relative(resolved)
+        for listener in self._listeners:
+            listener(event, path)
+
+    @property
+    def watching(self) -> bool:
+        return self._observer is not None
+
+    def watch(self) -> bool:
+        """
+        Also notify listeners of changes made by other processes
+
+        Needs the optional watchdog package; returns False without it.
+        Changes made through the workspace may then be reported twice, once
+        directly and once from the filesystem event.
+        """
+        if Observer is None or self._observer is not None:
+            return self._observer is not None
+        observer = Observer()
+        observer.schedule(_EventForwarder(self), str(self.root), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def close(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
+    def external_change(self, event: str, absolute: str) -> None:
+        """Report a change seen on disk, ignoring the root itself and internal directories"""
+        resolved = Path(absolute)
+        try:
+            parts = resolved.relative_to(self.root).parts
+        except ValueError:
+            return
+        if parts and parts[0] not in INTERNAL_DIRS:
+            self._changed(event, resolved)
+
+    def resolve(self, path: str) -> Path:
+        parts = [part for part in PurePosixPath("/" + (path or "").replace("\\", "/")).parts[1:] if part != "."]
+        if ".." in parts or (parts and parts[0] in INTERNAL_DIRS):
+            raise WorkspaceError(f"Invalid path: {path}")
+        resolved = self.root.joinpath(*parts).resolve()
+        if resolved != self.root and self.root not in resolved.parents:
+            raise WorkspaceError(f"Invalid path: {path}")
+        return resolved
+
+    def relative(self, path: Path) -> str:
+        return "/" + path.relative_to(self.root).as_posix() if path != self.root else "/"
+
+    def stat(self, path: str) -> os.stat_result:
+        return self.resolve(path).stat()
+
+    def describe(self, path: str) -> Dict[str, Any]:
+        resolved = self.resolve(path)
+        stat = resolved.stat()
+        return {
+            "name": resolved.name if resolved != self.root else "root",
+            "path": self.relative(resolved),
+            "type": "directory" if resolved.is_dir() else "file",
+            "size": stat.st_size,
+            "modified": stat.st_mtime,
+            "etag": file_etag(stat),
+        }
+
+    def read_text(self, path: str, max_bytes: int) -> TextFile:
+        """
+        Read a text file of at most max_bytes
+
+        Raises:
+            FileTooLargeError: If the file is larger than max_bytes
+            WorkspaceError: If the file is not UTF-8
+        """
+        resolved = self.resolve(path)
+        with open(resolved, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size > max_bytes:
+                raise FileTooLargeError(f"File is {stat.st_size} bytes, over {max_bytes}; read it in ranges")
+            data = file.read()
+        data_hash = content_hash(data)
+        self._hashes.set(str(resolved), (stat.st_size, stat.st_mtime_ns, data_hash))
+        try:
+            return TextFile(data.decode("utf-8"), stat, data_hash)
+        except UnicodeDecodeError:
+            raise WorkspaceError("File is not UTF-8 text")
+
+    def file_hash(self, path: str) -> str:
+        """
+        content_hash of a file of any size, read in blocks
+
+        This is the base_hash for saves of files too large to read whole.
+        The hash is remembered until the file's size or mtime changes.
+        """
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        with open(resolved, "rb") as file:
+            stat = os.fstat(file.fileno())
+            cached = self._hashes.get(str(resolved))
+            if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                return cached[2]
+            digest = hashlib.sha256()
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+            after = os.fstat(file.fileno())
+        data_hash = digest.hexdigest()
+        if (after.st_size, after.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            self._hashes.set(str(resolved), (stat.st_size, stat.st_mtime_ns, data_hash))
+        return data_hash
+
+    def open(self, path: str) -> Tuple[BinaryIO, os.stat_result]:
+        """Open a file unbuffered for streaming, with the stat of the opened file"""
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        file = open(resolved, "rb", buffering=0)
+        return file, os.fstat(file.fileno())
+
+    def write_text(self, path: str, content: str, create: bool = False) -> Dict[str, Any]:
+        """
+        Atomically replace a file's content
+
+        Raises:
+            FileExistsError: If create is set and the file exists
+            FileNotFoundError: If create is not set and the file does not exist
+        """
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        if create and resolved.exists():
+            raise FileExistsError(path)
+        if not create and not resolved.exists():
+            raise FileNotFoundError(path)
+        resolved.parent.mkdir(parents=True, exist_ok=True)
+        self._replace(resolved, content.encode("utf-8"))
+        self._changed("created" if create else "modified", resolved)
+        return self.describe(path)
+
+    def save(self, path: str, content: Optional[str] = None, edits: Optional[Iterable[TextEdit]] = None,
+             base_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Replace an existing file's content, or apply edits to it
+
+        The replaced version is kept in the file's history unless it is
+        larger than history_max_bytes. Saving content identical to the
+        current file writes nothing.
+
+        Args:
+            path: File to save
+            content: New full content
+            edits: Edits against the base version, instead of content
+            base_hash: content_hash of the version the client edited; required with edits
+
+        Returns:
+            The file's description with its new hash
+
+        Raises:
+            ConflictError: If base_hash is not the current hash
+            FileNotFoundError: If the file does not exist
+            FileTooLargeError: If the current or new content is over save_max_bytes
+            WorkspaceError: If the edits do not apply
+        """
+        if (content is None) == (edits is None):
+            raise WorkspaceError("Provide either content or edits")
+        if edits is not None and base_hash is None:
+            raise WorkspaceError("Edits require a base_hash")
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        with self._save_lock:
+            size = resolved.stat().st_size
+            if size > self.save_max_bytes:
+                raise FileTooLargeError(f"File is {size} bytes, over the {self.save_max_bytes} byte save limit")
+            current = resolved.read_bytes()
+            current_hash = content_hash(current)
+            if base_hash is not None and base_hash != current_hash:
+                raise ConflictError(current_hash)
+            if edits is not None:
+                try:
+                    text = current.decode("utf-8")
+                except UnicodeDecodeError:
+                    raise WorkspaceError("File is not UTF-8 text")
+                content = apply_edits(text, edits)
+            data = content.encode("utf-8")
+            if len(data) > self.save_max_bytes:
+                raise FileTooLargeError(f"Content is {len(data)} bytes, over the {self.save_max_bytes} byte save limit")
+            new_hash = content_hash(data)
+            if new_hash != current_hash:
+                if len(current) <= self.history_max_bytes:
+                    self._remember(resolved, current, current_hash)
+                self._replace(resolved, data)
+                stat = resolved.stat()
+                self._hashes.set(str(resolved), (stat.st_size, stat.st_mtime_ns, new_hash))
+        if new_hash != current_hash:
+            self._changed("modified", resolved)
+        return dict(self.describe(path), hash=new_hash)
+
+    def _history_dir(self, resolved: Path) -> Path:
+        return self.history / hashlib.sha1(str(resolved).encode("utf-8")).hexdigest()
+
+    def _remember(self, resolved: Path, data: bytes, data_hash: str) -> None:
+        if self.history_limit <= 0:
+            return
+        directory = self._history_dir(resolved)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{time.time_ns()}-{data_hash}").write_bytes(data)
+        versions = sorted(directory.iterdir())
+        for stale in versions[:max(len(versions) - self.history_limit, 0)]:
+            stale.unlink()
+
+    def versions(self, path: str) -> List[Dict[str, Any]]:
+        """Previous versions of a file, newest first"""
+        directory = self._history_dir(self.resolve(path))
+        if not directory.is_dir():
+            return []
+        versions = []
+        for entry in sorted(directory.iterdir(), reverse=True):
+            saved_ns, _, version_hash = entry.name.partition("-")
+            versions.append({"hash": version_hash, "size": entry.stat().st_size, "saved": int(saved_ns) / 1e9})
+        return versions
+
+    def read_version(self, path: str, version_hash: str) -> str:
+        """Content of a previous version of a file"""
+        directory = self._history_dir(self.resolve(path))
+        if directory.is_dir():
+            for entry in directory.iterdir():
+                if entry.name.partition("-")[2] == version_hash:
+                    return entry.read_bytes().decode("utf-8", errors="replace")
+        raise FileNotFoundError(f"{path}@{version_hash}")
+
+    def _replace(self, resolved: Path, data: bytes) -> None:
+        # Staged under the internal uploads directory so watchers never see the temporary file
+        self.uploads.mkdir(exist_ok=True)
+        tmp = self.uploads / f"{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as file:
+                file.write(data)
+            os.replace(tmp, resolved)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def delete_file(self, path: str) -> None:
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        resolved.unlink()
+        self._changed("deleted", resolved)
+
+    def create_directory(self, path: str) -> Dict[str, Any]:
+        resolved = self.resolve(path)
+        resolved.mkdir(parents=True)
+        self._changed("created", resolved)
+        return self.describe(path)
+
+    def delete_directory(self, path: str) -> None:
+        resolved = self.resolve(path)
+        if resolved == self.root:
+            raise WorkspaceError("Cannot delete the workspace root")
+        if not resolved.is_dir():
+            raise NotADirectoryError(path)
+        shutil.rmtree(resolved)
+        self._changed("deleted", resolved)
+
+    def _upload_part(self, resolved: Path) -> Path:
+        digest = hashlib.sha1(str(resolved).encode("utf-8")).hexdigest()
+        return self.uploads / f"{digest}.part"
+
+    def upload_offset(self, path: str) -> int:
+        """Bytes received so far for an unfinished upload to path"""
+        part = self._upload_part(self.resolve(path))
+        return part.stat().st_size if part.exists() else 0
+
+    def begin_chunk(self, path: str, start: int) -> Path:
+        """
+        Part file to append the next upload chunk to
+
+        Raises:
+            UploadOffsetError: If start does not continue the received bytes
+        """
+        resolved = self.resolve(path)
+        if resolved.is_dir():
+            raise IsADirectoryError(path)
+        self.uploads.mkdir(exist_ok=True)
+        part = self._upload_part(resolved)
+        if start == 0:
+            part.write_bytes(b"")
+        received = part.stat().st_size if part.exists() else 0
+        if start != received:
+            raise UploadOffsetError(received, start)
+        return part
+
+    def finish_upload(self, path: str) -> Dict[str, Any]:
+        """Move a complete upload into place"""
+        resolved = self.resolve(path)
+        existed = resolved.exists()
+        resolved.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._upload_part(resolved), resolved)
+        self._changed("modified" if existed else "created", resolved)
+        return self.describe(path)
+
+    def discard_upload(self, path: str) -> None:
+        part = self._upload_part(self.resolve(path))
+        if part.exists():
+            part.unlink()
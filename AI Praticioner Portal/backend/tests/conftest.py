@@ -52,3 +52,11 @@ def test_db(postgres_db):
             db.close()
     
     return get_session()
+
+@pytest.fixture
+def sqlite_service(tmp_path):
+    """DatabaseService backed by a throwaway SQLite file"""
+    from src.services.database_service import DatabaseService
+    service = DatabaseService(f"sqlite:///{tmp_path / 'test.db'}")
+    yield service
+    service.engine.dispose()
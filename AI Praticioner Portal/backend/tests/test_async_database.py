@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_async_database_service, require_admin
+from src.services.async_database_service import AsyncDatabaseService, to_async_url
+from src.services.database_service import DatabaseError, DatabaseService
+from src.services.user_cache import UserCache
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_to_async_url():
+    assert to_async_url("postgresql://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    assert to_async_url("sqlite:///tmp/x.db") == "sqlite+aiosqlite:///tmp/x.db"
+    assert to_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+def test_async_crud_and_search(tmp_path):
+    async def scenario():
+        service = AsyncDatabaseService(f"sqlite:///{tmp_path / 'async.db'}")
+        try:
+            users = [
+                {"username": f"user_{i}", "hashed_password": "x", "roles": ["admin"] if i % 2 else ["user"]}
+                for i in range(6)
+            ]
+            # Many concurrent statements share the event loop
+            assert all(await asyncio.gather(*(service.store_user(u) for u in users)))
+
+            user = await service.get_user("user_1")
+            assert user["roles"] == ["admin"]
+            assert await service.get_user("missing") is None
+
+            page = await service.list_users(page_size=4)
+            assert page["total"] == 6 and page["next_cursor"]
+            rest = await service.list_users(page_size=4, cursor=page["next_cursor"])
+            assert len(rest["users"]) == 2 and rest["next_cursor"] is None
+
+            admins = await service.search_users(roles=["admin"])
+            assert sorted(u["username"] for u in admins["users"]) == ["user_1", "user_3", "user_5"]
+
+            await service.update_user("user_1", {"username": "renamed", "hashed_password": "y", "roles": ["user"]})
+            assert (await service.search_users("renamed", roles=["user"]))["total"] == 1
+            assert (await service.search_users(roles=["admin"]))["total"] == 2
+
+            await service.delete_user("renamed")
+            assert (await service.list_users())["total"] == 5
+            with pytest.raises(DatabaseError):
+                await service.delete_user("renamed")
+        finally:
+            await service.close()
+
+    run(scenario())
+
+def test_user_read_endpoints_use_the_async_service(tmp_path):
+    url = f"sqlite:///{tmp_path / 'users.db'}"
+    writer = DatabaseService(url)
+    writer.store_users_bulk([{"username": f"user_{i}", "hashed_password": "x", "roles": ["admin"] if i % 2 else []}
+                             for i in range(5)])
+    writer.engine.dispose()
+    service = AsyncDatabaseService(url, cache=UserCache())
+    app.dependency_overrides[get_async_database_service] = lambda: service
+    app.dependency_overrides[require_admin] = lambda: {"claims": {"sub": "root"}, "roles": frozenset(["admin"])}
+    try:
+        with TestClient(app) as client:
+            page = client.get("/users/", params={"page_size": 3}).json()
+            assert page["total"] == 5 and len(page["users"]) == 3
+            assert all("hashed_password" not in user for user in page["users"])
+            rest = client.get("/users/", params={"page_size": 3, "cursor": page["next_cursor"]}).json()
+            assert [user["username"] for user in rest["users"]] == ["user_3", "user_4"]
+
+            admins = client.get("/users/search", params={"q": "user", "roles": ["admin"]}).json()
+            assert [user["username"] for user in admins["users"]] == ["user_1", "user_3"]
+
+            assert client.get("/users/user_2").json()["username"] == "user_2"
+            assert client.get("/users/user_2").json()["roles"] == []
+            assert service.cache.stats()["hits"] == 1
+            assert client.get("/users/missing").status_code == 404
+
+            assert client.get("/users/", params={"cursor": "garbage"}).status_code == 400
+            assert client.get("/users/", params={"page_size": 1000}).status_code == 422
+            assert client.get("/users/search", params={"match": "fuzzy"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
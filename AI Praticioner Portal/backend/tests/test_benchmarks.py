@@ -0,0 +1,29 @@
+import json
+from benchmarks.harness import BenchmarkCase, run_case, compare
+from benchmarks.run import main
+
+def test_run_case_reports_timings():
+    calls = []
+    result = run_case(BenchmarkCase("noop", lambda: calls.append(1), repeat=5), warmup=2)
+    assert len(calls) == 7
+    assert result["repeat"] == 5
+    assert 0 <= result["min_s"] <= result["median_s"] <= result["p95_s"]
+
+def test_compare_flags_regressions():
+    baseline = {"fast": {"median_s": 1.0}, "slow": {"median_s": 1.0}}
+    results = {"fast": {"median_s": 1.1}, "slow": {"median_s": 1.5}, "new": {"median_s": 1.0}}
+    rows = {row["name"]: row for row in compare(results, baseline, tolerance=0.25)}
+    assert rows["fast"]["regressed"] is False
+    assert rows["slow"]["regressed"] is True
+    assert rows["new"]["baseline_s"] is None and rows["new"]["regressed"] is False
+
+def test_main_writes_then_gates_on_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    assert main(["--filter", "security.create", "--baseline", str(baseline)]) == 0
+    stored = json.loads(baseline.read_text())
+    assert "security.create_token" in stored["users_10000"]["results"]
+
+    # Pretend the baseline was impossibly fast so the gate trips
+    stored["users_10000"]["results"]["security.create_token"]["median_s"] = 1e-12
+    baseline.write_text(json.dumps(stored))
+    assert main(["--filter", "security.create", "--baseline", str(baseline)]) == 1
@@ -0,0 +1,164 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_catalog_store
+from src.services.catalog_service import CatalogStore, CatalogCollection, CatalogError, COMPACT_AFTER_OPS, encode_position
+
+def test_secondary_index_follows_writes():
+    collection = CatalogCollection("components", indexed_fields=("type",))
+    collection.create({"name": "A", "type": "llm"})
+    collection.create({"name": "B", "type": "tool"})
+    collection.create({"name": "C", "type": "llm"})
+
+    assert [c["name"] for c in collection.find("type", "llm")] == ["A", "C"]
+    collection.update(1, {"name": "A", "type": "tool"})
+    assert [c["name"] for c in collection.find("type", "llm")] == ["C"]
+    assert [c["name"] for c in collection.find("type", "tool")] == ["B", "A"]
+    collection.delete(3)
+    assert collection.find("type", "llm") == []
+    with pytest.raises(CatalogError):
+        collection.find("name", "A")
+
+def test_list_snapshot_is_reused_until_a_write():
+    collection = CatalogCollection("projects")
+    collection.create({"name": "P"})
+    first = collection.list()
+    assert collection.list() is first
+    version = collection.version
+    collection.create({"name": "Q"})
+    assert collection.version == version + 1
+    assert collection.list() is not first and len(collection.list()) == 2
+
+def test_create_rejects_duplicate_ids():
+    collection = CatalogCollection("projects")
+    collection.create({"id": 5, "name": "P"})
+    assert collection.create({"name": "Q"})["id"] == 6
+    with pytest.raises(CatalogError):
+        collection.create({"id": 5, "name": "again"})
+
+def test_journal_persists_and_compacts(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.jsonl"
+    store = CatalogStore(str(path))
+    store.components.create({"name": "Search", "type": "tool"})
+    store.projects.delete(2)
+    store.projects.update(1, {"name": "Renamed", "status": "active"})
+
+    reloaded = CatalogStore(str(path))
+    assert reloaded.components.find("type", "tool")[0]["name"] == "Search"
+    assert reloaded.projects.get(2) is None
+    assert reloaded.projects.find("status", "active")[0]["name"] == "Renamed"
+    assert len(path.read_text().splitlines()) == 4
+
+    monkeypatch.setattr("src.services.catalog_service.COMPACT_AFTER_OPS", 2)
+    CatalogStore(str(path))
+    assert len(path.read_text().splitlines()) == 1
+    assert CatalogStore(str(path)).projects.get(1)["name"] == "Renamed"
+
+def test_component_write_endpoints():
+    store = CatalogStore()
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    client = TestClient(app)
+    try:
+        created = client.post("/components/", json={"name": "Retriever", "type": "tool"})
+        assert created.status_code == 201
+        component_id = created.json()["id"]
+        assert client.get(f"/components/{component_id}").json()["name"] == "Retriever"
+
+        updated = client.put(f"/components/{component_id}", json={"name": "Retriever v2", "type": "tool"})
+        assert updated.json()["name"] == "Retriever v2"
+        assert client.post("/components/", json={"type": "tool"}).status_code == 400
+
+        assert client.delete(f"/components/{component_id}").status_code == 200
+        assert client.get(f"/components/{component_id}").status_code == 404
+        assert client.delete(f"/components/{component_id}").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+def make_components(count):
+    types = ["llm", "tool", "retriever"]
+    return {"projects": [], "components": [
+        {"id": i, "name": f"Component {i:03d}", "type": types[i % 3]} for i in range(1, count + 1)
+    ]}
+
+def test_query_filters_sorts_and_paginates():
+    store = CatalogStore(seed=make_components(30))
+    collection = store.components
+
+    items, cursor = collection.query({"type": ["tool"]}, sort="-name", limit=4)
+    assert [c["id"] for c in items] == [28, 25, 22, 19]
+    rest, end = collection.query({"type": ["tool"]}, sort="-name", limit=10, cursor=cursor)
+    assert [c["id"] for c in rest] == [16, 13, 10, 7, 4, 1]
+    assert end is None
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = collection.query(sort="name", limit=7, cursor=cursor)
+        seen.extend(c["id"] for c in page)
+        if cursor is None:
+            break
+    assert seen == list(range(1, 31))
+
+    both, _ = collection.query({"type": ["llm", "retriever"]})
+    assert len(both) == 20
+    with pytest.raises(CatalogError):
+        collection.query(sort="description")
+    with pytest.raises(CatalogError):
+        collection.query(sort="name", cursor=cursor or "bm90LWEtY3Vyc29y")
+
+def test_sorted_index_survives_until_a_write():
+    store = CatalogStore(seed=make_components(5))
+    collection = store.components
+    collection.query(sort="name", limit=2)
+    order = collection.memo(("order", "name"), lambda: None)
+    assert order is not None
+    collection.create({"name": "Component 000", "type": "llm"})
+    items, _ = collection.query(sort="name", limit=1)
+    assert items[0]["name"] == "Component 000"
+
+def test_list_endpoint_query_parameters():
+    store = CatalogStore(seed=make_components(12))
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    client = TestClient(app)
+    try:
+        response = client.get("/components/", params={"type": "llm", "fields": "name", "limit": 2})
+        assert response.json() == [{"id": 3, "name": "Component 003"}, {"id": 6, "name": "Component 006"}]
+        next_page = client.get("/components/", params={"type": "llm", "fields": "name", "limit": 2,
+                                                       "cursor": response.headers["x-next-cursor"]})
+        assert [c["id"] for c in next_page.json()] == [9, 12]
+        assert "x-next-cursor" not in next_page.headers
+
+        assert client.get("/components/", params={"sort": "bogus"}).status_code == 400
+        assert client.get("/components/", params={"cursor": "garbage"}).status_code == 400
+        for sort, key in (("id", (0, "abc")), ("name", (1, ["a"])), ("name", (0, "a")), ("type", (True, 1))):
+            cursor = encode_position(sort, (key, 1))
+            assert client.get("/components/", params={"sort": sort, "cursor": cursor}).status_code == 400
+        assert client.get("/components/", params={"cursor": encode_position("id", ((0, 1), "1"))}).status_code == 400
+        assert client.get("/projects/", params={"status": "active"}).json() == []
+    finally:
+        app.dependency_overrides.clear()
+
+def test_get_many_reports_missing_ids_in_request_order():
+    collection = CatalogStore().components
+    items, missing = collection.get_many([2, 99, 1, 2, 42])
+    assert [c["id"] for c in items] == [2, 1]
+    assert missing == [99, 42]
+
+def test_batch_endpoints():
+    store = CatalogStore(seed=make_components(10))
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    client = TestClient(app)
+    try:
+        response = client.get("/components/", params={"ids": "3,1,77", "fields": "name"})
+        assert response.json() == [{"id": 3, "name": "Component 003"}, {"id": 1, "name": "Component 001"}]
+        assert response.headers["x-missing-ids"] == "77"
+        assert client.get("/components/", params={"ids": "1,x"}).status_code == 400
+
+        batch = client.post("/components:batchGet", json={"ids": [5, 6, 500]})
+        assert batch.status_code == 200
+        assert [c["id"] for c in batch.json()["items"]] == [5, 6]
+        assert batch.json()["missing"] == [500]
+
+        too_many = client.post("/projects:batchGet", json={"ids": list(range(1001))})
+        assert too_many.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
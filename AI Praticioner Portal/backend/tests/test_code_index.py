@@ -0,0 +1,138 @@
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_workspace
+from src.services.code_index import CodeIndex, module_name, parse_source
+from src.services.workspace_service import Workspace
+
+MODELS = '''
+class User(Base):
+    table = "users"
+
+    def full_name(self):
+        return format_name(self.first, self.last)
+
+def format_name(first, last):
+    return f"{first} {last}"
+'''
+
+SERVICE = '''
+from .models import User as Account
+from src import models
+
+@cached
+def load(user_id):
+    account = Account(user_id)
+    other = models.User(user_id)
+    return account.full_name()
+'''
+
+def make_workspace(tmp_path):
+    workspace = Workspace(str(tmp_path / "ws"))
+    workspace.write_text("/src/__init__.py", "", create=True)
+    workspace.write_text("/src/models.py", MODELS, create=True)
+    workspace.write_text("/src/service.py", SERVICE, create=True)
+    workspace.write_text("/node_modules/pkg/setup.py", "def User(): pass\n", create=True)
+    return workspace
+
+def test_parse_source_extracts_symbols_imports_and_calls():
+    parsed = parse_source(SERVICE.encode(), "/src/service.py")
+    assert parsed["module"] == "src.service"
+    # Locals are not indexed
+    assert [symbol[:3] for symbol in parsed["symbols"]] == [("load", "load", "function")]
+    assert ("src.models", "User", "Account", 2) in parsed["imports"]
+    assert {(name, kind) for name, kind, _, _ in parsed["refs"]} == {
+        ("cached", "decorator"), ("Account", "call"), ("User", "call"), ("full_name", "call")}
+    assert module_name("/src/__init__.py") == "src"
+    assert parse_source(b"def broken(:", "/x.py")["error"]
+    nested = parse_source(("x = " + "(" * 20000 + "1" + ")" * 20000).encode(), "/deep.py")
+    assert nested["error"] and nested["symbols"] == []
+
+def test_unindexable_files_do_not_break_the_index(tmp_path):
+    workspace = make_workspace(tmp_path)
+    (tmp_path / "outside.py").write_text("def g(): pass\n")
+    (tmp_path / "ws" / "link.py").symlink_to(tmp_path / "outside.py")
+    workspace.write_text("/src/deep.py", "x = " + "-" * 20000 + "1\n", create=True)
+    workspace.write_text("/src/good.py", "def g(): pass\n", create=True)
+    index = CodeIndex(workspace, max_workers=1, is_ignored=lambda path: "node_modules" in path)
+
+    assert [d["path"] for d in index.search("g")] == ["/src/good.py"]
+    assert index.stats()["syntax_errors"] == 1
+    assert not index._needs_sync
+
+def test_definitions_references_and_search(tmp_path):
+    workspace = make_workspace(tmp_path)
+    index = CodeIndex(workspace, str(tmp_path / "index.sqlite"), max_workers=1,
+                      is_ignored=lambda path: "node_modules" in path)
+
+    assert [(d["path"], d["qualname"]) for d in index.definition("Account", "/src/service.py")][0] == \
+        ("/src/models.py", "User")
+    assert index.definition("models.User", "/src/service.py")[0]["line"] == 2
+    assert index.definition("models", "/src/service.py")[0] == {
+        "path": "/src/models.py", "name": "models", "qualname": "models", "kind": "module", "line": 1, "col": 0,
+        "end_line": 1}
+    assert [d["qualname"] for d in index.definition("full_name")] == ["User.full_name"]
+
+    refs = index.references("User")
+    assert [(ref["path"], ref["kind"], ref["line"]) for ref in refs] == [
+        ("/src/service.py", "import", 2), ("/src/service.py", "call", 8)]
+    assert [ref["path"] for ref in index.references("format_name")] == ["/src/models.py"]
+
+    assert [symbol["qualname"] for symbol in index.search("user")] == ["User"]
+    assert [symbol["name"] for symbol in index.search("name")] == ["full_name", "format_name"]
+    assert [symbol["name"] for symbol in index.search("f", kind="function")] == ["format_name"]
+    assert [symbol["name"] for symbol in index.outline("/src/models.py")] == ["User", "table", "full_name",
+                                                                              "format_name"]
+
+def test_saves_reparse_only_changed_files_and_index_persists(tmp_path):
+    workspace = make_workspace(tmp_path)
+    db = str(tmp_path / "index.sqlite")
+    index = CodeIndex(workspace, db, max_workers=1)
+    assert index.sync()["parsed"] == 4
+    workspace.save("/src/models.py", MODELS + "\ndef slugify(text):\n    return text\n")
+    workspace.save("/src/service.py", SERVICE)
+    assert index.search("slugify")[0]["path"] == "/src/models.py"
+    assert index.stats()["parsed"] == 5
+
+    workspace.delete_file("/src/models.py")
+    assert index.search("slugify") == []
+    index.close()
+
+    reopened = CodeIndex(workspace, db, max_workers=1)
+    assert reopened.sync()["parsed"] == 0
+    assert reopened.stats()["files"] == 3
+
+def test_large_workspace_is_indexed_in_parallel(tmp_path):
+    workspace = Workspace(str(tmp_path / "ws"))
+    for i in range(300):
+        (workspace.root / "pkg").mkdir(exist_ok=True)
+        (workspace.root / "pkg" / f"mod_{i}.py").write_text(
+            f"from pkg.mod_{(i + 1) % 300} import helper_{(i + 1) % 300}\n\n"
+            f"class Model{i}:\n    def run(self):\n        return helper_{(i + 1) % 300}()\n\n"
+            f"def helper_{i}():\n    return Model{i}()\n")
+    index = CodeIndex(workspace, str(tmp_path / "index.sqlite"), max_workers=2)
+    assert index.sync()["parsed"] == 300
+
+    assert index.definition("helper_7", "/pkg/mod_6.py")[0]["path"] == "/pkg/mod_7.py"
+    assert len(index.references("helper_7")) == 2
+    assert len(index.search("model1", limit=20)) == 20
+
+def test_index_endpoints(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODE_INDEX_PATH", str(tmp_path / "index.sqlite"))
+    workspace = make_workspace(tmp_path)
+    app.dependency_overrides[get_workspace] = lambda: workspace
+    client = TestClient(app)
+    try:
+        definition = client.get("/index/definition", params={"name": "Account", "path": "/src/service.py"})
+        assert definition.json()[0]["path"] == "/src/models.py"
+        assert "/node_modules/pkg/setup.py" not in [d["path"] for d in
+                                                    client.get("/index/definition", params={"name": "User"}).json()]
+        assert len(client.get("/index/references", params={"name": "User"}).json()) == 2
+        assert client.get("/index/symbols", params={"q": "format"}).json()[0]["name"] == "format_name"
+        assert client.get("/index/symbols", params={"q": " "}).status_code == 400
+
+        client.put("/files/content", json={"path": "/src/service.py", "content": SERVICE + "\nclass Loader: pass\n"})
+        assert client.get("/index/outline", params={"path": "/src/service.py"}).json()[-1]["name"] == "Loader"
+        assert client.post("/index/sync").json()["parsed"] == 0
+        assert client.get("/metrics/index").json()["files"] == 3
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_catalog_store
+from src.services.catalog_service import CatalogStore
+from src.services.component_search import ComponentSearchIndex, within_one_edit
+
+COMPONENTS = [
+    {"id": 1, "name": "Vector Retriever", "type": "retriever", "description": "Dense retrieval over embeddings",
+     "tags": ["rag", "search"]},
+    {"id": 2, "name": "Keyword Retriever", "type": "retriever", "description": "BM25 keyword retrieval"},
+    {"id": 3, "name": "Summarizer", "type": "llm", "description": "Summarize retrieved passages",
+     "tags": ["text"]},
+    {"id": 4, "name": "Web Search Tool", "type": "tool", "description": "Search the web"},
+]
+
+def make_store():
+    return CatalogStore(seed={"projects": [], "components": COMPONENTS})
+
+def ids(results):
+    return [component["id"] for component, _ in results]
+
+def test_ranking_prefers_name_matches():
+    index = ComponentSearchIndex.for_collection(make_store().components)
+    results, total = index.search("search")
+    assert total == 2
+    assert ids(results) == [4, 1]
+
+def test_prefix_and_typo_matching():
+    index = ComponentSearchIndex.for_collection(make_store().components)
+    assert ids(index.search("summ")[0]) == [3]
+    assert set(ids(index.search("retreiver")[0])) == {1, 2}
+    assert index.search("zzzz")[1] == 0
+    assert set(ids(index.search("retriever", type="retriever")[0])) == {1, 2}
+    assert within_one_edit("retreiver", "retriever")
+    assert not within_one_edit("retriever", "receiver")
+
+def test_index_follows_catalog_writes():
+    store = make_store()
+    index = ComponentSearchIndex.for_collection(store.components)
+    store.components.create({"name": "Reranker", "type": "tool", "tags": ["rag"]})
+    assert ids(index.search("reranker")[0]) == [5]
+    store.components.update(5, {"name": "Cross Encoder", "type": "tool"})
+    assert index.search("reranker")[1] == 0
+    assert ids(index.search("cross encoder")[0]) == [5]
+    store.components.delete(5)
+    assert index.search("cross")[1] == 0
+    assert len(index) == 4
+
+def test_search_endpoint():
+    store = make_store()
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    client = TestClient(app)
+    try:
+        response = client.get("/components/search", params={"q": "web searh"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["items"][0]["id"] == 4 and body["items"][0]["score"] > 0
+        client.post("/components/", json={"name": "Web Scraper", "type": "tool"})
+        assert client.get("/components/search", params={"q": "scraper"}).json()["total"] == 1
+        assert client.get("/components/search", params={"q": ""}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
+
+def test_large_catalog_ranks_components_matching_every_term_first():
+    words = ["vector", "keyword", "retriever", "summarizer", "planner", "router", "embedding", "parser"]
+    index = ComponentSearchIndex()
+    for i in range(20000):
+        index.add({"id": i, "name": f"{words[i % 8]} {words[(i // 8) % 8]} {i}", "type": words[i % 3],
+                   "description": f"component number {i}"})
+    results, total = index.search("vector retr", limit=10)
+    assert len(results) == 10 and total > 10
+    assert all({"vector", "retriever"} <= set(item["name"].split()) for item, _ in results)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,73 @@
+import gzip
+import json
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_catalog_store
+from src.api.conditional import represent, etag_matches, choose_encoding
+from src.services.catalog_service import CatalogStore
+
+def make_client(store):
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    return TestClient(app)
+
+def test_representation_is_reused_until_a_write():
+    store = CatalogStore()
+    first = represent(store.projects)
+    assert represent(store.projects) is first
+    store.projects.create({"name": "New"})
+    second = represent(store.projects)
+    assert second is not first and second.etag != first.etag
+    assert json.loads(second.body)[-1]["name"] == "New"
+
+def test_etag_matching_and_encoding_negotiation():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abc"', '"def"')
+    assert not etag_matches(None, '"abc"')
+    assert etag_matches('"abc-gzip"', '"abc"', '"abc-gzip"')
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding(None) is None
+
+def test_conditional_get_returns_304_until_catalog_changes():
+    store = CatalogStore()
+    client = make_client(store)
+    try:
+        response = client.get("/components/")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.json() == store.components.list()
+
+        cached = client.get("/components/", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+        client.post("/components/", json={"name": "Ranker", "type": "tool"})
+        changed = client.get("/components/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()[-1]["name"] == "Ranker"
+    finally:
+        app.dependency_overrides.clear()
+
+def test_large_catalog_is_served_compressed():
+    store = CatalogStore(seed={"projects": [{"id": i, "name": f"Project {i}"} for i in range(1, 200)],
+                               "components": []})
+    client = make_client(store)
+    try:
+        response = client.get("/projects/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 199
+        identity = client.get("/projects/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers
+        assert response.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+        # Either variant's validator revalidates the other
+        cached = client.get("/projects/", headers={"Accept-Encoding": "identity",
+                                                   "If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304 and cached.headers["etag"] == identity.headers["etag"]
+        raw = represent(store.projects).encoded("gzip")
+        assert gzip.decompress(raw) == represent(store.projects).body
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_database_service
+from src.services.database_service import DatabaseService
+from src.services.db_metrics import LatencyHistogram
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(buckets_ms=(1, 10, 100))
+    for duration in [0.5] * 90 + [50] * 9 + [500]:
+        histogram.observe(duration)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["p50_ms"] == 1
+    assert snapshot["p95_ms"] == 100
+    assert snapshot["p99_ms"] == 100
+    assert snapshot["max_ms"] == 500
+    assert snapshot["buckets"] == {"le_1": 90, "le_10": 0, "le_100": 9, "le_inf": 1}
+
+def test_statements_are_timed_and_slow_queries_logged(tmp_path):
+    service = DatabaseService(f"sqlite:///{tmp_path / 'metrics.db'}", slow_query_threshold_ms=0)
+    service.store_user({"username": "ann", "hashed_password": "h", "roles": ["user"]})
+    service.get_user("ann")
+
+    snapshot = service.metrics.snapshot()
+    assert snapshot["statements"]["count"] > 0
+    assert any("FROM users" in entry["statement"] for entry in snapshot["slow_queries"])
+    assert snapshot["pool"]["checkout_wait"]["count"] > 0
+    assert snapshot["pool"]["connections_opened"] >= 1
+    service.engine.dispose()
+
+def test_metrics_endpoint(sqlite_service):
+    app.dependency_overrides[get_database_service] = lambda: sqlite_service
+    try:
+        sqlite_service.list_users()
+        response = TestClient(app).get("/metrics/db")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["statements"]["count"] > 0
+    assert body["pool"]["class"]
+    assert body["user_cache"] is None
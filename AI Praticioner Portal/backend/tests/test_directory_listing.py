@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_workspace
+from src.services.directory_listing import DirectoryListing
+from src.services.workspace_service import Workspace, WorkspaceError
+
+def make_listing(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    for name in ("src", "node_modules/react", "backend/venv/lib", "Docs"):
+        (tmp_path / name).mkdir(parents=True)
+    for i in range(20):
+        (tmp_path / "src" / f"module_{i:02}.py").write_text("x = 1\n")
+    (tmp_path / "README.md").write_text("# demo\n")
+    (tmp_path / "backend" / "app.pyc").write_text("")
+    return workspace, DirectoryListing.for_workspace(workspace, watch=False)
+
+def test_listing_pages_with_cursor_and_skips_ignored(tmp_path):
+    _, listing = make_listing(tmp_path)
+    root, cursor = listing.list("/")
+    assert [entry["name"] for entry in root] == ["backend", "Docs", "src", "README.md"]
+    assert cursor is None
+    assert listing.list("/backend")[0] == []
+
+    names, cursor, pages = [], None, 0
+    while True:
+        page, cursor = listing.list("/src", limit=8, cursor=cursor)
+        names += [entry["name"] for entry in page]
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3 and names == [f"module_{i:02}.py" for i in range(20)]
+
+    with pytest.raises(FileNotFoundError):
+        listing.list("/node_modules")
+    with pytest.raises(NotADirectoryError):
+        listing.list("/README.md")
+    with pytest.raises(WorkspaceError):
+        listing.list("/src", cursor="not-a-cursor")
+
+def test_cached_listing_is_invalidated_by_changes(tmp_path):
+    workspace, listing = make_listing(tmp_path)
+    listing.list("/src")
+    listing.list("/src")
+    assert listing.stats()["misses"] == 1 and listing.stats()["hits"] == 1
+
+    workspace.write_text("/src/module_00.py", "x = 1000000\n")
+    assert listing.list("/src")[0][0]["size"] == len("x = 1000000\n")
+
+    workspace.write_text("/src/pkg/new.py", "", create=True)
+    assert listing.list("/src")[0][0]["name"] == "pkg"
+
+    # Made outside the workspace: caught by the directory mtime check
+    (tmp_path / "src" / "external.py").write_text("")
+    assert "external.py" in [entry["name"] for entry in listing.list("/src")[0]]
+
+    workspace.delete_directory("/src/pkg")
+    assert "pkg" not in [entry["name"] for entry in listing.list("/src")[0]]
+
+def test_filesystem_events_skip_ignored_paths(tmp_path):
+    workspace, listing = make_listing(tmp_path)
+    listing.list("/")
+    workspace.external_change("modified", str(tmp_path / "node_modules" / "react"))
+    workspace.external_change("created", str(tmp_path / ".uploads" / "x.tmp"))
+    assert "/" in listing._listings
+    workspace.external_change("modified", str(tmp_path / "README.md"))
+    assert "/" not in listing._listings
+
+def test_symlinked_directories_are_not_expanded(tmp_path):
+    workspace, listing = make_listing(tmp_path)
+    (tmp_path / "src" / "loop").symlink_to(tmp_path, target_is_directory=True)
+    loop = next(child for child in listing.tree("/src")["children"] if child["name"] == "loop")
+    assert loop == {"name": "loop", "path": "/src/loop", "type": "directory"}
+    entries, _ = listing.list("/src/loop")
+    assert "src" in [entry["name"] for entry in entries]
+
+def test_directory_endpoints(tmp_path):
+    workspace, _ = make_listing(tmp_path)
+    app.dependency_overrides[get_workspace] = lambda: workspace
+    client = TestClient(app)
+    try:
+        first = client.get("/directories", params={"path": "/src", "limit": 15})
+        assert len(first.json()) == 15
+        rest = client.get("/directories", params={"path": "/src", "cursor": first.headers["x-next-cursor"]})
+        assert len(rest.json()) == 5 and "x-next-cursor" not in rest.headers
+
+        shallow = client.get("/files").json()
+        assert [child["name"] for child in shallow["children"]] == ["backend", "Docs", "src", "README.md"]
+        assert "children" not in shallow["children"][2]
+        deeper = client.get("/files", params={"depth": 2}).json()
+        assert len(deeper["children"][2]["children"]) == 20
+        assert client.get("/directories", params={"path": "/node_modules"}).status_code == 404
+        assert client.get("/metrics/files").json()["cached_directories"] >= 1
+    finally:
+        app.dependency_overrides.clear()
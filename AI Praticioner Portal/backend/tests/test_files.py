@@ -0,0 +1,202 @@
+import os
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api import files
+from src.api.dependencies import get_workspace
+from src.api.file_response import FileRangeResponse
+from src.services.workspace_service import (Workspace, WorkspaceError, FileTooLargeError, ByteRange, TextEdit,
+                                            apply_edits, content_hash, parse_range, parse_content_range)
+
+@pytest.fixture
+def client(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    app.dependency_overrides[get_workspace] = lambda: workspace
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == ByteRange(0, 9)
+    assert parse_range("bytes=90-", 100) == ByteRange(90, 99)
+    assert parse_range("bytes=-10", 100) == ByteRange(90, 99)
+    assert parse_range("bytes=50-500", 100) == ByteRange(50, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(WorkspaceError):
+        parse_range("bytes=100-", 100)
+    assert parse_content_range("bytes 0-9/20") == (0, 9, 20)
+    with pytest.raises(WorkspaceError):
+        parse_content_range("bytes 0-20/20")
+
+def test_paths_stay_inside_workspace(tmp_path):
+    workspace = Workspace(str(tmp_path / "ws"))
+    assert workspace.resolve("/src/main.py") == workspace.root / "src" / "main.py"
+    for path in ("../secret", "/src/../../secret", "/.uploads/x"):
+        with pytest.raises(WorkspaceError):
+            workspace.resolve(path)
+
+def test_file_crud(client):
+    assert client.post("/files", json={"path": "/src/main.py", "content": "print(1)\n"}).status_code == 201
+    assert client.post("/files", json={"path": "/src/main.py"}).status_code == 409
+    assert client.post("/directories", json={"path": "/tests"}).status_code == 201
+
+    tree = client.get("/files", params={"depth": 2}).json()
+    assert [child["name"] for child in tree["children"]] == ["src", "tests"]
+    assert tree["children"][0]["children"][0]["path"] == "/src/main.py"
+
+    content = client.get("/files/content", params={"path": "/src/main.py"}).json()
+    assert content["content"] == "print(1)\n" and content["language"] == "python"
+    saved = client.put("/files/content", json={"path": "/src/main.py", "content": "print(2)\n"})
+    assert saved.status_code == 200 and saved.json()["etag"] != content["etag"]
+
+    assert client.get("/files/content", params={"path": "/../etc/passwd"}).status_code == 400
+    assert client.delete("/files", params={"path": "/src/main.py"}).status_code == 200
+    assert client.get("/files/content", params={"path": "/src/main.py"}).status_code == 404
+    assert client.delete("/directories", params={"path": "/src"}).status_code == 200
+
+def test_large_file_is_streamed_in_ranges(client, tmp_path, monkeypatch):
+    data = os.urandom(1024 * 1024 + 7)
+    (tmp_path / "data.bin").write_bytes(data)
+    monkeypatch.setattr(files, "INLINE_MAX_BYTES", 1024)
+    assert client.get("/files/content", params={"path": "/data.bin"}).status_code == 413
+
+    full = client.get("/files/raw", params={"path": "/data.bin"})
+    assert full.status_code == 200 and full.content == data
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = client.get("/files/raw", params={"path": "/data.bin"}, headers={"Range": "bytes=1000-299999"})
+    assert part.status_code == 206
+    assert part.content == data[1000:300000]
+    assert part.headers["content-range"] == f"bytes 1000-299999/{len(data)}"
+
+    tail = client.get("/files/raw", params={"path": "/data.bin"}, headers={"Range": "bytes=-7"})
+    assert tail.content == data[-7:]
+    stale = client.get("/files/raw", params={"path": "/data.bin"}, headers={"Range": "bytes=0-9", "If-Range": '"x"'})
+    assert stale.status_code == 200 and len(stale.content) == len(data)
+    unsatisfiable = client.get("/files/raw", params={"path": "/data.bin"}, headers={"Range": f"bytes={len(data)}-"})
+    assert unsatisfiable.status_code == 416
+    assert client.get("/files/raw", params={"path": "/data.bin"},
+                      headers={"If-None-Match": full.headers["etag"]}).status_code == 304
+    assert client.head("/files/raw", params={"path": "/data.bin"}).headers["content-length"] == str(len(data))
+
+def test_chunked_upload_resumes(client, tmp_path):
+    data = os.urandom(250_000)
+    params = {"path": "/uploads/big.bin"}
+    first = client.put("/files/upload", params=params, content=data[:100_000],
+                       headers={"Content-Range": f"bytes 0-99999/{len(data)}"})
+    assert first.status_code == 202 and first.json()["received"] == 100_000
+
+    skipped = client.put("/files/upload", params=params, content=data[200_000:],
+                         headers={"Content-Range": f"bytes 200000-249999/{len(data)}"})
+    assert skipped.status_code == 409 and skipped.json()["detail"]["received"] == 100_000
+    assert client.get("/files/upload", params=params).json()["received"] == 100_000
+
+    client.put("/files/upload", params=params, content=data[100_000:200_000],
+               headers={"Content-Range": f"bytes 100000-199999/{len(data)}"})
+    last = client.put("/files/upload", params=params, content=data[200_000:],
+                      headers={"Content-Range": f"bytes 200000-249999/{len(data)}"})
+    assert last.status_code == 201 and last.json()["size"] == len(data)
+    assert (tmp_path / "uploads" / "big.bin").read_bytes() == data
+    assert client.get("/files/upload", params=params).json()["received"] == 0
+    assert ".uploads" not in [child["name"] for child in client.get("/files").json()["children"]]
+
+def test_zero_copy_send_is_used_when_the_server_offers_it(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"0123456789")
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        file = open(path, "rb", buffering=0)
+        response = FileRangeResponse(file, 2, 5, status_code=206)
+        scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+        await response(scope, None, send)
+        return file
+
+    file = asyncio.run(run())
+    assert sent[1]["type"] == "http.response.zerocopysend"
+    assert (sent[1]["offset"], sent[1]["count"]) == (2, 5)
+    assert file.closed
+
+def test_apply_edits_uses_editor_offsets():
+    assert apply_edits("hello world", [TextEdit(6, 5, "there"), TextEdit(0, 0, "> ")]) == "> hello there"
+    # The emoji is two UTF-16 code units, as in the editor
+    assert apply_edits("a😀b", [TextEdit(3, 1, "c")]) == "a😀c"
+    with pytest.raises(WorkspaceError):
+        apply_edits("abc", [TextEdit(2, 5, "")])
+    with pytest.raises(WorkspaceError):
+        apply_edits("a😀b", [TextEdit(2, 1, "")])
+
+def test_delta_saves_with_conflicts_and_history(client):
+    client.post("/files", json={"path": "/notes.md", "content": "line one\nline two\n"})
+    base = client.get("/files/content", params={"path": "/notes.md"}).json()["hash"]
+
+    saved = client.put("/files/content", json={"path": "/notes.md", "base_hash": base,
+                                               "edits": [{"offset": 5, "length": 3, "text": "1"}]})
+    assert saved.status_code == 200
+    current = client.get("/files/content", params={"path": "/notes.md"}).json()
+    assert current["content"] == "line 1\nline two\n" and current["hash"] == saved.json()["hash"]
+
+    stale = client.put("/files/content", json={"path": "/notes.md", "base_hash": base,
+                                               "edits": [{"offset": 0, "length": 0, "text": "x"}]})
+    assert stale.status_code == 409 and stale.json()["detail"]["current_hash"] == current["hash"]
+    assert client.put("/files/content", json={"path": "/notes.md", "base_hash": base,
+                                              "content": "overwrite"}).status_code == 409
+    assert client.put("/files/content", json={"path": "/notes.md",
+                                              "edits": [{"offset": 0, "length": 0, "text": "x"}]}).status_code == 400
+
+    unchanged = client.put("/files/content", json={"path": "/notes.md", "content": current["content"]})
+    assert unchanged.json()["hash"] == current["hash"]
+    history = client.get("/files/history", params={"path": "/notes.md"}).json()
+    assert [version["hash"] for version in history] == [base]
+    old = client.get("/files/history/content", params={"path": "/notes.md", "hash": base}).json()
+    assert old["content"] == "line one\nline two\n"
+    assert ".history" not in [child["name"] for child in client.get("/files").json()["children"]]
+
+def test_history_is_bounded(tmp_path):
+    workspace = Workspace(str(tmp_path), history_limit=3)
+    workspace.write_text("/a.txt", "0", create=True)
+    for i in range(1, 6):
+        workspace.save("/a.txt", str(i))
+    assert [workspace.read_version("/a.txt", version["hash"]) for version in workspace.versions("/a.txt")] == \
+        ["4", "3", "2"]
+
+def test_large_files_take_delta_saves_against_their_streamed_hash(client, tmp_path, monkeypatch):
+    data = b"x" * 5000 + b"\n"
+    (tmp_path / "big.txt").write_bytes(data)
+    monkeypatch.setattr(files, "INLINE_MAX_BYTES", 1024)
+    head = client.head("/files/raw", params={"path": "/big.txt"})
+    assert head.headers["x-content-hash"] == content_hash(data)
+
+    saved = client.put("/files/content", json={"path": "/big.txt", "base_hash": head.headers["x-content-hash"],
+                                               "edits": [{"offset": 0, "length": 1, "text": "y"}]})
+    assert saved.status_code == 200
+    assert (tmp_path / "big.txt").read_bytes() == b"y" + data[1:]
+    assert client.head("/files/raw", params={"path": "/big.txt"}).headers["x-content-hash"] == saved.json()["hash"]
+
+def test_saves_are_bounded_by_size(tmp_path):
+    workspace = Workspace(str(tmp_path), save_max_bytes=100, history_max_bytes=10)
+    workspace.write_text("/a.txt", "short", create=True)
+    workspace.save("/a.txt", "x" * 50)
+    workspace.save("/a.txt", "y" * 50)
+    # Only the 5-byte version fits in history
+    assert [version["size"] for version in workspace.versions("/a.txt")] == [5]
+    with pytest.raises(FileTooLargeError):
+        workspace.save("/a.txt", "z" * 101)
+    (tmp_path / "a.txt").write_text("w" * 101)
+    with pytest.raises(FileTooLargeError):
+        workspace.save("/a.txt", edits=[TextEdit(0, 1, "")], base_hash=workspace.file_hash("/a.txt"))
+
+def test_versions_are_matched_by_their_full_hash(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    workspace.write_text("/a.txt", "one", create=True)
+    workspace.save("/a.txt", "two")
+    version = workspace.versions("/a.txt")[0]["hash"]
+    assert workspace.read_version("/a.txt", version) == "one"
+    with pytest.raises(FileNotFoundError):
+        workspace.read_version("/a.txt", version[-8:])
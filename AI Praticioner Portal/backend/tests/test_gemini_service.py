@@ -0,0 +1,76 @@
+import asyncio
+import json
+import httpx
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_gemini_service
+from src.services.fake_gemini import create_app, fake_completion
+from src.services.gemini_service import GeminiService, GeminiError, build_request
+
+def make_service(api_key="test-key", **delays):
+    fake = create_app(**delays)
+    service = GeminiService(api_key=api_key, base_url="http://fake", transport=httpx.ASGITransport(app=fake))
+    return service, fake
+
+def test_build_request_includes_generation_config():
+    body = build_request("sort a list", "Python", temperature=0.2, max_output_tokens=128)
+    assert "Python" in body["contents"][0]["parts"][0]["text"]
+    assert body["generationConfig"] == {"temperature": 0.2, "maxOutputTokens": 128}
+    assert "generationConfig" not in build_request("sort a list")
+
+def test_generate_code_async_against_fake_server():
+    service, fake = make_service()
+    response = asyncio.run(service.generate_code_async("reverse a string"))
+    assert response.status == "success"
+    assert response.content == fake_completion(build_request("reverse a string")["contents"][0]["parts"][0]["text"])
+    assert fake.state.requests == 1
+    assert service.stats()["requests"] == 1
+
+def test_upstream_errors_are_reported():
+    service, _ = make_service(api_key="wrong-key")
+    response = asyncio.run(service.generate_code_async("anything"))
+    assert response.status == "error"
+    assert response.error == "API key not valid"
+    assert service.stats()["errors"] == 1
+
+def test_stream_code_yields_chunks_and_records_ttft():
+    service, _ = make_service()
+
+    async def collect():
+        return [chunk async for chunk in service.stream_code("reverse a string")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks).startswith("def ")
+    stats = service.stats()
+    assert stats["streams"] == 1 and stats["chunks"] == len(chunks)
+    assert stats["time_to_first_token"]["count"] == 1
+
+def test_stream_code_raises_when_not_configured():
+    service = GeminiService(api_key="")
+
+    async def collect():
+        return [chunk async for chunk in service.stream_code("x")]
+
+    try:
+        asyncio.run(collect())
+        raised = False
+    except GeminiError:
+        raised = True
+    assert raised
+
+def test_generate_endpoint_streams_tokens():
+    service, _ = make_service()
+    app.dependency_overrides[get_gemini_service] = lambda: service
+    client = TestClient(app)
+    try:
+        whole = client.post("/code/generate", json={"prompt": "add two numbers"})
+        assert whole.status_code == 200
+
+        streamed = client.post("/code/generate", json={"prompt": "add two numbers", "stream": True})
+        assert streamed.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in streamed.text.splitlines() if line.startswith("data: ")]
+        assert "".join(event["text"] for event in events[:-1]) == whole.json()["code"]
+        assert events[-1]["ttft_ms"] is not None
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+import httpx
+from src.services.fake_gemini import create_app
+from src.services.gemini_service import GeminiService
+from src.services.generation_cache import GenerationCache, DiskCache, generation_key, normalize_prompt
+from src.services.user_cache import LRUCache
+
+def make_service(cache):
+    fake = create_app()
+    return GeminiService(api_key="test-key", base_url="http://fake", transport=httpx.ASGITransport(app=fake),
+                         cache=cache), fake
+
+def test_keys_ignore_whitespace_but_not_parameters():
+    assert normalize_prompt("  sort   a list\r\n  of ints ") == "sort a list\nof ints"
+    base = generation_key("sort a list", "m", language="Python")
+    assert generation_key(" sort  a list ", "m", language="python ") == base
+    assert generation_key("sort a list", "m", language="Go") != base
+    assert generation_key("sort a list", "other", language="Python") != base
+    assert generation_key("sort a list", "m", language="Python", temperature=0.1) != base
+
+def test_disk_cache_persists_expires_and_evicts(tmp_path):
+    disk = DiskCache(str(tmp_path), ttl=60, max_bytes=10_000)
+    disk.set("a" * 64, "first")
+    assert DiskCache(str(tmp_path)).get("a" * 64) == "first"
+
+    for i in range(100):
+        disk.set(f"{i:064d}", "x" * 200)
+    assert disk.bytes <= 10_000
+    assert disk.evictions > 0
+    assert disk.get("a" * 64) is None
+
+    expiring = DiskCache(str(tmp_path / "ttl"), ttl=0.01)
+    expiring.set("b" * 64, "soon gone")
+    time.sleep(0.02)
+    assert expiring.get("b" * 64) is None
+    assert len(expiring) == 0
+
+def test_disk_hits_are_promoted_to_memory(tmp_path):
+    cache = GenerationCache(memory=LRUCache(maxsize=10), disk=DiskCache(str(tmp_path)))
+    cache.set("k", "code")
+    cache.memory.clear()
+    assert cache.get("k") == "code"
+    assert cache.get("k") == "code"
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+def test_malformed_disk_entries_are_evicted(tmp_path):
+    disk = DiskCache(str(tmp_path))
+    for key, body in (("c" * 64, '{"content": "no timestamp"}'), ("d" * 64, "[1, 2]")):
+        disk.set(key, "placeholder")
+        disk._file(key).write_text(body, encoding="utf-8")
+        assert disk.get(key) is None
+        assert not disk._file(key).exists()
+    assert len(disk) == 0
+
+def test_async_lookups_run_disk_io_off_the_event_loop(tmp_path):
+    disk = DiskCache(str(tmp_path))
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(disk, name)
+        def record(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+        setattr(disk, name, record)
+    cache = GenerationCache(memory=LRUCache(maxsize=10), disk=disk)
+
+    async def run():
+        await cache.set_async("k", "code")
+        cache.memory.clear()
+        assert await cache.get_async("k") == "code"
+        assert await cache.get_async("k") == "code"
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 2 and loop_thread not in threads
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+def test_service_serves_repeats_from_cache_with_opt_out(tmp_path):
+    service, fake = make_service(GenerationCache(disk=DiskCache(str(tmp_path))))
+
+    async def scenario():
+        first = await service.generate_code_async("reverse a string", "Python")
+        repeat = await service.generate_code_async("  reverse   a string ", "python")
+        fresh = await service.generate_code_async("reverse a string", "Python", use_cache=False)
+        streamed = [chunk async for chunk in service.stream_code("reverse a string", "Python")]
+        return first, repeat, fresh, streamed
+
+    first, repeat, fresh, streamed = asyncio.run(scenario())
+    assert not first.cached and repeat.cached and not fresh.cached
+    assert repeat.content == first.content == "".join(streamed)
+    assert fake.state.requests == 2
+    assert service.stats()["cache"]["hit_rate"] > 0
+
+def test_failed_generations_are_not_cached():
+    fake = create_app(api_key="other-key")
+    service = GeminiService(api_key="test-key", base_url="http://fake", transport=httpx.ASGITransport(app=fake),
+                            cache=GenerationCache())
+    asyncio.run(service.generate_code_async("x"))
+    assert len(service.cache.memory) == 0
+
+def test_blocked_and_empty_completions_are_not_cached():
+    def upstream(request):
+        if request.url.path.endswith(":streamGenerateContent"):
+            return httpx.Response(200, text='data: {"promptFeedback": {"blockReason": "SAFETY"}}\n\n')
+        return httpx.Response(200, json={"promptFeedback": {"blockReason": "SAFETY"}})
+
+    service = GeminiService(api_key="test-key", base_url="http://fake", transport=httpx.MockTransport(upstream),
+                            cache=GenerationCache())
+
+    async def scenario():
+        first = await service.generate_code_async("x")
+        second = await service.generate_code_async("x")
+        streamed = [chunk async for chunk in service.stream_code("y")]
+        return first, second, streamed
+
+    first, second, streamed = asyncio.run(scenario())
+    assert (first.status, first.error) == ("error", "Prompt blocked: SAFETY")
+    assert not second.cached and streamed == []
+    assert len(service.cache.memory) == 0
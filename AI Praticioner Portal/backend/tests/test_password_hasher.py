@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import bcrypt
+import pytest
+from src.services.password_hasher import PasswordHasher, HasherBusyError, hash_rounds
+from src.services.security_service import SecurityService
+from src.services.user_store import InMemoryUserStore
+
+@pytest.fixture(scope="module")
+def hasher():
+    hasher = PasswordHasher(rounds=4, max_workers=2)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_rounds():
+    assert hash_rounds(bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=5)).decode()) == 5
+    assert hash_rounds("plaintext") is None
+
+def test_hash_and_verify_concurrently(hasher):
+    async def scenario():
+        hashes = await asyncio.gather(*(hasher.hash(f"pw{i}") for i in range(6)))
+        checks = await asyncio.gather(*(hasher.verify(f"pw{i}", h) for i, h in enumerate(hashes)))
+        return hashes, checks
+
+    hashes, checks = asyncio.run(scenario())
+    assert all(checks)
+    assert all(hash_rounds(h) == 4 for h in hashes)
+    assert asyncio.run(hasher.verify("wrong", hashes[0])) is False
+    assert hasher.stats()["peak_in_flight"] >= 2
+
+def test_verify_and_update_rehashes_old_cost(hasher):
+    old = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode()
+    valid, new_hash = asyncio.run(hasher.verify_and_update("secret", old))
+    assert valid and hash_rounds(new_hash) == 4
+    assert asyncio.run(hasher.verify_and_update("secret", new_hash)) == (True, None)
+    assert asyncio.run(hasher.verify_and_update("nope", old)) == (False, None)
+
+def test_long_passwords_are_truncated_to_bcrypts_limit(hasher):
+    long_password = "p" * 100
+    hashed = asyncio.run(hasher.hash(long_password))
+    assert asyncio.run(hasher.verify(long_password, hashed)) is True
+    assert hasher.verify_sync("p" * 72, hashed) is True
+    assert hasher.verify_sync("p" * 71, hashed) is False
+    assert hasher.verify_sync(long_password, hasher.hash_sync(long_password)) is True
+
+def test_bounded_queue_rejects_excess():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+
+    async def scenario():
+        return await asyncio.gather(*(hasher.hash("pw") for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, HasherBusyError) for r in results) == 2
+    assert hasher.stats()["rejected"] == 2
+
+def test_security_service_rehashes_on_login(hasher):
+    service = SecurityService(hasher=hasher)
+    service.users.add_user("ann", bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode(), [])
+
+    assert asyncio.run(service.verify_credentials_async("ann", "secret")) is True
+    assert hash_rounds(service.users.get_password_hash("ann")) == 4
+    assert asyncio.run(service.verify_credentials_async("ann", "wrong")) is False
+    assert asyncio.run(service.verify_credentials_async("bob", "secret")) is False
+
+def test_credential_store_runs_off_the_event_loop(hasher):
+    threads = []
+
+    class RecordingStore(InMemoryUserStore):
+        def get_password_hash(self, username):
+            threads.append(threading.get_ident())
+            return super().get_password_hash(username)
+
+        def set_password_hash(self, username, hashed_password):
+            threads.append(threading.get_ident())
+            super().set_password_hash(username, hashed_password)
+
+    service = SecurityService(hasher=hasher, user_store=RecordingStore())
+    service.users.add_user("ann", bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=5)).decode(), [])
+
+    async def login():
+        assert await service.verify_credentials_async("ann", "secret") is True
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(login())
+    assert len(threads) == 2 and loop_thread not in threads
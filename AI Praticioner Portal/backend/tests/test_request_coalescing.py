@@ -0,0 +1,166 @@
+import asyncio
+import httpx
+import pytest
+from src.services.fake_gemini import create_app
+from src.services.gemini_service import GeminiService
+from src.services.generation_cache import GenerationCache
+from src.services.request_coalescing import SingleFlight, MicroBatcher
+
+def test_single_flight_shares_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        first = await asyncio.gather(*(flight.do("k", lambda: work(1)) for _ in range(10)))
+        second = await flight.do("k", lambda: work(3))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == [2] * 10 and second == 6
+    assert calls == [1, 3]
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["in_flight"] == 0
+
+def test_single_flight_propagates_errors_to_followers():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_single_flight_survives_a_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        return leader.cancelled(), result
+
+    assert asyncio.run(scenario()) == (True, "done")
+    assert calls == [1]
+    assert flight.stats()["in_flight"] == 0
+
+def test_single_flight_cancels_the_call_once_every_caller_is_gone():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def scenario():
+        callers = [asyncio.ensure_future(flight.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert finished == []
+    assert flight.stats()["in_flight"] == 0
+
+def test_micro_batcher_groups_by_window_and_size():
+    sent = []
+
+    async def send(items):
+        sent.append(list(items))
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(send, window_ms=20, max_batch_size=3)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(item) for item in "abcde"))
+
+    assert asyncio.run(scenario()) == list("ABCDE")
+    assert sent == [["a", "b", "c"], ["d", "e"]]
+    assert batcher.stats()["mean_batch_size"] == 2.5
+
+    with pytest.raises(ValueError):
+        MicroBatcher(send, max_batch_size=0)
+
+def make_service(**options):
+    fake = create_app(first_token_delay=0.02)
+    service = GeminiService(api_key="test-key", base_url="http://fake", transport=httpx.ASGITransport(app=fake),
+                            **options)
+    return service, fake
+
+def test_identical_concurrent_requests_make_one_upstream_call():
+    service, fake = make_service()
+
+    async def burst():
+        return await asyncio.gather(*(service.generate_code_async("hello world") for _ in range(20)))
+
+    responses = asyncio.run(burst())
+    assert {response.content for response in responses} == {responses[0].content}
+    assert fake.state.requests == 1
+    assert service.stats()["coalescing"]["coalesced"] == 19
+
+def test_distinct_prompts_are_micro_batched():
+    service, fake = make_service(batch_window_ms=20, max_batch_size=8, batch_url="http://fake/batch")
+
+    async def burst():
+        return await asyncio.gather(*(service.generate_code_async(f"task {i}") for i in range(10)))
+
+    responses = asyncio.run(burst())
+    assert all(response.status == "success" for response in responses)
+    assert "task_3" in responses[3].content
+    assert fake.state.requests == 2
+    assert fake.state.batched_prompts == 10
+    assert service.stats()["batching"]["batches"] == 2
+
+def test_failed_batches_fall_back_to_one_call_per_prompt():
+    service, fake = make_service(batch_window_ms=20, max_batch_size=8, batch_url="http://fake/no-such-gateway")
+
+    async def burst():
+        return await asyncio.gather(*(service.generate_code_async(f"task {i}") for i in range(4)))
+
+    responses = asyncio.run(burst())
+    assert all(response.status == "success" for response in responses)
+    assert "task_2" in responses[2].content
+    assert fake.state.requests == 4
+    assert service.stats()["batching"]["fallbacks"] == 1
+
+def test_failed_batch_items_are_errors():
+    def upstream(request):
+        return httpx.Response(200, json={"responses": [
+            {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]},
+            {"error": {"message": "quota exceeded"}},
+            {"candidates": []},
+        ]})
+
+    service = GeminiService(api_key="test-key", base_url="http://fake", transport=httpx.MockTransport(upstream),
+                            cache=GenerationCache(), batch_window_ms=20, max_batch_size=8,
+                            batch_url="http://fake/batch")
+
+    async def burst():
+        return await asyncio.gather(*(service.generate_code_async(f"task {i}") for i in range(3)))
+
+    responses = asyncio.run(burst())
+    assert [(r.status, r.error) for r in responses] == [
+        ("success", None), ("error", "quota exceeded"), ("error", "Gemini API returned no candidates")]
+    assert len(service.cache.memory) == 1
+
+def test_batching_needs_a_batch_gateway():
+    service, _ = make_service(batch_window_ms=20)
+    assert service.batcher is None
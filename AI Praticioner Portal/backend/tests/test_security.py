@@ -1,5 +1,6 @@
 import pytest
 from typing import List
+from datetime import timedelta
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -36,3 +37,37 @@ def test_password_hashing():
     
     # Test with wrong password
     assert service.verify_password("wrong_password", hashed) is False
+
+def test_verified_tokens_are_cached():
+    """Test that a token is decoded once and then served from the cache"""
+    service = SecurityService()
+    service.users.set_roles("test_user", ["editor"])
+    token = service.create_access_token({"sub": "test_user"})
+
+    assert service.verify_token(token) is True
+    assert service.get_user_roles(token) == ["editor"]
+    assert service.authorize_user(token, "editor") is True
+    assert service.authorize_user(token, "admin") is False
+    assert service.token_cache.misses == 1
+    assert service.token_cache.hits == 3
+
+def test_expired_tokens_are_not_served_from_cache():
+    """Test that cached entries honour the token's exp claim"""
+    service = SecurityService()
+    token = service.create_access_token({"sub": "test_user"}, expires_delta=timedelta(seconds=-1))
+    assert service.verify_token(token) is False
+    assert service.decode_token("not-a-token") is None
+    assert service.decode_token(service.create_access_token({"role": "no-sub"})) is None
+
+def test_roles_as_signed_claims():
+    """Test that roles carried in the token take precedence over the role store"""
+    service = SecurityService()
+    service.users.set_roles("test_user", ["viewer"])
+    token = service.create_access_token({"sub": "test_user"}, roles=["admin", "editor", "admin"])
+
+    authorization = service.authorize(token)
+    assert authorization["claims"]["sub"] == "test_user"
+    assert authorization["roles"] == frozenset({"admin", "editor"})
+    assert service.get_user_roles(token) == ["admin", "editor"]
+    assert service.authorize_user(token, "viewer") is False
+    assert service.authorize("garbage") is None
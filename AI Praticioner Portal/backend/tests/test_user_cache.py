@@ -0,0 +1,114 @@
+import sys
+import time
+import asyncio
+import threading
+from src.services.database_service import DatabaseService
+from src.services.user_cache import LRUCache, LocalSharedStore, SharedCache, UserCache
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_lru_entries_expire():
+    cache = LRUCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_shared_tier_populates_local_tier():
+    store = LocalSharedStore()
+    writer = UserCache(shared=SharedCache(store))
+    reader = UserCache(shared=SharedCache(store))
+    writer.set("ann", {"username": "ann", "roles": ["admin"]})
+
+    assert reader.get("ann") == {"username": "ann", "roles": ["admin"]}
+    assert reader.stats()["shared_hits"] == 1
+    assert reader.local.get("ann") is not None
+
+    writer.invalidate("ann")
+    assert store.get("user:ann") is None
+
+def test_invalidation_reaches_other_workers_local_tier():
+    store = LocalSharedStore()
+    writer = UserCache(shared=SharedCache(store))
+    reader = UserCache(shared=SharedCache(store))
+    writer.set("ann", {"username": "ann", "roles": ["admin"]})
+    assert reader.get("ann")["roles"] == ["admin"]
+
+    writer.invalidate("ann")
+    writer.set("ann", {"username": "ann", "roles": []})
+    assert reader.local.get("ann") is None
+    assert reader.get("ann")["roles"] == []
+
+def test_local_tier_is_skipped_without_an_invalidation_channel():
+    class NoPubSub(LocalSharedStore):
+        def pubsub(self, **options):
+            raise ConnectionError("pubsub unavailable")
+
+    store = NoPubSub()
+    cache = UserCache(shared=SharedCache(store))
+    cache.set("ann", {"username": "ann", "roles": ["admin"]})
+    assert not cache.local_enabled and len(cache.local) == 0
+    store.set("user:ann", '{"username": "ann", "roles": []}')
+    assert cache.get("ann")["roles"] == []
+
+def test_async_methods_run_the_shared_tier_off_the_event_loop():
+    threads = []
+
+    class RecordingStore(LocalSharedStore):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ex=None):
+            threads.append(threading.get_ident())
+            return super().set(key, value, ex)
+
+        def delete(self, *keys):
+            threads.append(threading.get_ident())
+            return super().delete(*keys)
+
+    cache = UserCache(shared=SharedCache(RecordingStore()))
+
+    async def scenario():
+        await cache.set_async("ann", {"username": "ann", "roles": []})
+        cache.local.clear()
+        assert (await cache.get_async("ann"))["username"] == "ann"
+        # Served from the in-process tier without touching the shared client
+        assert (await cache.get_async("ann"))["username"] == "ann"
+        await cache.invalidate_async("ann")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 3 and loop_thread not in threads
+    assert cache.stats()["hits"] == 2
+
+def test_missing_redis_package_is_reported(monkeypatch, caplog):
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setitem(sys.modules, "redis", None)
+    cache = UserCache.from_env()
+    assert cache.shared is None
+    assert "redis package is not installed" in caplog.text
+
+def test_get_user_is_read_through_and_invalidated(tmp_path):
+    cache = UserCache(LRUCache(maxsize=100, ttl=60))
+    service = DatabaseService(f"sqlite:///{tmp_path / 'cache.db'}", cache=cache)
+    service.store_user({"username": "ann", "hashed_password": "h1", "roles": ["user"]})
+
+    first = service.get_user("ann")
+    first["roles"].append("tampered")
+    assert service.get_user("ann")["roles"] == ["user"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    service.update_user("ann", {"username": "ann", "hashed_password": "h2", "roles": ["admin"]})
+    assert service.get_user("ann")["hashed_password"] == "h2"
+
+    service.delete_user("ann")
+    assert service.get_user("ann") is None
+    service.engine.dispose()
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import text
+from src.services.database_service import DatabaseService, DatabaseError, CountCache, encode_cursor, decode_cursor
+
+def seed(service, count):
+    service.store_users_bulk(
+        {"username": f"user_{i:03d}", "hashed_password": "x", "roles": ["user"]} for i in range(count)
+    )
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42)) == 42
+    with pytest.raises(DatabaseError):
+        decode_cursor("not-a-cursor")
+
+def test_keyset_pages_cover_all_users(sqlite_service):
+    seed(sqlite_service, 23)
+
+    seen = []
+    result = sqlite_service.list_users(page_size=10)
+    assert result["total"] == 23
+    seen.extend(u["username"] for u in result["users"])
+    while result["next_cursor"]:
+        result = sqlite_service.list_users(page_size=10, cursor=result["next_cursor"], include_total=False)
+        assert result["total"] is None
+        seen.extend(u["username"] for u in result["users"])
+
+    assert seen == [f"user_{i:03d}" for i in range(23)]
+
+def test_offset_and_cursor_agree(sqlite_service):
+    seed(sqlite_service, 15)
+    first = sqlite_service.list_users(page=1, page_size=5)
+    by_cursor = sqlite_service.list_users(page_size=5, cursor=first["next_cursor"])
+    by_offset = sqlite_service.list_users(page=2, page_size=5)
+    assert by_cursor["users"] == by_offset["users"]
+
+def test_total_is_cached_and_invalidated_on_write(tmp_path):
+    service = DatabaseService(f"sqlite:///{tmp_path / 'count.db'}", count_cache_ttl=60)
+    seed(service, 3)
+    assert service.list_users()["total"] == 3
+
+    # Rows written behind the service's back are not seen until the TTL expires
+    with service.SessionLocal() as db:
+        db.execute(text("DELETE FROM users WHERE username = 'user_000'"))
+        db.commit()
+    assert service.list_users()["total"] == 3
+
+    # Writes through the service drop the cached totals
+    service.delete_user("user_001")
+    assert service.list_users()["total"] == 1
+    service.engine.dispose()
+
+def test_count_cache_is_bounded():
+    counts = CountCache(ttl=60, maxsize=3)
+    for i in range(10):
+        counts.set(("search", f"query {i}"), i)
+    assert len(counts) == 3
+    assert counts.get(("search", "query 0")) is None and counts.get(("search", "query 9")) == 9
+    disabled = CountCache(ttl=0)
+    disabled.set(("search", "query"), 1)
+    assert len(disabled) == 0
+
+def test_search_users_keyset(sqlite_service):
+    seed(sqlite_service, 12)
+    result = sqlite_service.search_users("user_00", page_size=5)
+    assert result["total"] == 10
+    assert len(result["users"]) == 5
+    result = sqlite_service.search_users("user_00", page_size=5, cursor=result["next_cursor"])
+    assert [u["username"] for u in result["users"]][-1] == "user_009"
+    assert result["next_cursor"] is None
+
+def test_invalid_page_arguments(sqlite_service):
+    with pytest.raises(DatabaseError):
+        sqlite_service.list_users(page=0)
+    with pytest.raises(DatabaseError):
+        sqlite_service.list_users(page_size=0)
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from src.models.user import UserRole
+from src.services.database_service import DatabaseService, DatabaseError
+from src.services.user_search import UserSearchIndex
+
+USERS = [
+    {"username": "John_Doe", "hashed_password": "p", "roles": ["user"]},
+    {"username": "jane_doe", "hashed_password": "p", "roles": ["admin", "user"]},
+    {"username": "bob_smith", "hashed_password": "p", "roles": ["user"]},
+    {"username": "alice", "hashed_password": "p", "roles": ["admin"]},
+    {"username": "100%_real", "hashed_password": "p", "roles": []},
+]
+
+@pytest.fixture
+def service(sqlite_service):
+    sqlite_service.store_users_bulk(USERS[:2])
+    for user in USERS[2:]:
+        sqlite_service.store_user(user)
+    return sqlite_service
+
+def names(result):
+    return sorted(u["username"] for u in result["users"])
+
+def test_sqlite_uses_fts_index(service):
+    assert service.search_index.trigram_enabled
+    with service.engine.connect() as conn:
+        assert conn.scalar(text("SELECT count(*) FROM users_fts")) == len(USERS)
+
+def test_contains_search_is_case_insensitive(service):
+    assert names(service.search_users("DOE")) == ["John_Doe", "jane_doe"]
+    # Short needles fall back to a plain LIKE
+    assert names(service.search_users("ic")) == ["alice"]
+
+def test_prefix_search(service):
+    assert names(service.search_users("jo", match="prefix")) == ["John_Doe"]
+    assert names(service.search_users("doe", match="prefix")) == []
+    with pytest.raises(DatabaseError):
+        service.search_users("doe", match="regex")
+
+def test_wildcards_are_literal(service):
+    assert names(service.search_users("0%_")) == ["100%_real"]
+    assert names(service.search_users("%")) == ["100%_real"]
+
+def test_postgres_filter_matches_the_lower_username_indexes():
+    index = UserSearchIndex()
+    index.dialect, index.trigram_enabled = "postgresql", True
+    for match, pattern in (("contains", "%%Doe/_%%"), ("prefix", "Doe/_%%")):
+        sql = str(index.username_filter("Doe_", match).compile(dialect=postgresql.dialect(),
+                                                              compile_kwargs={"literal_binds": True}))
+        assert sql == f"lower(users.username) LIKE lower('{pattern}') ESCAPE '/'"
+
+def test_role_filter_requires_all_roles(service):
+    assert names(service.search_users(roles=["admin"])) == ["alice", "jane_doe"]
+    assert names(service.search_users(roles=["admin", "user"])) == ["jane_doe"]
+    assert names(service.search_users("doe", roles=["admin"])) == ["jane_doe"]
+
+def test_role_links_follow_updates_and_deletes(service):
+    service.update_user("bob_smith", {"username": "bobby", "hashed_password": "p", "roles": ["admin"]})
+    assert names(service.search_users(roles=["admin"])) == ["alice", "bobby", "jane_doe"]
+    assert names(service.search_users("bobby")) == ["bobby"]
+    assert names(service.search_users("smith")) == []
+
+    service.delete_user("alice")
+    with service.SessionLocal() as db:
+        roles = db.scalars(select(UserRole.role)).all()
+    assert sorted(roles) == ["admin", "admin", "user", "user"]
+
+def test_existing_users_are_backfilled(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    service = DatabaseService(url)
+    service.store_user(USERS[1])
+    with service.engine.begin() as conn:
+        conn.execute(text("DROP TABLE users_fts"))
+        conn.execute(text("DELETE FROM user_roles"))
+    service.engine.dispose()
+
+    reopened = DatabaseService(url)
+    assert names(reopened.search_users("jane", roles=["admin"])) == ["jane_doe"]
+    reopened.engine.dispose()
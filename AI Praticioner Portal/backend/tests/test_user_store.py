@@ -0,0 +1,50 @@
+import pytest
+from src.services.security_service import SecurityService
+from src.services.user_store import InMemoryUserStore, DatabaseUserStore
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, sqlite_service):
+    if request.param == "memory":
+        return InMemoryUserStore()
+    return DatabaseUserStore(sqlite_service)
+
+def test_reverse_index_tracks_role_changes(store):
+    store.add_user("ann", "h1", ["admin", "user"])
+    store.add_user("bob", "h2", ["user"])
+
+    assert store.users_with_role("user") == ["ann", "bob"]
+    assert store.has_role("ann", "admin") and not store.has_role("bob", "admin")
+
+    store.revoke_role("ann", "user")
+    store.grant_role("bob", "admin")
+    assert store.users_with_role("user") == ["bob"]
+    assert store.users_with_role("admin") == ["ann", "bob"]
+    assert store.get_roles("bob") == ["admin", "user"]
+
+    store.remove_user("ann")
+    assert store.users_with_role("admin") == ["bob"]
+    assert store.get_password_hash("ann") is None
+    store.remove_user("ann")
+
+def test_password_hash_updates(store):
+    store.add_user("ann", "h1", [])
+    store.set_password_hash("ann", "h2")
+    assert store.get_password_hash("ann") == "h2"
+
+def test_database_store_is_shared_between_services(sqlite_service):
+    first = SecurityService(user_store=DatabaseUserStore(sqlite_service))
+    second = SecurityService(user_store=DatabaseUserStore(sqlite_service))
+    first.users.add_user("ann", "hash", ["editor"])
+
+    token = second.create_access_token({"sub": "ann"})
+    assert second.authorize_user(token, "editor") is True
+    first.users.revoke_role("ann", "editor")
+    assert second.authorize_user(token, "editor") is False
+    assert second.users_with_role("editor") == []
+
+def test_users_with_role_pages_by_username(sqlite_service):
+    sqlite_service.store_users_bulk(
+        {"username": f"u{i:02d}", "hashed_password": "h", "roles": ["staff"]} for i in range(5)
+    )
+    assert sqlite_service.users_with_role("staff", limit=2) == ["u00", "u01"]
+    assert sqlite_service.users_with_role("staff", limit=2, after="u01") == ["u02", "u03"]
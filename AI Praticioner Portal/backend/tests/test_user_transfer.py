@@ -0,0 +1,132 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_database_service, get_security_service, require_admin
+from src.services.password_hasher import PasswordHasher
+from src.services.security_service import SecurityService
+
+def make_users(count, prefix="user"):
+    return [
+        {"username": f"{prefix}_{i}", "hashed_password": f"hash_{i}", "roles": ["user"]}
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def client(sqlite_service):
+    app.dependency_overrides[get_database_service] = lambda: sqlite_service
+    app.dependency_overrides[require_admin] = lambda: {"claims": {"sub": "root"}, "roles": frozenset(["admin"])}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_store_users_bulk_reports_conflicts(sqlite_service):
+    sqlite_service.store_user({"username": "user_3", "hashed_password": "x", "roles": []})
+    users = make_users(10)
+    users.append({"username": "user_5", "hashed_password": "dup", "roles": []})
+    users.append({"username": "incomplete"})
+
+    result = sqlite_service.store_users_bulk(users, batch_size=4)
+
+    assert result["inserted"] == 9
+    errors = {c["index"]: c["error"] for c in result["conflicts"]}
+    assert errors[3] == "User already exists"
+    assert errors[11] == "Missing required fields"
+    # user_5 (index 5) lands in a different batch than its duplicate (index 10)
+    assert "already exists" in errors[10]
+    assert sqlite_service.get_user("user_9")["hashed_password"] == "hash_9"
+
+def test_export_users_streams_in_chunks(sqlite_service):
+    sqlite_service.store_users_bulk(make_users(25))
+
+    chunks = list(sqlite_service.export_users(chunk_size=10))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    ids = [user["id"] for chunk in chunks for user in chunk]
+    assert ids == sorted(ids) and len(set(ids)) == 25
+
+def test_import_ndjson_endpoint(client, sqlite_service):
+    lines = [json.dumps(user) for user in make_users(5)] + ["not json", json.dumps(make_users(1)[0])]
+    response = client.post(
+        "/users/import?batch_size=2",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 5
+    assert [c["index"] for c in body["conflicts"]] == [5, 6]
+    assert "Invalid JSON" in body["conflicts"][0]["error"]
+
+def test_import_reports_rows_with_wrong_types(client, sqlite_service):
+    bad = [
+        {"username": ["x"], "hashed_password": "h", "roles": []},
+        {"username": None, "hashed_password": "h", "roles": []},
+        {"username": "nohash", "hashed_password": "", "roles": []},
+        {"username": "str_roles", "hashed_password": "h", "roles": "admin"},
+        {"username": "dict_roles", "hashed_password": "h", "roles": [{"name": "admin"}]},
+    ]
+    lines = [json.dumps(user) for user in bad + make_users(1)]
+    response = client.post("/users/import", content="\n".join(lines).encode(),
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 1
+    assert [(c["index"], c["username"], c["error"]) for c in body["conflicts"]] == [
+        (0, None, "username must be a non-empty string"),
+        (1, None, "username must be a non-empty string"),
+        (2, "nohash", "hashed_password must be a non-empty string"),
+        (3, "str_roles", "roles must be a list of strings"),
+        (4, "dict_roles", "roles must be a list of strings"),
+    ]
+    assert sqlite_service.get_user("str_roles") is None
+
+def test_import_and_export_csv(client, sqlite_service):
+    payload = "username,hashed_password,roles\nann,h1,admin;user\nbob,h2,[\"user\"]\n"
+    response = client.post("/users/import", content=payload, headers={"Content-Type": "text/csv"})
+    assert response.json() == {"inserted": 2, "conflicts": []}
+    assert sqlite_service.get_user("ann")["roles"] == ["admin", "user"]
+
+    response = client.get("/users/export?format=csv&chunk_size=1")
+    assert response.status_code == 200
+    rows = response.text.strip().splitlines()
+    assert rows[0] == "id,username,roles,created_at,updated_at"
+    assert len(rows) == 3
+
+def test_csv_import_keeps_quoted_multiline_fields(client, sqlite_service):
+    payload = 'username,hashed_password,roles\r\n"multi\r\nline",h1,"admin;\nuser"\r\nplain,h2,user\r\n'
+    # Split the body mid-record so the quoted field also spans chunks
+    chunks = [payload.encode()[:40], payload.encode()[40:]]
+    response = client.post("/users/import", content=iter(chunks), headers={"Content-Type": "text/csv"})
+    assert response.json() == {"inserted": 2, "conflicts": []}
+    assert sqlite_service.get_user("multi\r\nline")["roles"] == ["admin", "\nuser"]
+    assert sqlite_service.get_user("plain")["hashed_password"] == "h2"
+
+def test_export_ndjson_endpoint(client, sqlite_service):
+    sqlite_service.store_users_bulk(make_users(3))
+    response = client.get("/users/export")
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert [u["username"] for u in users] == ["user_0", "user_1", "user_2"]
+    assert all("hashed_password" not in u for u in users)
+
+    response = client.get("/users/export", params={"include_password_hashes": True})
+    assert [json.loads(line)["hashed_password"] for line in response.text.splitlines()] == ["hash_0", "hash_1", "hash_2"]
+
+def test_transfer_endpoints_require_an_admin_token(sqlite_service):
+    security = SecurityService(hasher=PasswordHasher(max_workers=1))
+    app.dependency_overrides[get_security_service] = lambda: security
+    app.dependency_overrides[get_database_service] = lambda: sqlite_service
+    client = TestClient(app)
+    try:
+        assert client.get("/users/export").status_code == 401
+        assert client.post("/users/import", content=b"").status_code == 401
+        token = security.create_access_token({"sub": "eve"}, roles=["user"])
+        response = client.get("/users/export", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+        token = security.create_access_token({"sub": "eve"}, roles=["admin"])
+        response = client.post("/users/import", content=b'{"username": "mallory"}',
+                               headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"})
+        assert response.status_code == 200
+    finally:
+        app.dependency_overrides.clear()
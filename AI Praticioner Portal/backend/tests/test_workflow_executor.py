@@ -0,0 +1,148 @@
+import gc
+import asyncio
+import json
+import time
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_catalog_store, get_workflow_executor
+from src.services.catalog_service import CatalogStore
+from src.services.workflow_graph import WorkflowGraph
+from src.services.workflow_executor import WorkflowExecutor, register_step
+
+def node(node_id, step, **config):
+    return {"id": node_id, "data": {"label": node_id, "step": step, "config": config}}
+
+def run(executor, graph, inputs=None):
+    async def collect():
+        return [event async for event in executor.execute(graph, inputs)]
+    return asyncio.run(collect())
+
+def finished(events):
+    return {event["node"]: event for event in events if event["event"] == "node_finished"}
+
+PIPELINE = {
+    "nodes": [node("in", "input"), node("a", "template", template="A:{in}"),
+              node("b", "template", template="B:{in}"), node("join", "template", template="{a}|{b}"),
+              node("out", "output")],
+    "edges": [{"source": "in", "target": "a"}, {"source": "in", "target": "b"},
+              {"source": "a", "target": "join"}, {"source": "b", "target": "join"},
+              {"source": "join", "target": "out"}],
+}
+
+def test_results_flow_in_topological_order():
+    events = run(WorkflowExecutor(), WorkflowGraph.from_dict(PIPELINE), {"in": "x"})
+    assert events[0] == {"event": "run_started", "nodes": 5}
+    assert events[-1]["status"] == "ok"
+    assert events[-1]["outputs"] == {"out": "A:x|B:x"}
+    assert all(event["status"] == "ok" for event in finished(events).values())
+
+def test_edges_sharing_a_target_handle_are_gathered_in_edge_order():
+    graph = WorkflowGraph.from_dict({
+        "nodes": [node("x", "input"), node("y", "input"), node("out", "output")],
+        "edges": [{"id": "e1", "source": "x", "target": "out", "targetHandle": "items"},
+                  {"id": "e2", "source": "y", "target": "out", "targetHandle": "items"}],
+    })
+    events = run(WorkflowExecutor(), graph, {"x": 1, "y": 2})
+    assert events[-1]["outputs"] == {"out": [1, 2]}
+
+def test_rerun_recomputes_only_changed_nodes():
+    executor = WorkflowExecutor()
+    graph = WorkflowGraph.from_dict(PIPELINE)
+    run(executor, graph, {"in": "x"})
+    graph.put_node(node("b", "template", template="b:{in}"))
+    statuses = {node_id: event["status"] for node_id, event in finished(run(executor, graph, {"in": "x"})).items()}
+    assert statuses == {"in": "cached", "a": "cached", "b": "ok", "join": "ok", "out": "ok"}
+
+def test_independent_nodes_run_concurrently_within_the_limit():
+    running = {"now": 0, "peak": 0}
+
+    async def slow_step(config, inputs):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.05)
+        running["now"] -= 1
+        return config["n"]
+
+    register_step("slow", slow_step)
+    graph = WorkflowGraph.from_dict({"nodes": [node(str(i), "slow", n=i) for i in range(8)], "edges": []})
+    start = time.perf_counter()
+    run(WorkflowExecutor(max_concurrency=4), graph)
+    assert running["peak"] == 4
+    assert time.perf_counter() - start < 0.35
+
+def test_failures_skip_downstream_nodes():
+    def broken(config, inputs):
+        raise RuntimeError("boom")
+
+    register_step("broken", broken)
+    graph = WorkflowGraph.from_dict({
+        "nodes": [node("x", "broken"), node("y", "output"), node("z", "input", value=1)],
+        "edges": [{"source": "x", "target": "y"}],
+    })
+    events = run(WorkflowExecutor(), graph)
+    nodes = finished(events)
+    assert nodes["x"]["status"] == "error" and nodes["x"]["error"] == "boom"
+    assert nodes["y"]["status"] == "skipped"
+    assert nodes["z"]["status"] == "ok"
+    assert events[-1]["status"] == "error"
+
+def test_disconnecting_mid_run_cancels_without_scheduling_successors():
+    started = []
+
+    async def slow_step(config, inputs):
+        started.append(config["n"])
+        await asyncio.sleep(0.05)
+        return config["n"]
+
+    register_step("slow", slow_step)
+    graph = WorkflowGraph.from_dict({
+        "nodes": [node("a", "slow", n="a"), node("b", "slow", n="b")],
+        "edges": [{"source": "a", "target": "b"}],
+    })
+
+    async def disconnect():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        events = WorkflowExecutor().execute(graph)
+        async for event in events:
+            if event["event"] == "node_started":
+                break
+        await events.aclose()
+        await asyncio.sleep(0.1)
+        gc.collect()
+        return errors
+
+    assert asyncio.run(disconnect()) == []
+    assert started == ["a"]
+
+def test_cpu_bound_steps_run_in_the_process_pool():
+    executor = WorkflowExecutor(max_workers=1)
+    graph = WorkflowGraph.from_dict({
+        "nodes": [node("in", "input"), node("stats", "text_stats", top=1)],
+        "edges": [{"source": "in", "target": "stats"}],
+    })
+    try:
+        events = run(executor, graph, {"in": "a b a"})
+        assert events[-1]["outputs"] == {"stats": {"words": 3, "top": [("a", 2)]}}
+    finally:
+        executor.shutdown()
+
+def test_run_endpoint_streams_events():
+    store = CatalogStore()
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    executor = WorkflowExecutor()
+    app.dependency_overrides[get_workflow_executor] = lambda: executor
+    client = TestClient(app)
+    try:
+        workflow_id = client.post("/workflows/", json=PIPELINE).json()["id"]
+        response = client.post(f"/workflows/{workflow_id}/run", json={"inputs": {"in": "q"}})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert events[-1]["outputs"] == {"out": "A:q|B:q"}
+
+        collected = client.post(f"/workflows/{workflow_id}/run", params={"stream": False},
+                                json={"inputs": {"in": "q"}}).json()
+        assert collected["status"] == "ok"
+        assert {event["status"] for event in collected["events"] if event["event"] == "node_finished"} == {"cached"}
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,140 @@
+import random
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_catalog_store
+from src.services.catalog_service import CatalogStore
+from src.services.workflow_graph import WorkflowGraph, WorkflowStore, GraphError, parse_ports
+
+COMPONENTS = [
+    {"id": 1, "name": "Text Input", "type": "Input", "outputs": ["text:string"]},
+    {"id": 2, "name": "GPT", "type": "LLM", "inputs": ["prompt:string", "temperature:number"],
+     "outputs": ["completion:string"]},
+    {"id": 3, "name": "Vector DB", "type": "Database", "inputs": ["vector:embedding"], "outputs": ["results"]},
+    {"id": 4, "name": "Text Output", "type": "Output", "inputs": ["text"]},
+]
+
+def make_store():
+    return CatalogStore(seed={"projects": [], "components": COMPONENTS})
+
+def node(node_id, component_id=None, node_type=None):
+    data = {"label": str(node_id)}
+    if component_id is not None:
+        data["componentId"] = component_id
+    if node_type is not None:
+        data["type"] = node_type
+    return {"id": node_id, "data": data}
+
+def assert_topological(graph):
+    position = {node_id: i for i, node_id in enumerate(graph.order())}
+    for edge in graph.edges.values():
+        if edge.id not in graph._cycle_edges:
+            assert position[edge.source] < position[edge.target]
+
+def test_parse_ports():
+    ports = parse_ports(["prompt:String", "context"])
+    assert ports["prompt"].type == "string"
+    assert ports["context"].type == "any"
+
+def test_cycle_edges_are_reported_and_resolved():
+    graph = WorkflowGraph()
+    graph.load([node(str(i)) for i in range(4)],
+               [{"id": "a", "source": "0", "target": "1"}, {"id": "b", "source": "1", "target": "2"},
+                {"id": "c", "source": "2", "target": "3"}])
+    assert graph.order() == ["0", "1", "2", "3"]
+
+    graph.add_edge({"id": "back", "source": "3", "target": "1"})
+    summary = graph.summary()
+    assert not summary["valid"]
+    assert summary["cycles"] == [["1", "2", "3", "1"]]
+    assert_topological(graph)
+
+    graph.remove_edge("b")
+    assert graph.summary()["valid"]
+    assert_topological(graph)
+    assert graph.order().index("3") < graph.order().index("1")
+
+def test_reorder_on_backward_edge_and_node_removal():
+    graph = WorkflowGraph()
+    for i in range(6):
+        graph.put_node(node(str(i)))
+    graph.add_edge({"source": "5", "target": "0"})
+    graph.add_edge({"source": "4", "target": "5"})
+    graph.add_edge({"source": "0", "target": "3"})
+    assert_topological(graph)
+    graph.remove_node("5")
+    assert "5" not in graph.order()
+    assert len(graph.edges) == 1
+    with pytest.raises(GraphError):
+        graph.add_edge({"source": "0", "target": "missing"})
+
+def test_port_and_type_checks_use_the_registry():
+    store = make_store()
+    graph = WorkflowStore(store.components).create({
+        "nodes": [node("in", 1), node("llm", 2), node("db", 3), node("out", 4)],
+        "edges": [
+            {"id": "ok", "source": "in", "target": "llm", "targetHandle": "prompt"},
+            {"id": "bad-type", "source": "llm", "target": "db"},
+            {"id": "bad-port", "source": "llm", "target": "out", "targetHandle": "nope"},
+            {"id": "into-input", "source": "out", "target": "in"},
+        ],
+    })[1]
+    messages = {(issue["id"], issue["message"]) for issue in graph.issues()}
+    assert ("bad-type", "Port completion (string) does not match vector (embedding)") in messages
+    assert ("bad-port", "Text Output has no input port nope") in messages
+    assert ("into-input", "Input nodes cannot have incoming edges") in messages
+    assert not any(issue_id == "ok" for issue_id, _ in messages)
+
+    # A registry change re-validates only the nodes that use the component
+    store.components.update(3, {"name": "Vector DB", "type": "Database", "inputs": ["vector:string"]})
+    assert not any(issue["id"] == "bad-type" for issue in graph.issues())
+    store.components.delete(3)
+    assert {"kind": "node", "id": "db", "message": "Unknown component 3"} in graph.issues()
+
+def test_incremental_edits_on_a_large_graph_stay_fast():
+    random.seed(7)
+    count = 5000
+    nodes = [node(str(i)) for i in range(count)]
+    edges = [{"id": f"e{i}", "source": str(random.randrange(i)), "target": str(i)} for i in range(1, count)]
+    graph = WorkflowGraph()
+    graph.load(nodes, edges)
+    assert graph.summary()["valid"]
+
+    worst = 0.0
+    for i in range(200):
+        a, b = random.sample(range(count), 2)
+        start = time.perf_counter()
+        graph.add_edge({"id": f"x{i}", "source": str(a), "target": str(b)})
+        worst = max(worst, time.perf_counter() - start)
+    assert_topological(graph)
+    assert worst < 0.25
+
+def test_workflow_endpoints():
+    store = make_store()
+    app.dependency_overrides[get_catalog_store] = lambda: store
+    client = TestClient(app)
+    try:
+        created = client.post("/workflows/", json={
+            "nodes": [node("in", 1), node("llm", 2)],
+            "edges": [{"id": "e1", "source": "in", "target": "llm", "targetHandle": "prompt"}],
+        })
+        assert created.status_code == 201
+        workflow_id = created.json()["id"]
+        assert created.json()["order"] == ["in", "llm"]
+
+        added = client.put(f"/workflows/{workflow_id}/nodes/out", json=node("out", 4))
+        assert added.json()["valid"]
+        cyclic = client.post(f"/workflows/{workflow_id}/edges", json={"id": "e2", "source": "llm", "target": "in"})
+        assert cyclic.status_code == 201 and cyclic.json()["cycle_count"] == 1
+        fixed = client.delete(f"/workflows/{workflow_id}/edges/e2")
+        assert fixed.json()["cycle_count"] == 0
+
+        assert client.get(f"/workflows/{workflow_id}").json()["validation"]["nodes"] == 3
+        assert client.post(f"/workflows/{workflow_id}/edges", json={"source": "in", "target": "ghost"}).status_code == 400
+        assert client.delete(f"/workflows/{workflow_id}/nodes/ghost").status_code == 404
+        assert client.post("/workflows/validate", json={"nodes": [node("a")], "edges": []}).json()["valid"]
+        assert client.delete(f"/workflows/{workflow_id}").status_code == 200
+        assert client.get(f"/workflows/{workflow_id}").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
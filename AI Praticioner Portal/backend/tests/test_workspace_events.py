@@ -0,0 +1,76 @@
+import time
+import asyncio
+import hashlib
+from fastapi.testclient import TestClient
+from src.main import app
+from src.api.dependencies import get_workspace
+from src.services.workspace_events import Subscription, merge_events
+from src.services.workspace_service import Workspace
+
+def test_merge_events():
+    assert merge_events(None, "modified") == "modified"
+    assert merge_events("created", "modified") == "created"
+    assert merge_events("created", "deleted") is None
+    assert merge_events("deleted", "created") == "modified"
+    assert merge_events("modified", "deleted") == "deleted"
+
+def test_slow_subscription_coalesces_then_asks_for_resync():
+    async def scenario():
+        subscription = Subscription(asyncio.Event(), prefixes=["/src"], max_pending=3)
+        for _ in range(10):
+            subscription.offer([{"type": "modified", "path": "/src/a.py", "hash": "x"}])
+        subscription.offer([{"type": "modified", "path": "/docs/readme.md", "hash": "y"}])
+        assert subscription.wakeup.is_set()
+        assert subscription.drain(10) == {"type": "changes",
+                                          "changes": [{"type": "modified", "path": "/src/a.py", "hash": "x"}]}
+        assert subscription.drain(10) is None
+
+        subscription.offer([{"type": "created", "path": f"/src/{i}.py"} for i in range(5)])
+        assert subscription.drain(10) == {"type": "resync"}
+        assert subscription.dropped == 4
+        subscription.offer([{"type": "created", "path": "/src/b.py"}])
+        assert subscription.drain(10)["changes"][0]["path"] == "/src/b.py"
+
+    asyncio.run(scenario())
+
+def test_websocket_pushes_debounced_changes(tmp_path):
+    workspace = Workspace(str(tmp_path))
+    app.dependency_overrides[get_workspace] = lambda: workspace
+    client = TestClient(app)
+    try:
+        with client.websocket_connect("/ws") as socket:
+            socket.send_json({"op": "ping"})
+            assert socket.receive_json() == {"type": "pong"}
+            socket.send_json({"op": "subscribe", "channel": "files", "paths": ["/src"]})
+            assert socket.receive_json() == {"type": "subscribed", "channel": "files", "paths": ["/src"]}
+
+            client.post("/files", json={"path": "/docs/notes.md", "content": "ignored"})
+            client.post("/files", json={"path": "/src/app.py", "content": "v0"})
+            for version in range(1, 5):
+                client.put("/files/content", json={"path": "/src/app.py", "content": f"v{version}"})
+
+            message = socket.receive_json()
+            assert message["channel"] == "files" and message["type"] == "changes"
+            assert message["changes"] == [{"type": "created", "path": "/src/app.py", "kind": "file", "size": 2,
+                                           "hash": hashlib.sha256(b"v4").hexdigest()}]
+
+            client.delete("/files", params={"path": "/src/app.py"})
+            assert socket.receive_json()["changes"] == [{"type": "deleted", "path": "/src/app.py", "kind": None,
+                                                         "size": None, "hash": None}]
+
+            socket.send_json({"op": "subscribe", "channel": "tests"})
+            assert socket.receive_json()["type"] == "error"
+            socket.send_json({"op": "subscribe", "channel": [1]})
+            assert socket.receive_json() == {"type": "error", "detail": "channel must be a string"}
+            socket.send_json({"op": "ping"})
+            assert socket.receive_json() == {"type": "pong"}
+            socket.send_json({"op": "subscribe", "channel": "files", "paths": ["/../etc"]})
+            assert socket.receive_json()["type"] == "error"
+        # The server unsubscribes once it sees the close
+        for _ in range(100):
+            if client.get("/metrics/events").json()["subscriptions"] == 0:
+                break
+            time.sleep(0.01)
+        assert client.get("/metrics/events").json()["subscriptions"] == 0
+    finally:
+        app.dependency_overrides.clear()
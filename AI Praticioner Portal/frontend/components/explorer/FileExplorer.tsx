@@ -56,7 +56,28 @@ const FileExplorer: React.FC<FileExplorerProps> = ({ onFileSelect }) => {
     }
   };
 
-  const toggleDirectory = (path: string) => {
+  // Directories arrive without children until they are first expanded
+  const replaceChildren = (node: FileNode, path: string, children: FileNode[]): FileNode => {
+    if (node.path === path) return { ...node, children };
+    if (!node.children || !path.startsWith(node.path === '/' ? '/' : `${node.path}/`)) return node;
+    return { ...node, children: node.children.map(child => replaceChildren(child, path, children)) };
+  };
+
+  const loadChildren = async (path: string) => {
+    try {
+      const children = await fileService.listDirectory(path);
+      setFileStructure(prev => (prev ? replaceChildren(prev, path, children) : prev));
+    } catch (error) {
+      console.error('Error listing directory:', error);
+      showToast('Failed to list directory', 'error');
+    }
+  };
+
+  const toggleDirectory = (node: FileNode) => {
+    const { path } = node;
+    if (!expandedDirs.has(path) && !node.children) {
+      loadChildren(path);
+    }
     setExpandedDirs(prev => {
       const next = new Set(prev);
       if (next.has(path)) {
@@ -193,7 +214,7 @@ const FileExplorer: React.FC<FileExplorerProps> = ({ onFileSelect }) => {
             style={{ paddingLeft, zIndex: 10 }}
             tabIndex={0}
             role="button"
-            onClick={() => toggleDirectory(node.path)}
+            onClick={() => toggleDirectory(node)}
             onContextMenu={(e) => handleContextMenu(e, node)}
           >
             <span className="mr-2">{isExpanded ? '📂' : '📁'}</span>
@@ -3,26 +3,113 @@
 
 export const API_BASE_URL = process.env.API_BASE_URL || 'http://localhost:5000/api';
 
-export async function fetchProjects() {
-  const response = await fetch(`${API_BASE_URL}/projects`);
-  if (!response.ok) {
-    throw new Error('Failed to fetch projects');
-  }
-  return response.json();
+export interface CatalogQuery {
+  [filter: string]: string | string[] | number | undefined;
+  sort?: string;
+  fields?: string;
+  limit?: number;
+  cursor?: string;
+}
+
+export interface CatalogPage<T = any> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+function catalogQueryString(query?: CatalogQuery) {
+  const params = new URLSearchParams();
+  Object.entries(query || {}).forEach(([key, value]) => {
+    if (value === undefined) return;
+    (Array.isArray(value) ? value : [value]).forEach(v => params.append(key, String(v)));
+  });
+  const qs = params.toString();
+  return qs ? `?${qs}` : '';
+}
+
+async function fetchCatalogPage(collection: string, query?: CatalogQuery): Promise<CatalogPage> {
+  const response = await fetch(`${API_BASE_URL}/${collection}${catalogQueryString(query)}`);
+  if (!response.ok) throw new Error(`Failed to fetch ${collection}`);
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
+export async function fetchProjects(query?: CatalogQuery) {
+  return (await fetchCatalogPage('projects', query)).items;
+}
+
+export async function fetchProjectsPage(query?: CatalogQuery) {
+  return fetchCatalogPage('projects', query);
 }
 
-export async function getFileStructure() {
-  const response = await fetch(`${API_BASE_URL}/files`);
+export async function getFileStructure(depth?: number) {
+  const response = await fetch(`${API_BASE_URL}/files${depth === undefined ? '' : `?depth=${depth}`}`);
   if (!response.ok) throw new Error('Failed to fetch file structure');
   return response.json();
 }
 
+export async function listDirectory(path: string, query?: { limit?: number; cursor?: string }): Promise<CatalogPage> {
+  const response = await fetch(`${API_BASE_URL}/directories${catalogQueryString({ path, ...query })}`);
+  if (!response.ok) throw new Error('Failed to list directory');
+  return { items: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+}
+
 export async function getFileContent(path: string) {
   const response = await fetch(`${API_BASE_URL}/files/content?path=${encodeURIComponent(path)}`);
   if (!response.ok) throw new Error('Failed to fetch file content');
   return response.json();
 }
 
+export async function getFileRange(path: string, start: number, end: number): Promise<ArrayBuffer> {
+  const response = await fetch(`${API_BASE_URL}/files/raw?path=${encodeURIComponent(path)}`, {
+    headers: { Range: `bytes=${start}-${end}` }
+  });
+  if (!response.ok) throw new Error('Failed to fetch file range');
+  return response.arrayBuffer();
+}
+
+export async function uploadFile(path: string, file: Blob, chunkSize = 8 * 1024 * 1024) {
+  const url = `${API_BASE_URL}/files/upload?path=${encodeURIComponent(path)}`;
+  const status = await fetch(url);
+  let offset = status.ok ? (await status.json()).received : 0;
+  if (offset >= file.size) offset = 0;
+  let result: any = null;
+  do {
+    const end = Math.min(offset + chunkSize, file.size);
+    const headers: Record<string, string> = file.size
+      ? { 'Content-Range': `bytes ${offset}-${end - 1}/${file.size}` }
+      : {};
+    const response = await fetch(url, { method: 'PUT', headers, body: file.slice(offset, end) });
+    if (!response.ok) throw new Error('Failed to upload file');
+    result = await response.json();
+    offset = end;
+  } while (offset < file.size);
+  return result;
+}
+
+export interface WorkspaceChange {
+  type: 'created' | 'modified' | 'deleted';
+  path: string;
+  kind: 'file' | 'directory' | null;
+  size: number | null;
+  hash: string | null;
+}
+
+// Pushes debounced workspace changes under paths; onResync means the client fell behind and should re-fetch
+export function subscribeToWorkspaceChanges(
+  paths: string[],
+  onChanges: (changes: WorkspaceChange[]) => void,
+  onResync: () => void = () => {}
+) {
+  const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws`);
+  socket.onopen = () => socket.send(JSON.stringify({ op: 'subscribe', channel: 'files', paths }));
+  socket.onmessage = event => {
+    const message = JSON.parse(event.data);
+    if (message.channel !== 'files') return;
+    if (message.type === 'changes') onChanges(message.changes);
+    else if (message.type === 'resync') onResync();
+  };
+  return () => socket.close();
+}
+
 export async function createFile(path: string, content: any = '') {
   const response = await fetch(`${API_BASE_URL}/files`, {
     method: 'POST',
@@ -33,16 +120,51 @@ export async function createFile(path: string, content: any = '') {
   return response.json();
 }
 
-export async function saveFile(path: string, content: any) {
+export interface FileEdit {
+  offset: number;
+  length: number;
+  text: string;
+}
+
+export class FileConflictError extends Error {
+  constructor(public currentHash: string) {
+    super('File changed since it was opened');
+  }
+}
+
+async function putFileContent(body: object) {
   const response = await fetch(`${API_BASE_URL}/files/content`, {
     method: 'PUT',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ path, content })
+    body: JSON.stringify(body)
   });
+  if (response.status === 409) throw new FileConflictError((await response.json()).detail.current_hash);
   if (!response.ok) throw new Error('Failed to save file');
   return response.json();
 }
 
+export async function saveFile(path: string, content: any, baseHash?: string) {
+  return putFileContent({ path, content, base_hash: baseHash });
+}
+
+// Edits use Monaco's rangeOffset/rangeLength/text and apply in order
+export async function saveFileEdits(path: string, baseHash: string, edits: FileEdit[]) {
+  return putFileContent({ path, edits, base_hash: baseHash });
+}
+
+// Base hash for edits to files too large for getFileContent
+export async function getFileHash(path: string): Promise<string> {
+  const response = await fetch(`${API_BASE_URL}/files/raw?path=${encodeURIComponent(path)}`, { method: 'HEAD' });
+  if (!response.ok) throw new Error('Failed to fetch file hash');
+  return response.headers.get('X-Content-Hash') || '';
+}
+
+export async function getFileHistory(path: string) {
+  const response = await fetch(`${API_BASE_URL}/files/history?path=${encodeURIComponent(path)}`);
+  if (!response.ok) throw new Error('Failed to fetch file history');
+  return response.json();
+}
+
 export async function deleteFile(path: string) {
   const response = await fetch(`${API_BASE_URL}/files?path=${encodeURIComponent(path)}`, {
     method: 'DELETE'
@@ -69,18 +191,60 @@ export async function deleteDirectory(path: string) {
   return response.json();
 }
 
-export async function fetchComponents() {
-  const response = await fetch(`${API_BASE_URL}/components`);
-  if (!response.ok) throw new Error('Failed to fetch components');
+// Code navigation from the workspace symbol index
+async function fetchIndex(route: string, params: Record<string, string | number | undefined>) {
+  const search = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined) search.set(key, String(value));
+  });
+  const response = await fetch(`${API_BASE_URL}/index/${route}?${search.toString()}`);
+  if (!response.ok) throw new Error(`Failed to fetch ${route}`);
   return response.json();
 }
 
+export async function findDefinition(name: string, path?: string) {
+  return fetchIndex('definition', { name, path });
+}
+
+export async function findReferences(name: string, limit?: number) {
+  return fetchIndex('references', { name, limit });
+}
+
+export async function searchSymbols(q: string, options: { kind?: string; limit?: number } = {}) {
+  return fetchIndex('symbols', { q, kind: options.kind, limit: options.limit });
+}
+
+export async function fetchComponents(query?: CatalogQuery) {
+  return (await fetchCatalogPage('components', query)).items;
+}
+
+export async function fetchComponentsPage(query?: CatalogQuery) {
+  return fetchCatalogPage('components', query);
+}
+
 export async function fetchComponentById(id: string) {
   const response = await fetch(`${API_BASE_URL}/components/${id}`);
   if (!response.ok) throw new Error('Failed to fetch component');
   return response.json();
 }
 
+export async function searchComponents(q: string, options: { limit?: number; type?: string } = {}) {
+  const query = catalogQueryString({ q, limit: options.limit, type: options.type });
+  const response = await fetch(`${API_BASE_URL}/components/search${query}`);
+  if (!response.ok) throw new Error('Failed to search components');
+  return response.json();
+}
+
+export async function fetchComponentsByIds(ids: (string | number)[]): Promise<{ items: any[]; missing: number[] }> {
+  const response = await fetch(`${API_BASE_URL}/components:batchGet`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids: ids.map(Number) })
+  });
+  if (!response.ok) throw new Error('Failed to fetch components');
+  return response.json();
+}
+
 export async function createComponent(data: any) {
   const response = await fetch(`${API_BASE_URL}/components`, {
     method: 'POST',
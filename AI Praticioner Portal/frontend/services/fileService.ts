@@ -40,6 +40,17 @@ class FileService {
     return mockFileStructure;
   }
 
+  // One level of a directory, for expanding it lazily in the Explorer
+  async listDirectory(path: string): Promise<FileNode[]> {
+    await new Promise(resolve => setTimeout(resolve, 100));
+    let current: FileNode | undefined = mockFileStructure;
+    for (const part of path.split('/').filter(Boolean)) {
+      current = current?.children?.find(c => c.name === part);
+    }
+    return (current?.children || []).map(({ name, path, type }) =>
+      type === 'file' ? { name, path, type, children: [] } : { name, path, type });
+  }
+
   async getFileContent(path: string): Promise<FileContent> {
     await new Promise(resolve => setTimeout(resolve, 200));
     return { content: mockFileContents[path] || '', language: 'python' };